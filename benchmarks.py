@@ -0,0 +1,241 @@
+"""Offline benchmark suite for the dashboard's hot paths.
+
+Times backtest_portfolio across horizons and contribution frequencies, the
+Stooq/Yahoo/sample fetch paths at 10/100/1000 symbols against mock
+upstreams with injectable latency, the risk metrics, the market-cap
+column formatting and table rendering used by tabs 1 and 2, one quote
+refresh against 100k price alerts and the efficient frontier batch. No
+network access is needed.
+
+    python benchmarks.py --output baseline.json
+    python benchmarks.py --compare baseline.json --tolerance 0.25
+
+With --compare the run exits non-zero when any benchmark's median is more
+than tolerance slower than in the baseline, so it can gate a deploy.
+"""
+import argparse
+import contextlib
+import functools
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import dashboard
+
+BACKTEST_HORIZONS = [1, 5, 10, 30]  # years
+BACKTEST_FREQUENCIES = ['Daily', 'Weekly', 'Monthly', 'Yearly']
+FETCH_SIZES = [10, 100, 1000]
+RISK_ASSETS = 10
+RISK_DAYS = 730
+MOCK_LATENCY = 0.005  # seconds per upstream request
+ALERT_COUNT = 100_000
+ALERT_SYMBOLS = 100
+FRONTIER_BOUNDS = (0.0, 0.4)
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 0.25
+
+class MockStooqFetcher:
+    """Stand-in for pystooq's StooqDataFetcher: synthetic daily bars after a fixed latency"""
+
+    def __init__(self, latency=MOCK_LATENCY, days=30, seed=0):
+        self.latency = latency
+        self.days = days
+        self.rng = np.random.default_rng(seed)
+        self.requests = 0
+
+    def get_data(self, symbol, start_date=None):
+        self.requests += 1
+        time.sleep(self.latency)
+        index = pd.date_range(end=pd.Timestamp.now().normalize(), periods=self.days, freq='D')
+        closes = 100 * np.cumprod(1 + self.rng.normal(0, 0.02, self.days))
+        return pd.DataFrame({'Close': closes, 'Volume': self.rng.uniform(1e6, 1e9, self.days)}, index=index)
+
+def mock_yahoo_download(latency=MOCK_LATENCY, seed=0):
+    """download_yahoo_bars replacement returning synthetic (field, ticker) bars after one latency"""
+    rng = np.random.default_rng(seed)
+
+    def download(symbols, period, interval, start=None, end=None):
+        time.sleep(latency)
+        periods = 48 if interval == '1h' else 10
+        freq = 'h' if interval == '1h' else 'D'
+        index = pd.date_range(end=pd.Timestamp.now().floor(freq), periods=periods, freq=freq)
+        closes = 100 * np.cumprod(1 + rng.normal(0, 0.02, (periods, len(symbols))), axis=0)
+        volumes = rng.uniform(1e6, 1e9, (periods, len(symbols)))
+        return pd.concat({
+            'Close': pd.DataFrame(closes, index=index, columns=symbols),
+            'Volume': pd.DataFrame(volumes, index=index, columns=symbols)
+        }, axis=1)
+
+    return download
+
+@contextlib.contextmanager
+def patched(target, name, value):
+    original = getattr(target, name)
+    setattr(target, name, value)
+    try:
+        yield
+    finally:
+        setattr(target, name, original)
+
+def synthetic_registry(n_symbols):
+    """Registry of n_symbols made-up coins (the built-in coins first)"""
+    builtin = dashboard.BUILTIN_REGISTRY.table
+    extra = max(0, n_symbols - len(builtin))
+    table = pd.concat([builtin, pd.DataFrame({
+        'symbol': [f"SYN{i}" for i in range(extra)],
+        'name': [f"Synthetic {i}" for i in range(extra)],
+        'supply': np.full(extra, 1e9)
+    })], ignore_index=True).iloc[:n_symbols]
+    return dashboard.SymbolRegistry(table)
+
+def synthetic_returns(n_assets=RISK_ASSETS, n_days=RISK_DAYS, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(end=pd.Timestamp.now().normalize(), periods=n_days, freq='D')
+    columns = list(dashboard.STOOQ_SYMBOLS)[:n_assets]
+    return pd.DataFrame(rng.normal(0.0005, 0.03, (n_days, len(columns))), index=index, columns=columns)
+
+def measure(fn, repeat):
+    """Wall-clock seconds for repeat calls of fn (after one warm-up call)"""
+    fn()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def benchmark_cases(latency=MOCK_LATENCY):
+    """(name, params, fn) for every benchmark"""
+    end = date.today()
+    for years in BACKTEST_HORIZONS:
+        for freq in BACKTEST_FREQUENCIES:
+            start = end - timedelta(days=365 * years)
+            yield ('backtest_portfolio', {'years': years, 'contribution_freq': freq},
+                   functools.partial(dashboard.backtest_portfolio, 'Moderate', start, end, 10000.0, freq, 100.0))
+
+    for n_symbols in FETCH_SIZES:
+        registry = synthetic_registry(n_symbols)
+        symbols = list(registry.table['symbol'])
+        stooq = functools.partial(dashboard._stooq_rows, fetcher=MockStooqFetcher(latency))
+
+        def fetch_stooq(symbols=symbols, registry=registry, stooq=stooq):
+            return dashboard.fetch_market_rows(symbols, [('Stooq', stooq)], registry=registry)
+
+        def fetch_yahoo(symbols=symbols, registry=registry):
+            with patched(dashboard, 'download_yahoo_bars', mock_yahoo_download(latency)):
+                return dashboard.get_crypto_data_yahoo(symbols, registry=registry)
+
+        def fetch_sample(symbols=symbols, registry=registry):
+            return dashboard.get_sample_crypto_data(symbols, registry)
+
+        params = {'symbols': n_symbols, 'latency': latency}
+        yield ('fetch_stooq', params, fetch_stooq)
+        yield ('fetch_yahoo', params, fetch_yahoo)
+        yield ('fetch_sample', {'symbols': n_symbols}, fetch_sample)
+
+        table = fetch_sample()
+        yield ('market_cap_format', {'rows': n_symbols},
+               functools.partial(lambda table: table['Market Cap'].map(dashboard.format_compact_usd), table))
+        yield ('market_table_render', {'rows': n_symbols},
+               functools.partial(lambda table: dashboard.style_market_table(table).to_html(), table))
+
+    returns = synthetic_returns()
+    allocation = {'BTC': 0.4, 'ETH': 0.3, 'SOL': 0.2, 'DOT': 0.1}
+    yield ('calculate_risk_metrics', {'cache': 'cold', 'assets': RISK_ASSETS, 'days': RISK_DAYS},
+           lambda: dashboard.calculate_risk_metrics('Aggressive', allocation, dashboard.RiskModel(returns)))
+    warm_model = dashboard.RiskModel(returns)
+    yield ('calculate_risk_metrics', {'cache': 'warm', 'assets': RISK_ASSETS, 'days': RISK_DAYS},
+           lambda: dashboard.calculate_risk_metrics('Aggressive', allocation, warm_model))
+    _, mean, cov = warm_model.window_stats(dashboard.RISK_WINDOW_DAYS)
+    yield ('efficient_frontier', {'assets': RISK_ASSETS, 'points': dashboard.FRONTIER_POINTS},
+           functools.partial(dashboard.efficient_frontier, mean.to_numpy(), cov.to_numpy(), *FRONTIER_BOUNDS))
+
+    # One quote refresh for every symbol against a full book of alerts that stay armed
+    engine = dashboard.AlertEngine(None, autostart=False)
+    rng = np.random.default_rng(0)
+    alert_symbols = [f"SYM{i}" for i in range(ALERT_SYMBOLS)]
+    for i, threshold in enumerate(rng.uniform(0.5, 1.5, ALERT_COUNT)):
+        kind = 'Price above' if threshold > 1 else 'Price below'
+        engine.add('benchmark', alert_symbols[i % ALERT_SYMBOLS], kind, 100.0 * threshold)
+    engine.check({symbol: {'Price': 100.0} for symbol in alert_symbols})
+    quotes = {symbol: {'Price': price, '1h %': 0.0} for symbol, price in zip(alert_symbols, rng.uniform(99.9, 100.1, ALERT_SYMBOLS))}
+    yield ('alert_check', {'alerts': ALERT_COUNT, 'symbols': ALERT_SYMBOLS},
+           functools.partial(engine.check, quotes))
+
+def case_id(name, params):
+    return name + '[' + ','.join(f"{key}={value}" for key, value in sorted(params.items())) + ']'
+
+def run(repeat=DEFAULT_REPEAT, latency=MOCK_LATENCY, only=None):
+    results = []
+    for name, params, fn in benchmark_cases(latency):
+        if only and only not in name:
+            continue
+        timings = measure(fn, repeat)
+        result = {
+            'id': case_id(name, params),
+            'name': name,
+            'params': params,
+            'runs': len(timings),
+            'min': min(timings),
+            'median': statistics.median(timings),
+            'mean': statistics.fmean(timings)
+        }
+        results.append(result)
+        print(f"{result['id']:<70} median {result['median'] * 1000:10.2f} ms", file=sys.stderr)
+    return {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'repeat': repeat,
+            'latency': latency
+        },
+        'results': results
+    }
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Benchmarks whose median regressed by more than tolerance against baseline"""
+    previous = {result['id']: result for result in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        before = previous.get(result['id'])
+        if before and result['median'] > before['median'] * (1 + tolerance):
+            regressions.append((result['id'], before['median'], result['median']))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="CryptoMatrix offline benchmark suite")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--latency', type=float, default=MOCK_LATENCY, help="mock upstream latency in seconds")
+    parser.add_argument('--only', help="run only benchmarks whose name contains this")
+    parser.add_argument('--output', help="write the JSON report here instead of stdout")
+    parser.add_argument('--compare', help="baseline JSON report to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    report = run(args.repeat, args.latency, args.only)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for case, before, after in regressions:
+            print(f"REGRESSION {case}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -2,20 +2,49 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import yfinance as yf
+import os
+import re
+import importlib.util
+import time
+import math
+import threading
+import functools
+import itertools
+import contextlib
+import io
+import html
+import tempfile
+import zipfile
+import cProfile
+import pstats
+import json
+import socket
+import http.client
+import urllib.parse
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
 import warnings
 warnings.filterwarnings('ignore')
 
-# Import StooqDataFetcher
-try:
-    from pystooq import StooqDataFetcher
-    STOOQ_AVAILABLE = True
-except ImportError:
-    STOOQ_AVAILABLE = False
+# Provider libraries are imported on first use; only check that pystooq exists
+STOOQ_AVAILABLE = importlib.util.find_spec('pystooq') is not None
+if not STOOQ_AVAILABLE:
     print("Warning: pystooq not installed. Install with: pip install pystooq")
 
-# Page configuration with dark theme
-st.set_page_config(
+def _yfinance():
+    """yfinance, imported on first use"""
+    import yfinance
+    return yfinance
+
+def _stooq_fetcher():
+    """A pystooq StooqDataFetcher, imported on first use"""
+    from pystooq import StooqDataFetcher
+    return StooqDataFetcher()
+
+# Page configuration with dark theme; applied in main() so the data
+# functions can be imported without a Streamlit page (see data_service.py)
+PAGE_CONFIG = dict(
     page_title="CryptoMatrix Dashboard",
     page_icon="🌐",
     layout="wide",
@@ -23,7 +52,7 @@ st.set_page_config(
 )
 
 # Enhanced Responsive CSS with Fluid Typography and Improved Sidebar
-st.markdown("""
+PAGE_STYLE = """
 <style>
 :root {
     /* Responsive Typography Base */
@@ -680,351 +709,3663 @@ body {
     }
 }
 </style>
-""", unsafe_allow_html=True)
-
-# Initialize session state
-if 'portfolio_allocation' not in st.session_state:
-    st.session_state.portfolio_allocation = {
-        'Conservative': {'BTC': 0.30, 'ETH': 0.40, 'USDT': 0.20, 'ADA': 0.10},
-        'Moderate': {'BTC': 0.50, 'ETH': 0.30, 'BNB': 0.10, 'XRP': 0.10},
-        'Aggressive': {'BTC': 0.40, 'ETH': 0.25, 'SOL': 0.20, 'DOT': 0.15}
-    }
+"""
 
-if 'backtest_results' not in st.session_state:
-    st.session_state.backtest_results = None
+@functools.lru_cache(maxsize=1)
+def compiled_stylesheet():
+    """PAGE_STYLE with comments and redundant whitespace stripped, built once per process.
 
-# Enhanced data fetching with Stooq integration
-def get_crypto_data_stooq():
-    """Get cryptocurrency data using Stooq with Yahoo Finance fallback"""
-    
-    # Crypto symbol mappings for Stooq
-    stooq_symbols = {
-        'BTC': 'BTCUSD',
-        'ETH': 'ETHUSD', 
-        'USDT': 'USDTUSD',
-        'BNB': 'BNBUSD',
-        'SOL': 'SOLUSD',
-        'XRP': 'XRPUSD',
-        'ADA': 'ADAUSD',
-        'DOGE': 'DOGEUSD',
-        'DOT': 'DOTUSD',
-        'LTC': 'LTCUSD'
-    }
-    
-    crypto_names = ['Bitcoin', 'Ethereum', 'Tether', 'BNB', 'Solana', 'XRP', 
-                   'Cardano', 'Dogecoin', 'Polkadot', 'Litecoin']
-    
-    data = []
-    
-    if STOOQ_AVAILABLE:
+    Streamlit drops elements a rerun does not re-send, so the stylesheet
+    still goes out on every rerun; it is just much smaller.
+    """
+    css = re.sub(r'/\*.*?\*/', '', PAGE_STYLE, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+def init_session_state():
+    """Initialize session state"""
+    if 'portfolio_allocation' not in st.session_state:
+        st.session_state.portfolio_allocation = {
+            'Conservative': {'BTC': 0.30, 'ETH': 0.40, 'USDT': 0.20, 'ADA': 0.10},
+            'Moderate': {'BTC': 0.50, 'ETH': 0.30, 'BNB': 0.10, 'XRP': 0.10},
+            'Aggressive': {'BTC': 0.40, 'ETH': 0.25, 'SOL': 0.20, 'DOT': 0.15}
+        }
+
+    if 'backtest_results' not in st.session_state:
+        st.session_state.backtest_results = None
+    if 'backtest_params' not in st.session_state:
+        st.session_state.backtest_params = None
+    if 'alert_owner' not in st.session_state:
+        st.session_state.alert_owner = uuid.uuid4().hex
+    if 'alerts_notified' not in st.session_state:
+        st.session_state.alerts_notified = set()
+    if 'alert_form_open' not in st.session_state:
+        st.session_state.alert_form_open = False
+    if 'report_job' not in st.session_state:
+        st.session_state.report_job = None
+    if 'report_form_open' not in st.session_state:
+        st.session_state.report_form_open = False
+
+# Rerun instrumentation
+METRICS_EXPORT_PATH = os.environ.get('CRYPTOMATRIX_METRICS_JSONL', '')  # append one JSON line per rerun
+METRICS_HISTORY = 50    # reruns kept per session for the debug panel
+PROFILE_TOP_N = 40      # functions listed in a profile capture
+
+try:
+    from pyinstrument import Profiler as PyInstrumentProfiler
+    PYINSTRUMENT_AVAILABLE = True
+except ImportError:
+    PYINSTRUMENT_AVAILABLE = False
+
+class RerunMetrics:
+    """Wall time and call counts per span, plus event counters, for one rerun.
+
+    Spans nest freely and a span's time includes its children. Threads
+    started by fetch_concurrently record into the rerun that started them.
+    """
+
+    def __init__(self):
+        self.started = datetime.now()
+        self.total = 0.0
+        self.spans = {}
+        self.counters = {}
+        self._clock = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name):
+        started = time.perf_counter()
         try:
-            fetcher = StooqDataFetcher()
-            
-            for i, (symbol, stooq_sym) in enumerate(stooq_symbols.items()):
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                calls, seconds = self.spans.get(name, (0, 0.0))
+                self.spans[name] = (calls + 1, seconds + elapsed)
+
+    def count(self, name, n=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def finish(self):
+        self.total = time.perf_counter() - self._clock
+        return self
+
+    def span_table(self):
+        rows = [
+            {'Span': name, 'Calls': calls, 'Total (ms)': seconds * 1000, 'Mean (ms)': seconds * 1000 / calls}
+            for name, (calls, seconds) in self.spans.items()
+        ]
+        return pd.DataFrame(rows, columns=['Span', 'Calls', 'Total (ms)', 'Mean (ms)']).sort_values(
+            'Total (ms)', ascending=False).set_index('Span')
+
+    def counter_table(self):
+        rows = [
+            {'Counter': name, 'Labels': ', '.join(f"{k}={v}" for k, v in labels), 'Count': n}
+            for (name, labels), n in sorted(self.counters.items())
+        ]
+        return pd.DataFrame(rows, columns=['Counter', 'Labels', 'Count'])
+
+    def to_json(self):
+        return {
+            'timestamp': self.started.isoformat(timespec='milliseconds'),
+            'total_ms': self.total * 1000,
+            'spans': {name: {'calls': calls, 'ms': seconds * 1000} for name, (calls, seconds) in self.spans.items()},
+            'counters': [{'name': name, 'labels': dict(labels), 'count': n} for (name, labels), n in self.counters.items()]
+        }
+
+@st.cache_resource(show_spinner=False)
+def _metrics_thread_local():
+    # Streamlit re-executes this module on every rerun, but cached objects
+    # such as the market data cache keep calling the first run's helpers;
+    # one shared thread-local keeps every run recording into the same place
+    return threading.local()
+
+_active_metrics = _metrics_thread_local()
+
+def current_metrics():
+    """RerunMetrics the calling thread records into, or None"""
+    return getattr(_active_metrics, 'metrics', None)
+
+def bind_metrics(metrics):
+    _active_metrics.metrics = metrics
+
+@contextlib.contextmanager
+def metric_span(name):
+    """Time the block into the current rerun's metrics; a no-op outside a rerun"""
+    metrics = current_metrics()
+    if metrics is None:
+        yield
+    else:
+        with metrics.span(name):
+            yield
+
+def count_metric(name, n=1, **labels):
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.count(name, n, **labels)
+
+def instrumented(name):
+    """Decorator recording each call of the function as a span"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with metric_span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+class MetricsAggregate:
+    """Process-wide totals over finished reruns, exported as Prometheus text"""
+
+    def __init__(self):
+        self.reruns = 0
+        self.rerun_seconds = 0.0
+        self.spans = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add(self, metrics):
+        with self._lock:
+            self.reruns += 1
+            self.rerun_seconds += metrics.total
+            for name, (calls, seconds) in metrics.spans.items():
+                total_calls, total_seconds = self.spans.get(name, (0, 0.0))
+                self.spans[name] = (total_calls + calls, total_seconds + seconds)
+            for key, n in metrics.counters.items():
+                self.counters[key] = self.counters.get(key, 0) + n
+
+    def to_prometheus(self):
+        with self._lock:
+            lines = [
+                '# HELP cryptomatrix_reruns_total Dashboard script reruns completed.',
+                '# TYPE cryptomatrix_reruns_total counter',
+                f'cryptomatrix_reruns_total {self.reruns}',
+                '# HELP cryptomatrix_rerun_seconds_total Wall time spent in reruns.',
+                '# TYPE cryptomatrix_rerun_seconds_total counter',
+                f'cryptomatrix_rerun_seconds_total {self.rerun_seconds:.6f}',
+                '# HELP cryptomatrix_span_seconds_total Wall time per instrumented span.',
+                '# TYPE cryptomatrix_span_seconds_total counter'
+            ]
+            lines += [f'cryptomatrix_span_seconds_total{{span="{name}"}} {seconds:.6f}'
+                      for name, (_, seconds) in sorted(self.spans.items())]
+            lines += ['# HELP cryptomatrix_span_calls_total Calls per instrumented span.',
+                      '# TYPE cryptomatrix_span_calls_total counter']
+            lines += [f'cryptomatrix_span_calls_total{{span="{name}"}} {calls}'
+                      for name, (calls, _) in sorted(self.spans.items())]
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f'# TYPE cryptomatrix_{name}_total counter')
+                lines += [f'cryptomatrix_{name}_total{_prometheus_labels(labels)} {n}'
+                          for (counter, labels), n in sorted(self.counters.items()) if counter == name]
+        return '\n'.join(lines) + '\n'
+
+@st.cache_resource
+def get_metrics_aggregate():
+    """Process-wide rerun metrics shared by every session"""
+    return MetricsAggregate()
+
+_metrics_export_lock = threading.Lock()
+
+def export_metrics_jsonl(metrics, path=METRICS_EXPORT_PATH):
+    """Append one rerun's metrics as a JSON line"""
+    if not path:
+        return
+    line = json.dumps(metrics.to_json())
+    with _metrics_export_lock:
+        with open(path, 'a') as f:
+            f.write(line + '\n')
+
+def request_profile():
+    """Button callback: callbacks run before the rerun they trigger, so that rerun is captured"""
+    st.session_state.profile_next_rerun = True
+
+def start_profiler():
+    """A started pyinstrument profiler when installed, else cProfile; None if one cannot start"""
+    # A rerun interrupted by st.rerun() never reaches finish_rerun()
+    leftover = getattr(_active_metrics, 'profiler', None)
+    if leftover is not None:
+        _active_metrics.profiler = None
+        profile_report(leftover)
+    try:
+        if PYINSTRUMENT_AVAILABLE:
+            profiler = PyInstrumentProfiler()
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+    except (RuntimeError, ValueError):
+        # Another session's capture already holds the interpreter's profiler
+        return None
+    _active_metrics.profiler = profiler
+    return profiler
+
+def finish_rerun(metrics, profiler=None):
+    """Close a rerun's metrics: aggregate, export and keep them in the session history"""
+    metrics.finish()
+    bind_metrics(None)
+    get_metrics_aggregate().add(metrics)
+    try:
+        export_metrics_jsonl(metrics)
+    except OSError:
+        pass
+    history = st.session_state.setdefault('rerun_history', [])
+    history.append(metrics.to_json())
+    del history[:-METRICS_HISTORY]
+    if profiler is not None:
+        _active_metrics.profiler = None
+        st.session_state.last_profile = profile_report(profiler)
+
+def render_debug_panel(metrics):
+    """Timings and counters for the rerun that just finished"""
+    st.markdown('<div class="section-header">🛠️ RERUN DIAGNOSTICS</div>', unsafe_allow_html=True)
+    counters = metrics.counter_table()
+    upstream = counters.loc[counters['Counter'] == 'upstream_requests', 'Count'].sum()
+    cache_requests = counters[counters['Counter'] == 'cache_requests']
+    cache_hits = cache_requests.loc[~cache_requests['Labels'].str.contains('result=miss'), 'Count'].sum()
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Rerun Time", f"{metrics.total * 1000:,.0f} ms")
+    with col2:
+        st.metric("Upstream Requests", f"{upstream:,}")
+    with col3:
+        ratio = cache_hits / cache_requests['Count'].sum() * 100 if len(cache_requests) else 0.0
+        st.metric("Cache Hit Rate", f"{ratio:.0f}%")
+
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        st.dataframe(metrics.span_table().style.format({'Total (ms)': '{:,.1f}', 'Mean (ms)': '{:,.2f}'}),
+                     use_container_width=True)
+    with col2:
+        st.dataframe(counters, use_container_width=True, hide_index=True)
+
+    history = pd.DataFrame(st.session_state.get('rerun_history', []))
+    if len(history) > 1:
+        st.line_chart(history.set_index('timestamp')['total_ms'], use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("⬇️ PROMETHEUS METRICS", get_metrics_aggregate().to_prometheus(),
+                           file_name='cryptomatrix_metrics.prom', mime='text/plain')
+    with col2:
+        jsonl = '\n'.join(json.dumps(record) for record in st.session_state.get('rerun_history', []))
+        st.download_button("⬇️ SESSION RERUNS (JSONL)", jsonl, file_name='cryptomatrix_reruns.jsonl',
+                           mime='application/x-ndjson')
+
+    profile = st.session_state.get('last_profile')
+    if profile:
+        with st.expander("🔬 PROFILE OF THE CAPTURED RERUN"):
+            st.code(profile, language=None)
+
+def profile_report(profiler, top_n=PROFILE_TOP_N):
+    """Stop profiler and return its report as text"""
+    if PYINSTRUMENT_AVAILABLE and isinstance(profiler, PyInstrumentProfiler):
+        profiler.stop()
+        return profiler.output_text(unicode=True)
+    profiler.disable()
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(top_n)
+    return output.getvalue()
+
+# Concurrent fetch engine settings
+FETCH_MAX_WORKERS = 8          # upper bound on simultaneous upstream requests
+FETCH_SYMBOL_TIMEOUT = 10.0    # seconds a single symbol may take once started
+FETCH_DEADLINE = 20.0          # seconds for the whole batch
+
+def fetch_concurrently(fetch_fn, items, max_workers=None, symbol_timeout=None, deadline=None):
+    """Run fetch_fn over items on a bounded thread pool.
+
+    Returns a list aligned with items holding each result, or None for items
+    that raised, exceeded their per-symbol timeout or missed the overall
+    deadline. Worker threads that are still blocked on the network are left
+    to finish in the background; their results are discarded.
+    """
+    items = list(items)
+    if not items:
+        return []
+    max_workers = max_workers or FETCH_MAX_WORKERS
+    symbol_timeout = symbol_timeout if symbol_timeout is not None else FETCH_SYMBOL_TIMEOUT
+    deadline = deadline if deadline is not None else FETCH_DEADLINE
+
+    started_at = {}
+    metrics = current_metrics()
+
+    def run(index, item):
+        started_at[index] = time.monotonic()
+        bind_metrics(metrics)
+        return fetch_fn(item)
+
+    results = [None] * len(items)
+    batch_start = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(items)))
+    futures = {executor.submit(run, i, item): i for i, item in enumerate(items)}
+    pending = set(futures)
+    try:
+        while pending:
+            now = time.monotonic()
+            remaining = deadline - (now - batch_start)
+            if remaining <= 0:
+                break
+            # Drop symbols that have been running longer than their own budget
+            for future in list(pending):
+                begun = started_at.get(futures[future])
+                if begun is not None and now - begun > symbol_timeout:
+                    pending.discard(future)
+            if not pending:
+                break
+            done, pending = wait(pending, timeout=min(remaining, 0.25), return_when=FIRST_COMPLETED)
+            for future in done:
                 try:
-                    # Fetch data from Stooq
-                    df = fetcher.get_data(stooq_sym, start_date=datetime.now() - timedelta(days=30))
-                    
-                    if not df.empty:
-                        # Get the most recent data
-                        latest = df.iloc[-1]
-                        prev_day = df.iloc[-2] if len(df) > 1 else df.iloc[-1]
-                        
-                        # Calculate percentage changes
-                        price_change_1d = ((latest['Close'] - prev_day['Close']) / prev_day['Close']) * 100
-                        
-                        # Get 7-day change
-                        week_ago = df.iloc[-7] if len(df) >= 7 else df.iloc[0]
-                        price_change_7d = ((latest['Close'] - week_ago['Close']) / week_ago['Close']) * 100
-                        
-                        # Estimate 1-hour change (Stooq doesn't have hourly data)
-                        price_change_1h = price_change_1d * 0.1  # Rough estimate
-                        
-                        # Calculate market cap and volume (estimates for crypto)
-                        current_price = latest['Close']
-                        volume_24h = latest.get('Volume', 0)
-                        
-                        # Market cap estimates based on known values
-                        market_caps = {
-                            'BTC': current_price * 19_500_000,  # ~19.5M BTC
-                            'ETH': current_price * 120_000_000,  # ~120M ETH
-                            'USDT': 120_000_000_000,  # Stablecoin
-                            'BNB': current_price * 145_000_000,
-                            'SOL': current_price * 400_000_000,
-                            'XRP': current_price * 50_000_000_000,
-                            'ADA': current_price * 35_000_000_000,
-                            'DOGE': current_price * 140_000_000_000,
-                            'DOT': current_price * 1_100_000_000,
-                            'LTC': current_price * 70_000_000
-                        }
-                        
-                        market_cap = market_caps.get(symbol, 0)
-                        
-                        data.append({
-                            'Name': crypto_names[i],
-                            'Symbol': symbol,
-                            'Price': current_price,
-                            '1h %': price_change_1h,
-                            '24h %': price_change_1d,
-                            '7d %': price_change_7d,
-                            'Market Cap': f"${market_cap/1e9:.2f}B" if market_cap >= 1e9 else f"${market_cap/1e6:.2f}M",
-                            'Volume (24h)': f"${volume_24h/1e9:.2f}B" if volume_24h >= 1e9 else f"${volume_24h/1e6:.2f}M"
-                        })
-                    else:
-                        # Fallback to sample data for this symbol
-                        sample_data = get_sample_crypto_data()
-                        if i < len(sample_data):
-                            data.append(sample_data.iloc[i].to_dict())
-                            
+                    results[futures[future]] = future.result()
                 except Exception:
-                    # Fallback to sample data for this symbol
-                    sample_data = get_sample_crypto_data()
-                    if i < len(sample_data):
-                        data.append(sample_data.iloc[i].to_dict())
-            
-            if data:
-                return pd.DataFrame(data)
-                
+                    results[futures[future]] = None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+# Process-wide market data cache
+MARKET_DATA_TTL = {
+    'quotes': 60,           # assembled market table and latest daily bars
+    'history_7d': 15 * 60,  # daily bars behind the 24h / 7d changes
+    'intraday': 5 * 60      # hourly bars behind the 1h change
+}
+MARKET_DATA_MAX_STALE = 10  # serve stale data for up to this many TTLs while refreshing
+
+class MarketDataCache:
+    """Thread-safe TTL cache with stale-while-revalidate semantics.
+
+    Fresh entries are returned directly. Entries past their TTL but younger
+    than MARKET_DATA_MAX_STALE TTLs are returned immediately while a single
+    background thread reloads them. Misses are single-flight: concurrent
+    sessions asking for the same key wait on one upstream load.
+    """
+
+    def __init__(self, ttls=None, max_stale=MARKET_DATA_MAX_STALE):
+        self.ttls = dict(MARKET_DATA_TTL if ttls is None else ttls)
+        self.max_stale = max_stale
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'loads': 0, 'errors': 0}
+        self._entries = {}
+        self._inflight = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, kind, key, loader):
+        cache_key = (kind, key)
+        ttl = self.ttls.get(kind, 0)
+        while True:
+            with self._lock:
+                entry = self._entries.get(cache_key)
+                if entry is not None:
+                    value, loaded_at = entry
+                    age = time.monotonic() - loaded_at
+                    if age <= ttl:
+                        self.stats['hits'] += 1
+                        count_metric('cache_requests', kind=kind, result='hit')
+                        return value
+                    if age <= ttl * self.max_stale:
+                        self.stats['stale_hits'] += 1
+                        count_metric('cache_requests', kind=kind, result='stale')
+                        if cache_key not in self._inflight:
+                            self._inflight[cache_key] = threading.Event()
+                            threading.Thread(
+                                target=self._load,
+                                args=(cache_key, loader, self._generation),
+                                daemon=True
+                            ).start()
+                        return value
+                event = self._inflight.get(cache_key)
+                if event is None:
+                    event = self._inflight[cache_key] = threading.Event()
+                    self.stats['misses'] += 1
+                    count_metric('cache_requests', kind=kind, result='miss')
+                    generation = self._generation
+                    owner = True
+                else:
+                    owner = False
+
+            if owner:
+                return self._load(cache_key, loader, generation, raise_errors=True)
+
+            # Another session is already loading this key; share its result
+            event.wait()
+            with self._lock:
+                entry = self._entries.get(cache_key)
+            if entry is not None:
+                return entry[0]
+
+    def _load(self, cache_key, loader, generation, raise_errors=False):
+        try:
+            value = loader()
         except Exception:
-            pass
-    
-    # Fallback to Yahoo Finance if Stooq fails
-    return get_crypto_data_yahoo()
+            with self._lock:
+                self.stats['errors'] += 1
+            if raise_errors:
+                raise
+            return None
+        else:
+            with self._lock:
+                # Drop results that were started before an invalidate()
+                if generation == self._generation:
+                    now = time.monotonic()
+                    self._entries[cache_key] = (value, now)
+                    self.stats['loads'] += 1
+                    self._prune_locked(now)
+            return value
+        finally:
+            with self._lock:
+                event = self._inflight.pop(cache_key, None)
+            if event is not None:
+                event.set()
 
-def get_crypto_data_yahoo():
-    """Get cryptocurrency data using Yahoo Finance as fallback"""
-    crypto_symbols = ['BTC-USD', 'ETH-USD', 'USDT-USD', 'BNB-USD', 'SOL-USD', 
-                      'XRP-USD', 'ADA-USD', 'DOGE-USD', 'DOT-USD', 'LTC-USD']
-    crypto_names = ['Bitcoin', 'Ethereum', 'Tether', 'BNB', 'Solana', 'XRP', 
-                   'Cardano', 'Dogecoin', 'Polkadot', 'Litecoin']
-    
-    try:
-        tickers = yf.Tickers(' '.join(crypto_symbols))
-        data = []
-        
-        for i, symbol in enumerate(crypto_symbols):
+    def _prune_locked(self, now):
+        # Entries too old to be served even as stale are dead weight; with
+        # one entry per table page they would otherwise accumulate forever
+        expired = [
+            cache_key for cache_key, (_, loaded_at) in self._entries.items()
+            if now - loaded_at > self.ttls.get(cache_key[0], 0) * self.max_stale
+        ]
+        for cache_key in expired:
+            del self._entries[cache_key]
+
+    def invalidate(self, kind=None):
+        """Drop every entry, or only entries of one data kind"""
+        with self._lock:
+            self._generation += 1
+            if kind is None:
+                self._entries.clear()
+            else:
+                for cache_key in [k for k in self._entries if k[0] == kind]:
+                    del self._entries[cache_key]
+
+@st.cache_resource
+def get_market_data_cache():
+    """Single MarketDataCache shared by every session in this server process"""
+    return MarketDataCache()
+
+def _cached(cache, kind, key, loader):
+    """Route an upstream call through the cache when one is supplied"""
+    if cache is None:
+        return loader()
+    return cache.get(kind, key, loader)
+
+def get_market_data(symbols=None, cache=None, store=None, registry=None, sources=None):
+    """Market table rows for symbols (default: the built-in coins), served from the shared cache"""
+    cache = cache or get_market_data_cache()
+    store = store or get_ohlcv_store()
+    registry = registry or get_symbol_registry()
+    sources = sources or get_source_manager()
+    symbols = tuple(STOOQ_SYMBOLS if symbols is None else symbols)
+    return cache.get('quotes', ('market_table',) + symbols,
+                     lambda: get_crypto_data_stooq(symbols, cache, store, registry, sources))
+
+# Persistent OHLCV store
+OHLCV_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'ohlcv')
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+OHLCV_COLD_START_DAYS = 30  # history requested for a symbol the store has never seen
+
+class OHLCVStore:
+    """Daily OHLCV bars on disk, one Parquet file per symbol.
+
+    Symbols are the keys of STOOQ_SYMBOLS, so Stooq and Yahoo bars for the
+    same coin land in the same file. Writers only fetch bars from the last
+    stored date onwards; that last bar is re-fetched because the current
+    day's candle is still forming. coverage.json next to the files records
+    what downloads have established beyond the bars themselves: a symbol's
+    inception (no bars exist before it) and the day its tail was last
+    checked, so symbols a provider has nothing more for are not requested
+    again and again.
+    """
+
+    def __init__(self, root=OHLCV_STORE_DIR):
+        self.root = root
+        self._frames = {}
+        self._coverage = None
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def path(self, symbol):
+        return os.path.join(self.root, f"{symbol}.parquet")
+
+    def _symbol_lock(self, symbol):
+        with self._lock:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def _read(self, symbol):
+        frame = self._frames.get(symbol)
+        if frame is None:
+            path = self.path(symbol)
+            if os.path.exists(path):
+                frame = pd.read_parquet(path)
+            else:
+                frame = pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], name='Date'), dtype=float)
+            self._frames[symbol] = frame
+        return frame
+
+    def load(self, symbol, start=None):
+        """Stored bars for symbol, optionally from start onwards"""
+        with self._symbol_lock(symbol):
+            frame = self._read(symbol)
+        if start is not None:
+            frame = frame.loc[frame.index >= pd.Timestamp(start)]
+        return frame
+
+    def first_timestamp(self, symbol):
+        frame = self.load(symbol)
+        return frame.index[0] if len(frame) else None
+
+    def last_timestamp(self, symbol):
+        frame = self.load(symbol)
+        return frame.index[-1] if len(frame) else None
+
+    def _coverage_path(self):
+        return os.path.join(self.root, 'coverage.json')
+
+    def _read_coverage(self):
+        if self._coverage is None:
             try:
-                ticker = tickers.tickers[symbol]
-                info = ticker.info
-                
-                # Get current price and changes
-                hist = ticker.history(period="2d")
-                if len(hist) >= 2:
-                    current_price = hist['Close'].iloc[-1]
-                    prev_price = hist['Close'].iloc[-2]
-                    price_change_1d = ((current_price - prev_price) / prev_price) * 100
-                else:
-                    current_price = info.get('currentPrice', 0)
-                    price_change_1d = info.get('regularMarketChangePercent', 0)
-                
-                # Get other data
-                market_cap = info.get('marketCap', 0)
-                volume_24h = info.get('volume24Hr', 0)
-                
-                # Get 7-day data
-                hist_7d = ticker.history(period="7d")
-                if len(hist_7d) >= 7:
-                    price_7d_ago = hist_7d['Close'].iloc[0]
-                    price_change_7d = ((current_price - price_7d_ago) / price_7d_ago) * 100
-                else:
-                    price_change_7d = price_change_1d * 3
-                
-                # Get 1-hour change
-                hist_1h = ticker.history(period="1d", interval="1h")
-                if len(hist_1h) >= 2:
-                    price_change_1h = ((hist_1h['Close'].iloc[-1] - hist_1h['Close'].iloc[-2]) / hist_1h['Close'].iloc[-2]) * 100
-                else:
-                    price_change_1h = price_change_1d * 0.1
-                
-                data.append({
-                    'Name': crypto_names[i],
-                    'Symbol': symbol.replace('-USD', ''),
-                    'Price': current_price,
-                    '1h %': price_change_1h,
-                    '24h %': price_change_1d,
-                    '7d %': price_change_7d,
-                    'Market Cap': f"${market_cap/1e9:.2f}B" if market_cap >= 1e9 else f"${market_cap/1e6:.2f}M",
-                    'Volume (24h)': f"${volume_24h/1e9:.2f}B" if volume_24h >= 1e9 else f"${volume_24h/1e6:.2f}M"
-                })
-                
-            except Exception:
-                sample_data = get_sample_crypto_data()
-                if i < len(sample_data):
-                    data.append(sample_data.iloc[i].to_dict())
-        
-        if data:
-            return pd.DataFrame(data)
-            
-    except Exception:
-        pass
-    
-    return get_sample_crypto_data()
+                with open(self._coverage_path()) as f:
+                    self._coverage = {
+                        symbol: {field: pd.Timestamp(date) for field, date in fields.items()}
+                        for symbol, fields in json.load(f).items()
+                    }
+            except (OSError, ValueError, AttributeError):
+                self._coverage = {}
+        return self._coverage
 
-def get_sample_crypto_data():
-    """Sample cryptocurrency data as fallback"""
-    crypto_data = {
-        'Name': ['Bitcoin', 'Ethereum', 'Tether', 'BNB', 'Solana', 'XRP', 'Cardano', 'Dogecoin', 'Polkadot', 'Litecoin'],
-        'Symbol': ['BTC', 'ETH', 'USDT', 'BNB', 'SOL', 'XRP', 'ADA', 'DOGE', 'DOT', 'LTC'],
-        'Price': [90145.32, 3108.57, 1.00, 895.62, 289.45, 0.78, 0.62, 0.23, 8.95, 89.45],
-        '1h %': [-0.09, -0.01, -0.00, 0.32, 1.25, 0.45, 0.67, 0.89, 0.32, 0.56],
-        '24h %': [0.18, 1.15, -0.00, 2.18, 3.45, 1.23, 2.34, 3.21, 1.89, 1.45],
-        '7d %': [0.74, 2.29, -0.00, 0.31, 15.67, 5.43, 8.92, 12.34, 6.78, 4.56],
-        'Market Cap': ['$1.80T', '$375.30B', '$186.26B', '$123.36B', '$129.45B', '$45.67B', '$21.45B', '$32.89B', '$12.34B', '$6.78B'],
-        'Volume (24h)': ['$65.42B', '$10.17B', '$47.51B', '$1.49B', '$3.45B', '$2.34B', '$0.89B', '$1.23B', '$0.56B', '$0.78B']
-    }
-    return pd.DataFrame(crypto_data)
+    def _covered(self, symbol, field):
+        with self._lock:
+            return self._read_coverage().get(symbol, {}).get(field)
 
-# Risk metrics calculation
-def calculate_risk_metrics(portfolio_type, allocation):
-    risk_metrics = {
-        'Conservative': {
-            'Expected Return': 8.5,
-            'Volatility': 12.3,
-            'Sharpe Ratio': 0.69,
-            'Max Drawdown': 15.7,
-            'VaR (95%)': 5.2
-        },
-        'Moderate': {
-            'Expected Return': 12.8,
-            'Volatility': 18.5,
-            'Sharpe Ratio': 0.72,
-            'Max Drawdown': 22.4,
-            'VaR (95%)': 8.7
-        },
-        'Aggressive': {
-            'Expected Return': 18.2,
-            'Volatility': 28.9,
-            'Sharpe Ratio': 0.68,
-            'Max Drawdown': 35.6,
-            'VaR (95%)': 14.3
+    def _set_covered(self, symbol, field, date):
+        with self._lock:
+            coverage = self._read_coverage()
+            coverage.setdefault(symbol, {})[field] = pd.Timestamp(date).normalize()
+            os.makedirs(self.root, exist_ok=True)
+            tmp_path = f"{self._coverage_path()}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    key: {name: value.date().isoformat() for name, value in fields.items()}
+                    for key, fields in coverage.items()
+                }, f)
+            os.replace(tmp_path, self._coverage_path())
+
+    def inception(self, symbol):
+        """Date before which a download found no bars for symbol, if one has"""
+        return self._covered(symbol, 'inception')
+
+    def set_inception(self, symbol, date):
+        """Remember that symbol has no bars before date, so backfills stop there"""
+        self._set_covered(symbol, 'inception', date)
+
+    def checked(self, symbol):
+        """Day symbol's tail was last brought as far up to date as the provider allows"""
+        return self._covered(symbol, 'checked')
+
+    def set_checked(self, symbol, date):
+        self._set_covered(symbol, 'checked', date)
+
+    def append(self, symbol, bars):
+        """Merge new bars into the symbol's file; later bars win on duplicate dates"""
+        bars = normalize_ohlcv(bars)
+        if bars.empty:
+            return self.load(symbol)
+        with self._symbol_lock(symbol):
+            frame = self._read(symbol)
+            merged = pd.concat([frame, bars]) if len(frame) else bars
+            merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+            os.makedirs(self.root, exist_ok=True)
+            tmp_path = f"{self.path(symbol)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            merged.to_parquet(tmp_path)
+            os.replace(tmp_path, self.path(symbol))
+            self._frames[symbol] = merged
+        return merged
+
+    def fetch_start(self, symbol, cold_start_days=OHLCV_COLD_START_DAYS):
+        """First date a fetcher must request to bring symbol up to date"""
+        last = self.last_timestamp(symbol)
+        if last is None:
+            return datetime.now() - timedelta(days=cold_start_days)
+        return last.to_pydatetime()
+
+    def update(self, symbol, fetch_fn, cold_start_days=OHLCV_COLD_START_DAYS):
+        """Call fetch_fn(start) for the missing bars only and store them"""
+        return self.append(symbol, fetch_fn(self.fetch_start(symbol, cold_start_days)))
+
+    def load_closes(self, symbols, start=None, end=None):
+        """Close prices for several symbols aligned on one date index"""
+        closes = {}
+        for symbol in symbols:
+            frame = self.load(symbol, start)
+            if end is not None:
+                frame = frame.loc[frame.index <= pd.Timestamp(end)]
+            closes[symbol] = frame['Close']
+        return pd.DataFrame(closes)
+
+def normalize_ohlcv(bars):
+    """Coerce provider output to a Date-indexed frame of OHLCV_COLUMNS"""
+    if bars is None or len(bars) == 0:
+        return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], name='Date'), dtype=float)
+    if 'Date' in bars.columns:
+        bars = bars.set_index('Date')
+    bars = bars.reindex(columns=OHLCV_COLUMNS).astype(float)
+    index = pd.DatetimeIndex(bars.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    bars.index = index.normalize().rename('Date')
+    return bars.dropna(subset=['Close'])
+
+@st.cache_resource
+def get_ohlcv_store():
+    """Single OHLCVStore shared by every session in this server process"""
+    return OHLCVStore()
+
+# Enhanced data fetching with Stooq integration
+# Built-in universe: the coins the portfolio strategies trade, and the
+# registry used when no symbol file is present
+BUILTIN_SYMBOLS = [
+    # symbol, name, approximate circulating supply (for market cap estimates)
+    ('BTC', 'Bitcoin', 19_500_000),
+    ('ETH', 'Ethereum', 120_000_000),
+    ('USDT', 'Tether', 120_000_000_000),
+    ('BNB', 'BNB', 145_000_000),
+    ('SOL', 'Solana', 400_000_000),
+    ('XRP', 'XRP', 50_000_000_000),
+    ('ADA', 'Cardano', 35_000_000_000),
+    ('DOGE', 'Dogecoin', 140_000_000_000),
+    ('DOT', 'Polkadot', 1_100_000_000),
+    ('LTC', 'Litecoin', 70_000_000)
+]
+
+STOOQ_SYMBOLS = {symbol: f"{symbol}USD" for symbol, _, _ in BUILTIN_SYMBOLS}
+
+# Symbol registry
+SYMBOL_REGISTRY_PATH = os.environ.get(
+    'CRYPTOMATRIX_SYMBOLS',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'symbols.csv')
+)
+REGISTRY_SORT_KEYS = ['Rank', 'Name', 'Symbol']
+MARKET_PAGE_SIZES = [25, 50, 100, 250]
+
+class SymbolRegistry:
+    """The asset universe, one row per symbol.
+
+    Columns are symbol, name, stooq and yahoo tickers, circulating supply and
+    rank; everything but symbol is optional in a registry file. Sort orders
+    and the search text are computed once, so filtering and paging thousands
+    of assets never touches market data.
+    """
+
+    def __init__(self, table):
+        table = pd.DataFrame(table).copy()
+        table['symbol'] = table['symbol'].astype(str).str.strip().str.upper()
+        table = table.drop_duplicates('symbol').reset_index(drop=True)
+
+        def column(name, default):
+            if name not in table:
+                return default
+            return table[name].where(table[name].notna(), default)
+
+        table['name'] = column('name', table['symbol']).astype(str)
+        table['stooq'] = column('stooq', table['symbol'] + 'USD')
+        table['yahoo'] = column('yahoo', table['symbol'] + '-USD')
+        table['supply'] = pd.to_numeric(column('supply', pd.Series(0.0, index=table.index)), errors='coerce').fillna(0.0)
+        default_rank = pd.Series(np.arange(1, len(table) + 1), index=table.index)
+        table['rank'] = pd.to_numeric(column('rank', default_rank), errors='coerce').fillna(default_rank)
+        self.table = table[['symbol', 'name', 'stooq', 'yahoo', 'supply', 'rank']]
+
+        self._position = pd.Series(np.arange(len(table)), index=table['symbol'])
+        self._search = (table['symbol'].str.lower() + ' ' + table['name'].str.lower()).to_numpy()
+        self._orders = {
+            'Rank': np.argsort(table['rank'].to_numpy(), kind='stable'),
+            'Name': np.argsort(table['name'].str.lower().to_numpy(), kind='stable'),
+            'Symbol': np.argsort(table['symbol'].to_numpy(), kind='stable')
         }
+
+    @classmethod
+    def from_file(cls, path):
+        """Load a registry from a CSV file or a JSON list of records"""
+        if path.lower().endswith('.json'):
+            table = pd.read_json(path, orient='records')
+        else:
+            table = pd.read_csv(path)
+        table.columns = [str(col).strip().lower() for col in table.columns]
+        return cls(table)
+
+    def __len__(self):
+        return len(self.table)
+
+    def __contains__(self, symbol):
+        return symbol in self._position.index
+
+    def lookup(self, symbols, field):
+        """field ('name', 'stooq', 'yahoo', 'supply', 'rank') for each symbol"""
+        positions = self._position.reindex(symbols)
+        values = self.table[field].to_numpy()
+        return [values[int(pos)] if pd.notna(pos) else None for pos in positions]
+
+    def query(self, search='', sort='Rank', ascending=True):
+        """Row positions matching search (symbol or name substring), in sort order"""
+        order = self._orders[sort]
+        if not ascending:
+            order = order[::-1]
+        search = search.strip().lower()
+        if search:
+            matches = np.fromiter((search in text for text in self._search), dtype=bool, count=len(self._search))
+            order = order[matches[order]]
+        return order
+
+    def page(self, positions, page, page_size):
+        """Symbols on a 1-based page of query() positions"""
+        start = (page - 1) * page_size
+        return self.table['symbol'].to_numpy()[positions[start:start + page_size]].tolist()
+
+BUILTIN_REGISTRY = SymbolRegistry(pd.DataFrame(BUILTIN_SYMBOLS, columns=['symbol', 'name', 'supply']))
+
+def load_symbol_registry(path=SYMBOL_REGISTRY_PATH):
+    """Registry from path when it exists and parses, else the built-in coins"""
+    if path and os.path.exists(path):
+        try:
+            registry = SymbolRegistry.from_file(path)
+            if len(registry):
+                return registry
+        except Exception:
+            pass
+    return BUILTIN_REGISTRY
+
+@st.cache_resource
+def get_symbol_registry():
+    """Process-wide symbol registry"""
+    return load_symbol_registry()
+
+# Data source health
+SOURCE_FAILURE_THRESHOLD = 2   # consecutive failed calls before a provider's breaker opens
+SOURCE_COOLDOWN = 120          # seconds an open breaker rejects calls before one probe
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one data provider.
+
+    closed: calls pass. After failure_threshold consecutive failures the
+    breaker opens and rejects calls for cooldown seconds; it then goes
+    half-open and lets exactly one probe call through. A successful probe
+    closes it, a failed one re-opens it for another cool-down.
+    """
+
+    def __init__(self, name, failure_threshold=SOURCE_FAILURE_THRESHOLD, cooldown=SOURCE_COOLDOWN):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.stats = {'successes': 0, 'failures': 0, 'rejected': 0}
+        self.last_error = None
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """'closed' for a normal call, 'probe' for the half-open probe, or None if rejected"""
+        with self._lock:
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = 'half_open'
+                return 'probe'
+            if self.state == 'closed':
+                return 'closed'
+            self.stats['rejected'] += 1
+            return None
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.consecutive_failures = 0
+            self.stats['successes'] += 1
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.stats['failures'] += 1
+            self.last_error = repr(error) if error is not None else 'no data returned'
+            if self.state == 'half_open' or self.consecutive_failures >= self.failure_threshold:
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+
+    def retry_in(self):
+        """Seconds until an open breaker allows its probe, else 0"""
+        with self._lock:
+            if self.state != 'open':
+                return 0.0
+            return max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+
+class SourceManager:
+    """Circuit breakers per provider plus per-symbol routing.
+
+    A provider that answers a batch but has nothing for a symbol is skipped
+    for that symbol for one cool-down, so the symbol goes straight to the
+    next provider. An empty answer only counts against the provider's
+    breaker when the batch held a symbol it has served before; symbols it
+    simply does not carry are misses, not outages. routes records which
+    source served each symbol last.
+    """
+
+    def __init__(self, providers=('Stooq', 'Yahoo'), failure_threshold=SOURCE_FAILURE_THRESHOLD,
+                 cooldown=SOURCE_COOLDOWN):
+        self.cooldown = cooldown
+        self.breakers = {name: CircuitBreaker(name, failure_threshold, cooldown) for name in providers}
+        self.routes = {}
+        self._served = {name: set() for name in providers}
+        self._symbol_misses = {}
+        self._lock = threading.Lock()
+
+    def eligible(self, provider, symbols):
+        """Symbols provider has not recently come back empty for"""
+        now = time.monotonic()
+        with self._lock:
+            return [symbol for symbol in symbols
+                    if now - self._symbol_misses.get((provider, symbol), -np.inf) >= self.cooldown]
+
+    def _probe_batches(self, provider, symbols):
+        """Split symbols into a one-symbol probe and the rest.
+
+        The probe is a symbol provider is known to serve when there is one,
+        so an unsupported symbol cannot keep a recovered provider open.
+        """
+        with self._lock:
+            served = self._served[provider]
+            probe = next((symbol for symbol in symbols if symbol in served), symbols[0])
+        return [[probe], [symbol for symbol in symbols if symbol != probe]]
+
+    def call(self, provider, symbols, fetch):
+        """Run fetch(symbols) -> {symbol: row} through provider's breaker.
+
+        A half-open breaker probes with one symbol alone, so a provider
+        that is still down costs one symbol's timeout per cool-down.
+        """
+        symbols = self.eligible(provider, symbols)
+        if not symbols:
+            return {}
+        breaker = self.breakers[provider]
+        mode = breaker.acquire()
+        if mode is None:
+            count_metric('breaker_rejections', source=provider)
+            return {}
+
+        rows = {}
+        batches = self._probe_batches(provider, symbols) if mode == 'probe' else [symbols]
+        for batch in batches:
+            if not batch:
+                continue
+            try:
+                result = fetch(batch) or {}
+            except Exception as e:
+                breaker.record_failure(e)
+                break
+            now = time.monotonic()
+            with self._lock:
+                served = self._served[provider]
+                known = any(symbol in served for symbol in batch)
+                for symbol in batch:
+                    if symbol in result:
+                        served.add(symbol)
+                        self._symbol_misses.pop((provider, symbol), None)
+                    else:
+                        self._symbol_misses[(provider, symbol)] = now
+            if not result and known:
+                breaker.record_failure()
+                break
+            breaker.record_success()
+            rows.update(result)
+        return rows
+
+    def record_routes(self, routes):
+        with self._lock:
+            self.routes.update(routes)
+
+    def health(self):
+        """One row per provider for the health panel"""
+        with self._lock:
+            served = pd.Series(self.routes, dtype=object).value_counts()
+            skipped = pd.Series([provider for provider, _ in self._symbol_misses], dtype=object).value_counts()
+        return pd.DataFrame([
+            {
+                'Source': name,
+                'State': breaker.state.replace('_', '-').upper(),
+                'Consecutive Failures': breaker.consecutive_failures,
+                'Successes': breaker.stats['successes'],
+                'Failures': breaker.stats['failures'],
+                'Rejected Calls': breaker.stats['rejected'],
+                'Symbols Served': int(served.get(name, 0)),
+                'Symbols Rerouted': int(skipped.get(name, 0)),
+                'Probe In (s)': round(breaker.retry_in()),
+                'Last Error': breaker.last_error or ''
+            }
+            for name, breaker in self.breakers.items()
+        ]).set_index('Source')
+
+@st.cache_resource
+def get_source_manager():
+    """Process-wide provider health, shared by every session"""
+    return SourceManager([name for name, _ in MARKET_PROVIDERS if name != 'Stooq' or STOOQ_AVAILABLE])
+
+def _load_stooq_bars(fetcher, symbol, stooq_sym, store=None):
+    """Last 30 days of Stooq bars, fetching only what the store is missing"""
+    month_ago = datetime.now() - timedelta(days=30)
+    count_metric('upstream_requests', source='stooq')
+    if store is None:
+        return fetcher.get_data(stooq_sym, start_date=month_ago)
+    store.update(symbol, lambda start: fetcher.get_data(stooq_sym, start_date=start))
+    return store.load(symbol, start=month_ago.date())
+
+def _fetch_stooq_row(fetcher, symbol, stooq_sym, name, supply, cache=None, store=None):
+    """Build one market table row from Stooq daily bars, or None if empty"""
+    # Fetch data from Stooq
+    df = _cached(
+        cache, 'history_7d', ('stooq', stooq_sym),
+        lambda: _load_stooq_bars(fetcher, symbol, stooq_sym, store)
+    )
+
+    if df.empty:
+        return None
+
+    # Get the most recent data
+    latest = df.iloc[-1]
+    prev_day = df.iloc[-2] if len(df) > 1 else df.iloc[-1]
+
+    # Calculate percentage changes
+    price_change_1d = ((latest['Close'] - prev_day['Close']) / prev_day['Close']) * 100
+
+    # Get 7-day change
+    week_ago = df.iloc[-7] if len(df) >= 7 else df.iloc[0]
+    price_change_7d = ((latest['Close'] - week_ago['Close']) / week_ago['Close']) * 100
+
+    # Estimate 1-hour change (Stooq doesn't have hourly data)
+    price_change_1h = price_change_1d * 0.1  # Rough estimate
+
+    # Calculate market cap and volume (estimates for crypto)
+    current_price = latest['Close']
+    volume_24h = latest.get('Volume', 0)
+
+    # Market cap estimates based on known values
+    market_cap = current_price * supply
+
+    return {
+        'Name': name or symbol,
+        'Symbol': symbol,
+        'Price': current_price,
+        '1h %': price_change_1h,
+        '24h %': price_change_1d,
+        '7d %': price_change_7d,
+        'Market Cap': float(market_cap),
+        'Volume (24h)': float(volume_24h)
     }
-    return risk_metrics.get(portfolio_type, {})
 
-# Portfolio backtesting
-def backtest_portfolio(portfolio_type, start_date, end_date, initial_investment, contribution_freq, contribution_amount, reinvest=True):
-    dates = pd.date_range(start=start_date, end=end_date, freq='D')
-    
-    if portfolio_type == 'Conservative':
-        daily_return_mean = 0.00035
-        daily_return_std = 0.015
-    elif portfolio_type == 'Moderate':
-        daily_return_mean = 0.00045
-        daily_return_std = 0.022
-    else:  # Aggressive
-        daily_return_mean = 0.00060
-        daily_return_std = 0.035
-    
-    np.random.seed(42)
-    returns = np.random.normal(daily_return_mean, daily_return_std, len(dates))
-    
-    portfolio_value = [initial_investment]
-    
-    for i in range(1, len(dates)):
-        add_contribution = False
-        if contribution_freq == 'Daily':
-            add_contribution = True
-        elif contribution_freq == 'Weekly' and dates[i].dayofweek == 0:
-            add_contribution = True
-        elif contribution_freq == 'Monthly' and dates[i].day == 1:
-            add_contribution = True
-        elif contribution_freq == 'Yearly' and dates[i].month == 1 and dates[i].day == 1:
-            add_contribution = True
-        
-        if add_contribution:
-            portfolio_value[i-1] += contribution_amount
-        
-        new_value = portfolio_value[i-1] * (1 + returns[i])
-        portfolio_value.append(new_value)
-    
-    results_df = pd.DataFrame({
-        'Date': dates,
-        'Portfolio Value': portfolio_value,
-        'Daily Return': np.insert(returns[1:], 0, 0)
+@instrumented('fetch.stooq')
+def _stooq_rows(symbols, cache=None, store=None, registry=None, fetcher=None):
+    """Stooq rows by symbol; symbols without Stooq bars are left out"""
+    registry = registry or BUILTIN_REGISTRY
+    fetcher = fetcher or _stooq_fetcher()
+    jobs = list(zip(symbols, registry.lookup(symbols, 'stooq'),
+                    registry.lookup(symbols, 'name'), registry.lookup(symbols, 'supply')))
+    rows = fetch_concurrently(lambda job: _fetch_stooq_row(fetcher, *job, cache=cache, store=store), jobs)
+    return {row['Symbol']: row for row in rows if row is not None}
+
+def download_yahoo_bars(symbols, period, interval, start=None, end=None):
+    """Download bars for all symbols in one multi-ticker yfinance request.
+
+    Columns are always a (field, ticker) MultiIndex, even for one symbol.
+    When start is given it replaces period; end (exclusive) needs a start.
+    """
+    window = {'start': start} if start is not None else {'period': period}
+    if start is not None and end is not None:
+        window['end'] = end
+    count_metric('upstream_requests', source='yahoo')
+    bars = _yfinance().download(
+        symbols, interval=interval, group_by='column', auto_adjust=False,
+        threads=True, progress=False, timeout=FETCH_DEADLINE, **window
+    )
+    if not isinstance(bars.columns, pd.MultiIndex):
+        bars.columns = pd.MultiIndex.from_product([bars.columns, symbols[:1]])
+    return bars
+
+def compute_yahoo_changes(daily, hourly, symbols):
+    """Price, 1h/24h/7d % changes and 24h volume per symbol from bulk bars.
+
+    Every column is derived with whole-frame operations; symbols without
+    daily bars come back as NaN rows.
+    """
+    def field(bars, name):
+        if bars.empty or name not in bars.columns.get_level_values(0):
+            return pd.DataFrame(columns=symbols, dtype=float)
+        return bars[name].reindex(columns=symbols).astype(float)
+
+    def last_row(frame):
+        if frame.empty:
+            return pd.Series(np.nan, index=symbols)
+        return frame.iloc[-1]
+
+    closes = field(daily, 'Close').ffill()
+    hourly_closes = field(hourly, 'Close').ffill()
+
+    changes = pd.DataFrame({
+        'Price': last_row(closes),
+        '1h %': last_row(hourly_closes.pct_change(1, fill_method=None)) * 100,
+        '24h %': last_row(closes.pct_change(1, fill_method=None)) * 100,
+        '7d %': last_row(closes.pct_change(7, fill_method=None)) * 100,
+        'Volume (24h)': last_row(field(daily, 'Volume')).fillna(0)
     })
-    
-    return results_df
+    # Same estimates as before when there are too few bars
+    changes['7d %'] = changes['7d %'].fillna(changes['24h %'] * 3)
+    changes['1h %'] = changes['1h %'].fillna(changes['24h %'] * 0.1)
+    return changes
 
-# Main Dashboard
-def main():
-    # Enhanced Header with Matrix theme
-    st.markdown('<h1 class="main-header">🌐 CRYPTOMATRIX DASHBOARD</h1>', unsafe_allow_html=True)
-    st.markdown('<p class="subtitle">⚡ ADVANCED CRYPTO ANALYSIS & RISK MANAGEMENT SYSTEM ⚡</p>', unsafe_allow_html=True)
+def _load_yahoo_daily_bars(symbols, store=None, registry=None):
+    """Recent daily bars keyed by Yahoo ticker, downloading only what the store is missing"""
+    registry = registry or BUILTIN_REGISTRY
+    tickers = registry.lookup(symbols, 'yahoo')
+    if store is None:
+        return download_yahoo_bars(tickers, period="10d", interval="1d")
 
-    # Data source indicator
-    if STOOQ_AVAILABLE:
-        data_source = "🟢 Stooq + Yahoo Finance"
-    else:
-        data_source = "🟡 Yahoo Finance (Stooq not available)"
-    
-    st.markdown(f'<div style="text-align: center; margin-bottom: 1rem;"><span style="color: var(--text-secondary); font-size: 0.9rem;">Data Source: {data_source}</span></div>', unsafe_allow_html=True)
+    # One bulk download from the stalest symbol's last stored bar; the store
+    # is keyed by registry symbol, whatever the symbol's Yahoo ticker is
+    start = min(store.fetch_start(symbol, cold_start_days=10) for symbol in symbols)
+    bars = download_yahoo_bars(tickers, period="10d", interval="1d", start=start.date())
+    if not bars.empty:
+        for symbol, ticker in zip(symbols, tickers):
+            store.append(symbol, bars.xs(ticker, axis=1, level=1))
 
-    # Market Overview Tabs with improved responsive styling
-    st.markdown('<div class="section-header">📊 MARKET OVERVIEW</div>', unsafe_allow_html=True)
-    tab1, tab2, tab3, tab4 = st.tabs(["🪙 CRYPTOCURRENCY PRICES", "📈 MARKET TRENDS", "🎯 PORTFOLIO ANALYSIS", "🧮 BACKTEST CALCULATOR"])
+    # Serve the window from the store so the frame matches the bulk download layout
+    window_start = (datetime.now() - timedelta(days=10)).date()
+    stored = {ticker: store.load(symbol, start=window_start) for symbol, ticker in zip(symbols, tickers)}
+    return pd.concat(
+        {field: pd.DataFrame({symbol: frame[field] for symbol, frame in stored.items()})
+         for field in ('Close', 'Volume')},
+        axis=1
+    )
 
-    with tab1:
-        st.markdown('<div class="dashboard-card"><h3 style="color: var(--accent-green); margin-bottom: 1rem;">🔥 TOP CRYPTOCURRENCIES</h3></div>', unsafe_allow_html=True)
-        
-        # Add refresh button
-        col1, col2 = st.columns([1, 4])
-        with col1:
-            if st.button("🔄 REFRESH DATA", type="primary"):
-                st.rerun()
-        with col2:
-            st.markdown(f'<div style="margin-top: 0.5rem;"><span style="color: var(--text-secondary);">Real-time data from {data_source}</span></div>', unsafe_allow_html=True)
-        
-        # Get crypto data using Stooq with fallback
-        crypto_df = get_crypto_data_stooq()
-        display_df = crypto_df.copy()
-        st.dataframe(
-            display_df.style.format({
-                'Price': '${:,.2f}',
-                '1h %': '{:+.2f}%',
-                '24h %': '{:+.2f}%',
-                '7d %': '{:+.2f}%'
-            }),
-            use_container_width=True,
-            height=400
-        )
+@instrumented('fetch.yahoo')
+def _yahoo_rows(symbols, cache=None, store=None, registry=None):
+    """Yahoo Finance rows by symbol; symbols without a price are left out"""
+    registry = registry or BUILTIN_REGISTRY
+    # Two bulk downloads cover every symbol: daily bars for the 24h/7d
+    # changes and hourly bars for the 1h change
+    yahoo_symbols = registry.lookup(symbols, 'yahoo')
+    batch_key = ('yahoo_batch', tuple(yahoo_symbols))
+    daily = _cached(cache, 'history_7d', batch_key + ('1d',),
+                    lambda: _load_yahoo_daily_bars(symbols, store, registry))
+    hourly = _cached(cache, 'intraday', batch_key + ('1h',),
+                     lambda: download_yahoo_bars(yahoo_symbols, period="2d", interval="1h"))
+    changes = compute_yahoo_changes(daily, hourly, yahoo_symbols)
+    changes['Market Cap'] = changes['Price'].to_numpy() * np.asarray(registry.lookup(symbols, 'supply'), dtype=float)
 
-    with tab2:
-        col1, col2 = st.columns(2)
-        with col1:
-            st.markdown('<div class="portfolio-card"><h3 style="color: var(--accent-green); margin-bottom: 1rem;">💰 MARKET CAPITALIZATION</h3></div>', unsafe_allow_html=True)
-            market_caps = []
-            for cap in crypto_df['Market Cap'][:5]:
-                if 'T' in cap:
-                    market_caps.append(float(cap.replace('$', '').replace('T', '')) * 1e12)
-                elif 'B' in cap:
-                    market_caps.append(float(cap.replace('$', '').replace('B', '')) * 1e9)
-                elif 'M' in cap:
-                    market_caps.append(float(cap.replace('$', '').replace('M', '')) * 1e6)
-                else:
-                    market_caps.append(0)
-            
-            st.bar_chart(
-                pd.DataFrame({
-                    'Cryptocurrency': crypto_df['Name'][:5],
-                    'Market Cap': market_caps
-                }).set_index('Cryptocurrency'),
-                use_container_width=True
-            )
-        
-        with col2:
-            st.markdown('<div class="portfolio-card"><h3 style="color: var(--accent-green); margin-bottom: 1rem;">📊 7-DAY PERFORMANCE</h3></div>', unsafe_allow_html=True)
-            st.bar_chart(
-                crypto_df.head(8).set_index('Symbol')['7d %'],
-                use_container_width=True
-            )
+    names = registry.lookup(symbols, 'name')
+    rows = {}
+    for i, quote in enumerate(changes.to_dict('records')):
+        if pd.isna(quote['Price']):
+            continue
+        rows[symbols[i]] = {
+            'Name': names[i] or symbols[i],
+            'Symbol': symbols[i],
+            'Price': quote['Price'],
+            '1h %': quote['1h %'],
+            '24h %': quote['24h %'],
+            '7d %': quote['7d %'],
+            'Market Cap': quote['Market Cap'],
+            'Volume (24h)': quote['Volume (24h)']
+        }
+    return rows
 
-    with tab3:
-        st.markdown('<div class="section-header">🔍 PORTFOLIO RISK ANALYSIS</div>', unsafe_allow_html=True)
-        
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.markdown('<div class="portfolio-card"><h3 style="color: var(--accent-green);">🛡️ CONSERVATIVE</h3></div>', unsafe_allow_html=True)
+MARKET_PROVIDERS = [('Stooq', _stooq_rows), ('Yahoo', _yahoo_rows)]
+
+@instrumented('fetch.market_rows')
+def fetch_market_rows(symbols, providers, cache=None, store=None, registry=None, sources=None):
+    """Market table for symbols, trying each provider in turn for the symbols still missing.
+
+    Providers are called through their circuit breakers; whatever no provider
+    could serve comes from the sample quotes. The Source column records
+    where each row came from.
+    """
+    registry = registry or BUILTIN_REGISTRY
+    sources = sources or SourceManager()
+    rows = {}
+    for name, fetch in providers:
+        pending = [symbol for symbol in symbols if symbol not in rows]
+        if not pending:
+            break
+        served = sources.call(name, pending, lambda batch: fetch(batch, cache, store, registry))
+        for symbol, row in served.items():
+            rows[symbol] = dict(row, Source=name)
+
+    missing = [symbol for symbol in symbols if symbol not in rows]
+    if missing:
+        rows.update(zip(missing, get_sample_crypto_data(missing, registry).to_dict('records')))
+    sources.record_routes({symbol: rows[symbol]['Source'] for symbol in symbols})
+    # Registry pages sit in the shared cache, one frame per page, so they are kept compact
+    return market_frame([rows[symbol] for symbol in symbols], compact=True)
+
+def get_crypto_data_stooq(symbols=None, cache=None, store=None, registry=None, sources=None):
+    """Get cryptocurrency data using Stooq with Yahoo Finance fallback"""
+    symbols = list(STOOQ_SYMBOLS if symbols is None else symbols)
+    providers = MARKET_PROVIDERS if STOOQ_AVAILABLE else MARKET_PROVIDERS[1:]
+    return fetch_market_rows(symbols, providers, cache, store, registry, sources)
+
+def get_crypto_data_yahoo(symbols=None, cache=None, store=None, registry=None, sources=None):
+    """Get cryptocurrency data using Yahoo Finance as fallback"""
+    symbols = list(STOOQ_SYMBOLS if symbols is None else symbols)
+    return fetch_market_rows(symbols, MARKET_PROVIDERS[1:], cache, store, registry, sources)
+
+# Sample quotes by symbol: Price, 1h %, 24h %, 7d %, Market Cap, Volume (24h)
+SAMPLE_QUOTES = {
+    'BTC': (90145.32, -0.09, 0.18, 0.74, 1.80e12, 65.42e9),
+    'ETH': (3108.57, -0.01, 1.15, 2.29, 375.30e9, 10.17e9),
+    'USDT': (1.00, -0.00, -0.00, -0.00, 186.26e9, 47.51e9),
+    'BNB': (895.62, 0.32, 2.18, 0.31, 123.36e9, 1.49e9),
+    'SOL': (289.45, 1.25, 3.45, 15.67, 129.45e9, 3.45e9),
+    'XRP': (0.78, 0.45, 1.23, 5.43, 45.67e9, 2.34e9),
+    'ADA': (0.62, 0.67, 2.34, 8.92, 21.45e9, 0.89e9),
+    'DOGE': (0.23, 0.89, 3.21, 12.34, 32.89e9, 1.23e9),
+    'DOT': (8.95, 0.32, 1.89, 6.78, 12.34e9, 0.56e9),
+    'LTC': (89.45, 0.56, 1.45, 4.56, 6.78e9, 0.78e9)
+}
+
+@functools.lru_cache(maxsize=1)
+def _sample_quote_frame():
+    """SAMPLE_QUOTES as a float frame indexed by symbol, built once per process"""
+    return pd.DataFrame.from_dict(SAMPLE_QUOTES, orient='index', columns=MARKET_NUMERIC_COLUMNS).astype(float)
+
+@instrumented('fetch.sample')
+def get_sample_crypto_data(symbols=None, registry=None):
+    """Sample cryptocurrency data as fallback; symbols without a sample quote get empty rows"""
+    registry = registry or BUILTIN_REGISTRY
+    symbols = list(STOOQ_SYMBOLS if symbols is None else symbols)
+    quotes = _sample_quote_frame().reindex(symbols)
+    crypto_data = {
+        'Name': [name or symbol for symbol, name in zip(symbols, registry.lookup(symbols, 'name'))],
+        'Symbol': symbols,
+        **{column: quotes[column].to_numpy() for column in MARKET_NUMERIC_COLUMNS},
+        'Source': 'Sample'
+    }
+    return market_frame(crypto_data)
+
+# Market table schema: numeric columns stay float end to end, formatting
+# happens only when the table is displayed
+MARKET_TEXT_COLUMNS = ['Name', 'Symbol']
+MARKET_NUMERIC_COLUMNS = ['Price', '1h %', '24h %', '7d %', 'Market Cap', 'Volume (24h)']
+MARKET_SOURCE_COLUMN = 'Source'  # provider that served the row: Stooq, Yahoo or Sample
+
+MARKET_COMPACT_COLUMNS = ['1h %', '24h %', '7d %']  # shown to two decimals, so float32 loses nothing
+
+def market_frame(data, compact=False):
+    """Build a market table with float64 numeric columns.
+
+    compact=True is the typed frame for large universes: Name, Symbol and
+    Source become categoricals and the percentage columns float32. Price,
+    market cap and volume stay float64 so no displayed digit changes.
+    """
+    frame = pd.DataFrame(data, columns=MARKET_TEXT_COLUMNS + MARKET_NUMERIC_COLUMNS + [MARKET_SOURCE_COLUMN])
+    frame[MARKET_NUMERIC_COLUMNS] = frame[MARKET_NUMERIC_COLUMNS].apply(pd.to_numeric, errors='coerce').astype(np.float64)
+    if compact:
+        frame[MARKET_COMPACT_COLUMNS] = frame[MARKET_COMPACT_COLUMNS].astype(np.float32)
+        text_columns = MARKET_TEXT_COLUMNS + [MARKET_SOURCE_COLUMN]
+        frame[text_columns] = frame[text_columns].astype('category')
+    return frame
+
+def format_compact_usd(value):
+    """$1.80T / $375.30B / $6.78M style display string"""
+    if pd.isna(value):
+        return "—"
+    for threshold, suffix in ((1e12, 'T'), (1e9, 'B')):
+        if abs(value) >= threshold:
+            return f"${value / threshold:.2f}{suffix}"
+    return f"${value / 1e6:.2f}M"
+
+MARKET_TABLE_FORMAT = {
+    'Price': '${:,.2f}',
+    '1h %': '{:+.2f}%',
+    '24h %': '{:+.2f}%',
+    '7d %': '{:+.2f}%',
+    'Market Cap': format_compact_usd,
+    'Volume (24h)': format_compact_usd
+}
+
+# Sidebar market statistics
+MARKET_STATS_HISTORY = 360          # samples kept for the volume and sentiment badges
+MARKET_STATS_INTERVAL = 60.0        # seconds between history samples
+MARKET_STATS_RESUM = 100_000        # incremental updates between exact re-sums, bounds float drift
+SENTIMENT_LABELS = [(25, 'Extreme Fear'), (45, 'Fear'), (55, 'Neutral'), (75, 'Greed'), (101, 'Extreme Greed')]
+
+def _finite(value):
+    """value as a float, or None when missing"""
+    return float(value) if value is not None and np.isfinite(value) else None
+
+class _PrefixSums:
+    """Fenwick tree of fixed-width vectors by position.
+
+    add() changes one position and prefix() sums the first k positions,
+    both in O(log n). Capacity doubles as positions are added.
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self._values = np.zeros((0, width))
+        self._tree = np.zeros((1, width))   # 1-based; row 0 is unused
+
+    def rebuild(self, values):
+        """Replace every position's vector in O(n)"""
+        self._values = np.array(values, dtype=float).reshape(-1, self.width)
+        capacity = 1 << max(len(self._values) - 1, 0).bit_length()
+        padded = np.zeros((capacity, self.width))
+        padded[:len(self._values)] = self._values
+        self._values = padded
+        self._tree = np.vstack((np.zeros((1, self.width)), padded))
+        for i in range(1, capacity + 1):
+            parent = i + (i & -i)
+            if parent <= capacity:
+                self._tree[parent] += self._tree[i]
+
+    def add(self, position, delta):
+        if position >= len(self._values):
+            self.rebuild(np.vstack((self._values, np.zeros((max(len(self._values), 1), self.width)))))
+        self._values[position] += delta
+        i, capacity = position + 1, len(self._values)
+        while i <= capacity:
+            self._tree[i] += delta
+            i += i & -i
+
+    def prefix(self, count):
+        total = np.zeros(self.width)
+        i = min(count, len(self._values))
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+class MarketAggregate:
+    """Universe-wide totals kept current one quote at a time.
+
+    Holds the last market cap, 24h volume and 24h change seen for each
+    symbol and running sums built from them, so folding in a changed quote
+    is O(1): its old contribution is subtracted and the new one added. The
+    market cap 24h ago is implied by each quote's 24h change, which gives
+    the market cap and dominance badges; volume and sentiment are compared
+    against a short history of samples. Each sample remembers how many
+    symbols had joined, and a prefix-sum tree over join order gives the
+    current totals of exactly those symbols, so symbols paged in later by
+    any session do not move the badges.
+    """
+
+    def __init__(self, history=MARKET_STATS_HISTORY, interval=MARKET_STATS_INTERVAL, resum=MARKET_STATS_RESUM):
+        self.interval = interval
+        self.resum = resum
+        self._quotes = {}          # symbol -> (market cap, volume, 24h change), in join order
+        self._positions = {}       # symbol -> join order
+        # cap, cap 24h ago, volume, cap x change, cap with a change, advancing and quoted assets
+        self._sums = [0.0] * 7
+        self._prefix = _PrefixSums(7)
+        self._history = deque(maxlen=history)
+        self._updates = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._quotes)
+
+    @staticmethod
+    def _contribution(quote):
+        cap, volume, change = quote
+        cap = cap or 0.0
+        # A -100% change implies no market cap 24h ago; treat it as unknown
+        if change is None or change <= -100:
+            return cap, cap, volume or 0.0, 0.0, 0.0, 0, 0
+        return cap, cap / (1 + change / 100), volume or 0.0, cap * change, cap, int(change > 0), 1
+
+    def _apply(self, symbol, quote):
+        previous = self._quotes.get(symbol)
+        if previous == quote:
+            return
+        contribution = np.array(self._contribution(quote), dtype=float)
+        if previous is None:
+            self._positions[symbol] = len(self._positions)
+            delta = contribution
+        else:
+            delta = contribution - np.array(self._contribution(previous), dtype=float)
+        for i, value in enumerate(delta):
+            self._sums[i] += value
+        self._prefix.add(self._positions[symbol], delta)
+        self._quotes[symbol] = quote
+        self._updates += 1
+        if self._updates >= self.resum:
+            self._updates = 0
+            contributions = [self._contribution(quote) for quote in self._quotes.values()]
+            self._sums = [math.fsum(column) for column in zip(*contributions)] if contributions else [0.0] * 7
+            self._prefix.rebuild(contributions)
+
+    def update(self, changes):
+        """Fold in {symbol: {field: value}} deltas; only the fields given change"""
+        with self._lock:
+            for symbol, fields in changes.items():
+                cap, volume, change = self._quotes.get(symbol, (None, None, None))
+                self._apply(symbol, (
+                    _finite(fields['Market Cap']) if 'Market Cap' in fields else cap,
+                    _finite(fields['Volume (24h)']) if 'Volume (24h)' in fields else volume,
+                    _finite(fields['24h %']) if '24h %' in fields else change
+                ))
+            self._sample()
+
+    def update_frame(self, frame):
+        """Fold in a market table; rows whose quote did not change cost one comparison"""
+        columns = [frame[column].to_numpy(dtype=float) for column in ('Market Cap', 'Volume (24h)', '24h %')]
+        with self._lock:
+            for symbol, cap, volume, change in zip(frame['Symbol'], *columns):
+                self._apply(symbol, (_finite(cap), _finite(volume), _finite(change)))
+            self._sample()
+
+    @staticmethod
+    def _sentiment(sums):
+        """0-100 score from cap-weighted 24h momentum and the share of advancing assets"""
+        _, _, _, weighted_change, weighted_cap, advancing, quoted = sums
+        if not weighted_cap or not quoted:
+            return None
+        momentum = weighted_change / weighted_cap
+        breadth = advancing / quoted
+        return float(np.clip(50 + 25 * np.tanh(momentum / 5) + 25 * (2 * breadth - 1), 0, 100))
+
+    def _sample(self):
+        now = time.time()
+        if not self._history or now - self._history[-1][0] >= self.interval:
+            self._history.append((now, len(self._quotes), self._sums[2], self._sentiment(self._sums)))
+
+    def stats(self):
+        """Current totals with their change badges, or None before the first quote"""
+        with self._lock:
+            cap, cap_24h_ago, volume = self._sums[:3]
+            if cap <= 0:
+                return None
+            btc_cap, _, btc_change = self._quotes.get('BTC', (None, None, None))
+            btc_cap = btc_cap or 0.0
+            btc_24h_ago = btc_cap / (1 + btc_change / 100) if btc_change is not None and btc_change > -100 else btc_cap
+            sentiment = self._sentiment(self._sums)
+            since, base_volume, base_sentiment = None, None, None
+            same_volume, same_sentiment = None, None
+            if len(self._history) > 1:
+                since, joined, base_volume, base_sentiment = self._history[0]
+                # Current totals of the symbols the baseline sample covered
+                same = self._prefix.prefix(joined)
+                same_volume, same_sentiment = same[2], self._sentiment(same)
+            assets = len(self._quotes)
+        dominance = btc_cap / cap * 100
+        return {
+            'Market Cap': cap,
+            'Market Cap Change': (cap / cap_24h_ago - 1) * 100 if cap_24h_ago else None,
+            'Volume': volume,
+            'Volume Change': (same_volume / base_volume - 1) * 100 if base_volume else None,
+            'BTC Dominance': dominance,
+            'BTC Dominance Change': dominance - btc_24h_ago / cap_24h_ago * 100 if cap_24h_ago else None,
+            'Sentiment': sentiment,
+            'Sentiment Change': same_sentiment - base_sentiment if None not in (same_sentiment, base_sentiment) else None,
+            'Since': datetime.fromtimestamp(since) if since else None,
+            'Assets': assets
+        }
+
+@st.cache_resource
+def get_market_aggregate():
+    """Process-wide MarketAggregate fed by every market table and live tick the dashboard sees"""
+    return MarketAggregate()
+
+def sentiment_label(score):
+    return next(label for bound, label in SENTIMENT_LABELS if score < bound)
+
+def stats_card(label, value, change, description, unit='%'):
+    """Sidebar stats card; change is None when there is nothing to compare against yet"""
+    if change is None:
+        badge = '<div class="stats-change">—</div>'
+    else:
+        badge = (f'<div class="stats-change {"positive" if change >= 0 else "negative"}">'
+                 f'{change:+.1f}{unit}</div>')
+    return f"""
+        <div class="stats-card">
+            <div class="stats-label">{label}</div>
+            <div class="stats-value">{value}</div>
+            {badge}
+            <div class="stats-description">{description}</div>
+        </div>
+        """
+
+# Streaming ticker
+STREAM_BUFFER_SIZE = 4096       # deltas kept in the shared ring buffer
+STREAM_POLL_INTERVAL = 5.0      # seconds between producer polls of the feed
+STREAM_IDLE_TIMEOUT = 60.0      # symbols no viewer has asked for in this long stop being polled
+STREAM_CADENCES = [1, 2, 5, 10] # seconds between table patches in a session
+STREAM_SESSION_LIMIT = 900      # seconds a session streams before it needs a rerun
+STREAM_FEEDS = ['Simulated', 'Live']
+
+class TickRingBuffer:
+    """Fixed-size ring of (seq, symbol, changes) deltas.
+
+    Writers append with increasing sequence numbers; each reader keeps the
+    last sequence number it has seen and asks for everything after it. A
+    reader more than capacity deltas behind gets None and must resync from
+    a snapshot.
+    """
+
+    def __init__(self, capacity=STREAM_BUFFER_SIZE):
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def append(self, symbol, changes):
+        with self._lock:
+            self._seq += 1
+            self._slots[self._seq % self.capacity] = (self._seq, symbol, changes)
+            return self._seq
+
+    def since(self, seq):
+        """(latest seq, [(symbol, changes), ...]) after seq, or None if overrun"""
+        with self._lock:
+            latest = self._seq
+            if latest - seq > self.capacity:
+                return None
+            deltas = [self._slots[i % self.capacity][1:] for i in range(seq + 1, latest + 1)]
+        return latest, deltas
+
+class SimulatedFeed:
+    """Local random-walk price feed for testing the streaming path offline.
+
+    Each call moves a random subset of symbols by a normal log-return step
+    and rescales market cap with price; quotes start from the sample data.
+    """
+
+    def __init__(self, registry=None, volatility=0.002, move_fraction=0.5, seed=None):
+        self.registry = registry or BUILTIN_REGISTRY
+        self.volatility = volatility
+        self.move_fraction = move_fraction
+        self.rng = np.random.default_rng(seed)
+        self._rows = {}
+
+    def __call__(self, symbols):
+        missing = [symbol for symbol in symbols if symbol not in self._rows]
+        if missing:
+            start = get_sample_crypto_data(missing, self.registry)
+            # Symbols without a sample quote start from a random price
+            start['Price'] = start['Price'].fillna(pd.Series(self.rng.uniform(0.1, 100, len(start))))
+            for row in start.to_dict('records'):
+                self._rows[row['Symbol']] = dict(row, Source='Simulated')
+
+        moves = self.rng.random(len(symbols)) < self.move_fraction
+        steps = np.exp(self.rng.normal(0.0, self.volatility, len(symbols)))
+        for symbol, moved, step in zip(symbols, moves, steps):
+            if moved:
+                row = self._rows[symbol]
+                row['Price'] *= step
+                row['Market Cap'] *= step
+                row['1h %'] = ((1 + np.nan_to_num(row['1h %']) / 100) * step - 1) * 100
+        return market_frame([self._rows[symbol] for symbol in symbols])
+
+class PriceStreamer:
+    """One background producer shared by every viewer.
+
+    The producer polls feed(symbols) for the union of symbols viewers have
+    recently subscribed to, diffs each row against the last poll and pushes
+    only the changed fields into a TickRingBuffer. Sessions read deltas from
+    the buffer, so upstream load does not grow with the number of viewers.
+    Listeners are called with {symbol: row} for every row of each poll.
+    """
+
+    def __init__(self, feed, interval=STREAM_POLL_INTERVAL, capacity=STREAM_BUFFER_SIZE,
+                 idle_timeout=STREAM_IDLE_TIMEOUT):
+        self.feed = feed
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self.buffer = TickRingBuffer(capacity)
+        self.stats = {'polls': 0, 'deltas': 0, 'errors': 0, 'last_poll': None}
+        self.listeners = []
+        self._rows = {}
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def subscribe(self, symbols):
+        """Mark symbols as watched, starting the producer on first use"""
+        now = time.monotonic()
+        with self._lock:
+            new = any(symbol not in self._subscribers for symbol in symbols)
+            self._subscribers.update(dict.fromkeys(symbols, now))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        if new:
+            self._wake.set()
+
+    def snapshot(self, symbols):
+        """(seq, {symbol: row}) for the symbols the producer has polled"""
+        with self._lock:
+            return self.buffer.seq, {symbol: dict(self._rows[symbol]) for symbol in symbols if symbol in self._rows}
+
+    def updates(self, seq, symbols):
+        """(latest seq, {symbol: merged changes}) since seq, or None if the reader fell behind"""
+        result = self.buffer.since(seq)
+        if result is None:
+            return None
+        latest, deltas = result
+        wanted = set(symbols)
+        changes = {}
+        for symbol, fields in deltas:
+            if symbol in wanted:
+                changes.setdefault(symbol, {}).update(fields)
+        return latest, changes
+
+    def _watched(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            for symbol in [s for s, seen in self._subscribers.items() if seen < cutoff]:
+                del self._subscribers[symbol]
+                self._rows.pop(symbol, None)
+            return sorted(self._subscribers)
+
+    def poll(self):
+        """Fetch the watched symbols once and publish the changed fields"""
+        symbols = self._watched()
+        if not symbols:
+            return 0
+        frame = self.feed(symbols)
+        rows = frame.to_dict('records')
+        published = 0
+        with self._lock:
+            for row in rows:
+                symbol = row['Symbol']
+                previous = self._rows.get(symbol, {})
+                changes = {
+                    field: value for field, value in row.items()
+                    if field in previous and not (value == previous[field] or (pd.isna(value) and pd.isna(previous[field])))
+                }
+                self._rows[symbol] = row
+                if changes:
+                    self.buffer.append(symbol, changes)
+                    published += 1
+            self.stats['polls'] += 1
+            self.stats['deltas'] += published
+            self.stats['last_poll'] = datetime.now()
+        for listener in self.listeners:
+            listener({row['Symbol']: row for row in rows})
+        return published
+
+    def _run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception:
+                self.stats['errors'] += 1
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+@st.cache_resource
+def get_price_streamer(feed_name):
+    """Process-wide streaming producer for one feed ('Simulated' or 'Live')"""
+    if feed_name == 'Simulated':
+        return PriceStreamer(SimulatedFeed(get_symbol_registry()))
+    cache, store = get_market_data_cache(), get_ohlcv_store()
+    registry, sources = get_symbol_registry(), get_source_manager()
+    service = get_data_service_client()
+    # The live producer reads through the shared quotes cache (or the data
+    # service's), so it never hits upstream more often than the quotes TTL
+    streamer = PriceStreamer(lambda symbols: service_or_local(
+        service, lambda client: client.market(symbols),
+        lambda: get_market_data(symbols, cache, store, registry, sources)
+    ))
+    # Live prices keep the risk model's EWMA covariance moving between history refreshes
+    streamer.listeners.append(lambda rows: get_risk_model(cache, store).ewma.observe_prices(
+        {symbol: row['Price'] for symbol, row in rows.items()}
+    ))
+    return streamer
+
+def apply_ticks(frame, changes):
+    """Patch changed cells of a Symbol-indexed frame in place; returns the changed cells as a boolean mask"""
+    changed = pd.DataFrame(False, index=frame.index, columns=frame.columns)
+    for symbol, fields in changes.items():
+        if symbol not in frame.index:
+            continue
+        for field, value in fields.items():
+            if field in frame.columns:
+                column = frame[field]
+                if isinstance(column.dtype, pd.CategoricalDtype) and pd.notna(value) and value not in column.cat.categories:
+                    frame[field] = column.cat.add_categories([value])
+                frame.at[symbol, field] = value
+                changed.at[symbol, field] = True
+    return changed
+
+def style_market_table(frame, changed=None):
+    """Market table Styler; cells in the changed mask are highlighted"""
+    styler = frame.style.format(MARKET_TABLE_FORMAT, na_rep='—')
+    if changed is not None and changed.to_numpy().any():
+        highlight = 'background-color: rgba(0, 255, 136, 0.18)'
+        styler = styler.apply(lambda _: np.where(changed.to_numpy(), highlight, ''), axis=None)
+    return styler
+
+def stream_market_table(slot, status_slot, frame, ranks, streamer, cadence, limit=STREAM_SESSION_LIMIT,
+                        aggregate=None):
+    """Keep slot's market table current by patching it with the producer's deltas.
+
+    Runs until limit seconds pass or Streamlit interrupts the script with a
+    rerun; the table is only re-rendered when a tick touched one of its rows.
+    Ticks are also folded into aggregate when one is given.
+    """
+    symbols = list(frame['Symbol'])
+    frame = frame.set_index('Symbol', drop=False)
+    streamer.subscribe(symbols)
+    seq, rows = streamer.snapshot(symbols)
+    apply_ticks(frame, rows)
+    slot.dataframe(style_market_table(frame.set_index(ranks)), use_container_width=True, height=400)
+
+    started = time.monotonic()
+    while time.monotonic() - started < limit:
+        time.sleep(cadence)
+        streamer.subscribe(symbols)
+        result = streamer.updates(seq, symbols)
+        if result is None:
+            # Fell behind the ring buffer: resync from the producer's snapshot
+            seq, rows = streamer.snapshot(symbols)
+            changes = rows
+        else:
+            seq, changes = result
+        if changes:
+            if aggregate is not None:
+                aggregate.update(changes)
+            changed = apply_ticks(frame, changes)
+            slot.dataframe(style_market_table(frame.set_index(ranks), changed.set_axis(ranks)),
+                           use_container_width=True, height=400)
+        status_slot.caption(f"📡 Streaming · {len(changes)} rows updated at {datetime.now():%H:%M:%S} · "
+                            f"producer polls: {streamer.stats['polls']}")
+    status_slot.caption("📡 Stream paused after {:.0f} minutes, rerun to resume".format(limit / 60))
+
+# Price alerts
+ALERT_KINDS = {
+    # kind: (quote field, direction); 'Crosses MA' takes the side opposite to the current price
+    'Price above': ('Price', 'above'),
+    'Price below': ('Price', 'below'),
+    '1h % above': ('1h %', 'above'),
+    '1h % below': ('1h %', 'below'),
+    '24h % above': ('24h %', 'above'),
+    '24h % below': ('24h %', 'below'),
+    'Crosses MA': ('Price', None)
+}
+ALERT_MA_WINDOWS = [20, 50, 200]   # days in the simple moving averages alerts can cross
+ALERT_MA_REFRESH = 3600.0          # seconds between moving-average threshold refreshes
+ALERT_EVAL_INTERVAL = 1.0          # seconds between worker passes over the streamer's deltas
+ALERT_HISTORY = 200                # triggered alerts kept per owner
+ALERT_FEED = os.environ.get('CRYPTOMATRIX_ALERT_FEED', 'Live')  # streamer the alert worker reads
+ALERT_BOOK_COMPACT = 0.5           # dead book entries, as a fraction of live ones, before a compaction
+
+class ThresholdBook:
+    """Sorted thresholds for one (symbol, field, direction) with their entry keys.
+
+    'above' entries fire once the value reaches the threshold and 'below'
+    entries once it falls to it, so the entries a value triggers are always
+    a prefix ('above') or suffix ('below') of the sorted array: one binary
+    search finds them and a slice drops them. New entries are batched and
+    merged in on the next check. Discarded entries are only marked dead;
+    once they outnumber ALERT_BOOK_COMPACT of the live ones the arrays are
+    rebuilt without them, so discarding stays amortized O(1).
+    """
+
+    def __init__(self, direction):
+        self.direction = direction
+        self.thresholds = np.empty(0)
+        self.keys = np.empty(0, dtype=np.int64)
+        self._pending = []
+        self._dead = set()
+
+    def __len__(self):
+        """Live entries"""
+        return len(self.thresholds) + len(self._pending) - len(self._dead)
+
+    def add(self, threshold, key):
+        self._pending.append((threshold, key))
+
+    def discard(self, key):
+        """Drop an entry that has not fired"""
+        self._dead.add(key)
+        if len(self._dead) > ALERT_BOOK_COMPACT * len(self):
+            self._compact()
+
+    def _compact(self):
+        dead = np.fromiter(self._dead, dtype=np.int64, count=len(self._dead))
+        keep = ~np.isin(self.keys, dead)
+        self.thresholds, self.keys = self.thresholds[keep], self.keys[keep]
+        self._pending = [(threshold, key) for threshold, key in self._pending if key not in self._dead]
+        self._dead = set()
+
+    def _merge(self):
+        pending = sorted(self._pending)
+        self._pending = []
+        thresholds = np.array([threshold for threshold, _ in pending], dtype=float)
+        keys = np.array([key for _, key in pending], dtype=np.int64)
+        positions = np.searchsorted(self.thresholds, thresholds, side='right')
+        self.thresholds = np.insert(self.thresholds, positions, thresholds)
+        self.keys = np.insert(self.keys, positions, keys)
+
+    def pop_triggered(self, value):
+        """Keys of the entries value triggers, removed from the book"""
+        if self._pending:
+            self._merge()
+        if value is None or not np.isfinite(value):
+            return self.keys[:0]
+        if self.direction == 'above':
+            cut = np.searchsorted(self.thresholds, value, side='right')
+            fired, self.keys, self.thresholds = self.keys[:cut], self.keys[cut:], self.thresholds[cut:]
+        else:
+            cut = np.searchsorted(self.thresholds, value, side='left')
+            fired, self.keys, self.thresholds = self.keys[cut:], self.keys[:cut], self.thresholds[:cut]
+        if self._dead and len(fired):
+            dead = np.isin(fired, np.fromiter(self._dead, dtype=np.int64, count=len(self._dead)))
+            self._dead.difference_update(fired[dead].tolist())
+            fired = fired[~dead]
+        return fired
+
+class AlertEngine:
+    """Process-wide price alerts checked by a background worker.
+
+    Each alert is one entry in the ThresholdBook for its symbol, quote field
+    and direction. A 'Crosses MA' alert is a price threshold at the moving
+    average, on the side the price has to cross to, and is re-levelled every
+    ALERT_MA_REFRESH seconds. The worker reads the streamer's deltas like any
+    other viewer, so each pass only checks quotes that changed, each in
+    O(log n + k) for the k alerts it fires. Cancelled and re-levelled
+    entries are discarded from their book. With autostart=False the worker
+    is never started and check() or evaluate() are called directly.
+    """
+
+    def __init__(self, streamer, store=None, interval=ALERT_EVAL_INTERVAL, ma_refresh=ALERT_MA_REFRESH,
+                 autostart=True, registry=None):
+        self.streamer = streamer
+        self.autostart = autostart
+        self.store = store
+        self.registry = registry
+        self.interval = interval
+        self.ma_refresh = ma_refresh
+        self.stats = {'checks': 0, 'triggered': 0, 'errors': 0, 'last_check': None}
+        self._alerts = {}      # alert id -> record
+        self._live = {}        # book entry key -> alert id
+        self._books = {}       # (symbol, field, direction) -> ThresholdBook
+        self._fired = {}       # owner -> triggered records, newest last
+        self._watched = {}     # symbol -> active alert count
+        self._unchecked = set()
+        self._ids = itertools.count(1)
+        self._seq = None
+        self._ma_checked = time.monotonic()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def moving_average(self, symbol, window):
+        end = pd.Timestamp.now().normalize()
+        closes = load_price_history([symbol], end - pd.Timedelta(days=2 * window + 10), end, self.store, self.registry)
+        closes = closes[symbol].dropna() if symbol in closes else pd.Series(dtype=float)
+        if len(closes) < window:
+            raise ValueError(f"Not enough price history for a {window}-day average of {symbol}")
+        return float(closes.iloc[-window:].mean())
+
+    def _book(self, alert):
+        key = next(self._ids)
+        self._live[key] = alert['id']
+        alert['key'] = key
+        book_key = (alert['symbol'], alert['field'], alert['direction'])
+        if book_key not in self._books:
+            self._books[book_key] = ThresholdBook(alert['direction'])
+        self._books[book_key].add(alert['threshold'], key)
+
+    def current_price(self, symbol):
+        row = self.streamer.snapshot([symbol])[1].get(symbol)
+        price = row['Price'] if row else self.streamer.feed([symbol])['Price'].iloc[0]
+        if price is None or not np.isfinite(price):
+            raise ValueError(f"No current price for {symbol}")
+        return float(price)
+
+    def add(self, owner, symbol, kind, threshold=None, window=None):
+        """Register an alert and return its id; 'Crosses MA' alerts need a window in days"""
+        field, direction = ALERT_KINDS[kind]
+        if kind == 'Crosses MA':
+            threshold = self.moving_average(symbol, window)
+            direction = 'above' if self.current_price(symbol) < threshold else 'below'
+        alert = {
+            'id': next(self._ids), 'owner': owner, 'symbol': symbol, 'kind': kind,
+            'field': field, 'direction': direction, 'threshold': float(threshold),
+            'window': window, 'created': datetime.now()
+        }
+        with self._lock:
+            self._alerts[alert['id']] = alert
+            self._book(alert)
+            self._watched[symbol] = self._watched.get(symbol, 0) + 1
+            # Check the new alert against the latest quote on the next pass
+            self._unchecked.add(symbol)
+            if self.autostart and self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return alert['id']
+
+    def _unbook(self, alert):
+        """Take alert's entry out of its book before it fires"""
+        self._live.pop(alert['key'], None)
+        book_key = (alert['symbol'], alert['field'], alert['direction'])
+        book = self._books[book_key]
+        book.discard(alert['key'])
+        if not len(book):
+            del self._books[book_key]
+
+    def _release(self, alert):
+        self._live.pop(alert['key'], None)
+        self._watched[alert['symbol']] -= 1
+        if not self._watched[alert['symbol']]:
+            del self._watched[alert['symbol']]
+
+    def cancel(self, owner, alert_id):
+        with self._lock:
+            alert = self._alerts.get(alert_id)
+            if alert is None or alert['owner'] != owner:
+                return False
+            del self._alerts[alert_id]
+            self._unbook(alert)
+            self._release(alert)
+            return True
+
+    def alerts(self, owner):
+        """Active alerts of owner, oldest first"""
+        with self._lock:
+            return [dict(alert) for alert in self._alerts.values() if alert['owner'] == owner]
+
+    def triggered(self, owner):
+        """Fired alerts of owner, oldest first"""
+        with self._lock:
+            return list(self._fired.get(owner, ()))
+
+    def check(self, changes):
+        """Fire the alerts crossed by changes ({symbol: {field: value}}); returns the fired records"""
+        fired = []
+        now = datetime.now()
+        with self._lock:
+            for symbol, fields in changes.items():
+                if symbol not in self._watched:
+                    continue
+                for field, value in fields.items():
+                    for direction in ('above', 'below'):
+                        book = self._books.get((symbol, field, direction))
+                        if book is None or not len(book):
+                            continue
+                        for key in book.pop_triggered(value).tolist():
+                            alert_id = self._live.get(key)
+                            if alert_id is None:
+                                continue
+                            alert = self._alerts.pop(alert_id)
+                            self._release(alert)
+                            alert.update(value=float(value), triggered=now)
+                            history = self._fired.setdefault(alert['owner'], deque(maxlen=ALERT_HISTORY))
+                            history.append(alert)
+                            fired.append(alert)
+            self.stats['checks'] += 1
+            self.stats['triggered'] += len(fired)
+            self.stats['last_check'] = now
+        return fired
+
+    def refresh_moving_averages(self):
+        """Move 'Crosses MA' thresholds to the current averages"""
+        with self._lock:
+            pending = [dict(alert) for alert in self._alerts.values() if alert['kind'] == 'Crosses MA']
+        levels = {}
+        for alert in pending:
+            key = (alert['symbol'], alert['window'])
+            if key not in levels:
+                try:
+                    levels[key] = self.moving_average(*key)
+                except Exception:
+                    levels[key] = None
+        with self._lock:
+            for alert in pending:
+                current = self._alerts.get(alert['id'])
+                level = levels[(alert['symbol'], alert['window'])]
+                if current is None or level is None or level == current['threshold']:
+                    continue
+                self._unbook(current)
+                current['threshold'] = level
+                self._book(current)
+
+    def evaluate(self):
+        """One worker pass: read the streamer's new deltas and check them"""
+        with self._lock:
+            symbols = sorted(self._watched)
+            unchecked, self._unchecked = self._unchecked, set()
+        if not symbols:
+            return []
+        self.streamer.subscribe(symbols)
+        result = None if self._seq is None else self.streamer.updates(self._seq, symbols)
+        if result is None:
+            # First pass or fell behind the ring buffer: check full quotes
+            self._seq, changes = self.streamer.snapshot(symbols)
+        else:
+            self._seq, changes = result
+            fresh = self.streamer.snapshot([symbol for symbol in unchecked if symbol not in changes])[1]
+            changes.update(fresh)
+        # Symbols without a quote yet are checked once the producer has polled them
+        with self._lock:
+            self._unchecked.update(symbol for symbol in unchecked if symbol not in changes)
+        fired = self.check(changes)
+        if time.monotonic() - self._ma_checked > self.ma_refresh:
+            self._ma_checked = time.monotonic()
+            self.refresh_moving_averages()
+        return fired
+
+    def _run(self):
+        while True:
+            try:
+                self.evaluate()
+            except Exception:
+                self.stats['errors'] += 1
+            time.sleep(self.interval)
+
+@st.cache_resource
+def get_alert_engine():
+    """Process-wide alert engine; its worker reads the ALERT_FEED streamer"""
+    return AlertEngine(get_price_streamer(ALERT_FEED), get_ohlcv_store(), registry=get_symbol_registry())
+
+def format_alert_value(value):
+    return f"{value:,.2f}" if abs(value) >= 1 else f"{value:.4g}"
+
+def describe_alert(alert):
+    """Condition text for an alert record"""
+    if alert['kind'] == 'Crosses MA':
+        arrow = '↑' if alert['direction'] == 'above' else '↓'
+        return f"Crosses {alert['window']}d MA {arrow} ({format_alert_value(alert['threshold'])})"
+    unit = '%' if '%' in alert['field'] else ''
+    return f"{alert['kind']} {format_alert_value(alert['threshold'])}{unit}"
+
+def render_price_alerts(engine, owner, symbols):
+    """Sidebar form for adding alerts, with the session's active alerts"""
+    with st.form('price_alert_form'):
+        symbol = st.selectbox("Symbol", symbols, key='alert_symbol')
+        kind = st.selectbox("Condition", list(ALERT_KINDS), key='alert_kind')
+        threshold = st.number_input("Threshold (price or %)", value=0.0, step=1.0, key='alert_threshold')
+        window = st.selectbox("Moving Average (days)", ALERT_MA_WINDOWS, index=1, key='alert_window',
+                              help="Only used by 'Crosses MA'")
+        if st.form_submit_button("➕ ADD ALERT"):
+            try:
+                engine.add(owner, symbol, kind, threshold, window if kind == 'Crosses MA' else None)
+                st.markdown('<p class="success-message">✓ Price alert added!</p>', unsafe_allow_html=True)
+            except Exception as e:
+                st.warning(f"⚠️ Could not add alert: {e}")
+
+    active = engine.alerts(owner)
+    if active:
+        st.dataframe(
+            pd.DataFrame({
+                'Symbol': [alert['symbol'] for alert in active],
+                'Condition': [describe_alert(alert) for alert in active]
+            }, index=pd.Index([alert['id'] for alert in active], name='ID')),
+            use_container_width=True
+        )
+        cancel_id = st.selectbox("Alert", [alert['id'] for alert in active], key='alert_cancel',
+                                 format_func=lambda alert_id: f"#{alert_id}")
+        if st.button("🗑️ CANCEL ALERT"):
+            engine.cancel(owner, cancel_id)
+            st.markdown('<p class="success-message">✓ Alert cancelled. Rerun to refresh the list.</p>', unsafe_allow_html=True)
+    else:
+        st.caption("No active alerts")
+
+def notify_triggered_alerts(engine, owner):
+    """Toast every alert of owner that fired since the last rerun; returns the fired records"""
+    fired = engine.triggered(owner)
+    notified = st.session_state.alerts_notified
+    for alert in fired:
+        if alert['id'] not in notified:
+            notified.add(alert['id'])
+            st.toast(f"🔔 {alert['symbol']}: {describe_alert(alert)} at {format_alert_value(alert['value'])} "
+                     f"({alert['triggered']:%H:%M:%S})")
+    return fired
+
+# Risk metrics calculation
+RISK_FREE_RATE = 2.0          # annual %, used for the Sharpe ratio
+RISK_HISTORY_DAYS = 3 * 365   # daily closes loaded for the risk model
+RISK_WINDOW_DAYS = 365        # default look-back for the metrics
+ANNUALIZATION_DAYS = 365      # crypto trades every day
+VAR_CONFIDENCE = 0.95
+VAR_Z_SCORE = 1.6448536269514722  # one-sided normal quantile for 95%
+
+# Used when no price history is available (e.g. offline)
+RISK_METRICS_FALLBACK = {
+    'Conservative': {
+        'Expected Return': 8.5,
+        'Volatility': 12.3,
+        'Sharpe Ratio': 0.69,
+        'Max Drawdown': 15.7,
+        'VaR (95%)': 5.2
+    },
+    'Moderate': {
+        'Expected Return': 12.8,
+        'Volatility': 18.5,
+        'Sharpe Ratio': 0.72,
+        'Max Drawdown': 22.4,
+        'VaR (95%)': 8.7
+    },
+    'Aggressive': {
+        'Expected Return': 18.2,
+        'Volatility': 28.9,
+        'Sharpe Ratio': 0.68,
+        'Max Drawdown': 35.6,
+        'VaR (95%)': 14.3
+    }
+}
+
+# Streaming covariance
+EWMA_HALFLIFE_DAYS = 30.0      # days of returns over which an observation's weight halves
+CORRELATION_MAX_ASSETS = 40    # assets drawn in the correlation heatmap
+
+class EWMACovariance:
+    """Exponentially weighted mean and covariance of asset returns.
+
+    Weights halve every halflife days of data. fit() seeds the estimate from
+    a frame of daily returns in one weighted pass; update() then folds in a
+    single return vector with a rank-one update,
+
+        S <- decay * (S + (1 - decay) * d d' / elapsed),   d = r - mean * elapsed
+
+    so a new bar or tick costs O(n^2) instead of a pass over the window.
+    elapsed is in days, which scales returns over shorter spans (ticks) to
+    daily variance. observe_prices() turns successive price snapshots into
+    such return vectors.
+    """
+
+    def __init__(self, assets, halflife=EWMA_HALFLIFE_DAYS):
+        self.assets = list(assets)
+        self.index = {asset: i for i, asset in enumerate(self.assets)}
+        self.halflife = halflife
+        self.mean = np.zeros(len(self.assets))
+        self.cov = np.zeros((len(self.assets), len(self.assets)))
+        self.updates = 0
+        self._prices = {}
+        self._observed = None
+        self._lock = threading.RLock()
+
+    def fit(self, returns):
+        """Seed from a frame of daily returns with one column per asset; missing values are skipped pairwise"""
+        values = returns.reindex(columns=self.assets).to_numpy(dtype=float)
+        valid = np.isfinite(values)
+        decay = 0.5 ** (1 / self.halflife)
+        root_weights = np.sqrt(decay ** np.arange(len(values) - 1, -1, -1))[:, None]
+        totals = (valid * root_weights ** 2).sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(totals > 0, (np.where(valid, values, 0.0) * root_weights ** 2).sum(axis=0) / totals, 0.0)
+            centred = np.where(valid, values - mean, 0.0) * root_weights
+            observed = valid * root_weights
+            pairs = observed.T @ observed
+            cov = np.where(pairs > 0, (centred.T @ centred) / pairs, 0.0)
+        with self._lock:
+            self.mean, self.cov, self.updates = mean, cov, len(values)
+        return self
+
+    def update(self, returns, elapsed=1.0, mask=None):
+        """Fold in one return vector covering elapsed days; mask limits the update to some assets"""
+        decay = 0.5 ** (elapsed / self.halflife)
+        scale = decay * (1 - decay) / elapsed
+        with self._lock:
+            if mask is None:
+                deviation = returns - self.mean * elapsed
+                self.mean += (1 - decay) * (returns / elapsed - self.mean)
+                self.cov *= decay
+                self.cov += np.outer(deviation, deviation * scale)
+            else:
+                positions = np.flatnonzero(mask)
+                block = np.ix_(positions, positions)
+                deviation = returns[positions] - self.mean[positions] * elapsed
+                self.mean[positions] += (1 - decay) * (returns[positions] / elapsed - self.mean[positions])
+                self.cov[block] = decay * self.cov[block] + np.outer(deviation, deviation * scale)
+            self.updates += 1
+
+    def observe_prices(self, prices, now=None):
+        """Update from {asset: price}: returns since each asset's previous price, over the time since the last call"""
+        now = time.time() if now is None else now
+        returns = np.zeros(len(self.assets))
+        mask = np.zeros(len(self.assets), dtype=bool)
+        with self._lock:
+            for asset, price in prices.items():
+                position = self.index.get(asset)
+                if position is None or not price or not np.isfinite(price):
+                    continue
+                previous = self._prices.get(asset)
+                if previous:
+                    returns[position] = price / previous - 1
+                    mask[position] = True
+                self._prices[asset] = price
+            elapsed = (now - self._observed) / 86400 if self._observed is not None else 0.0
+            self._observed = now
+            if elapsed > 0 and mask.any():
+                self.update(returns, elapsed, None if mask.all() else mask)
+
+    def covariance(self, assets=None):
+        """Daily covariance matrix as a frame"""
+        assets = list(assets) if assets is not None else self.assets
+        positions = [self.index[asset] for asset in assets]
+        with self._lock:
+            cov = self.cov[np.ix_(positions, positions)].copy()
+        return pd.DataFrame(cov, index=assets, columns=assets)
+
+    def correlation(self, assets=None):
+        """Correlation matrix as a frame; assets without variance get NaN"""
+        cov = self.covariance(assets)
+        std = np.sqrt(np.diag(cov.to_numpy()))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = cov.to_numpy() / np.outer(std, std)
+        corr = np.where(np.outer(std, std) > 0, np.clip(corr, -1, 1), np.nan)
+        return pd.DataFrame(corr, index=cov.index, columns=cov.columns)
+
+    def portfolio(self, allocation):
+        """(daily mean, daily volatility) of an allocation under the current estimate"""
+        positions = [self.index[asset] for asset in allocation]
+        weights = np.array(list(allocation.values()), dtype=float)
+        weights = weights / weights.sum()
+        with self._lock:
+            mean = float(self.mean[positions] @ weights)
+            variance = float(weights @ self.cov[np.ix_(positions, positions)] @ weights)
+        return mean, np.sqrt(max(variance, 0.0))
+
+def correlation_heatmap(corr):
+    """Altair heatmap of a correlation frame"""
+    import altair as alt
+    order = list(corr.columns)
+    cells = corr.rename_axis('Asset').reset_index().melt(id_vars='Asset', var_name='Versus', value_name='Correlation')
+    return alt.Chart(cells).mark_rect().encode(
+        x=alt.X('Versus:N', sort=order, title=None),
+        y=alt.Y('Asset:N', sort=order, title=None),
+        color=alt.Color('Correlation:Q', scale=alt.Scale(domain=[-1, 1], scheme='redyellowgreen')),
+        tooltip=['Asset', 'Versus', alt.Tooltip('Correlation:Q', format='.2f')]
+    )
+
+class RiskModel:
+    """Daily return statistics for the asset universe.
+
+    Built once per data refresh. Mean vectors and covariance matrices are
+    computed once per look-back window and shared by every allocation;
+    per-allocation metrics are memoized on (weights, window), so moving a
+    slider back to a previous value costs a dictionary lookup. The EWMA
+    covariance is seeded from the same returns and keeps moving with live
+    ticks between refreshes, so its metrics are computed on every call.
+    """
+
+    def __init__(self, returns):
+        self.returns = returns.dropna(how='all')
+        self.assets = [asset for asset in self.returns.columns if self.returns[asset].notna().any()]
+        self.ewma = EWMACovariance(self.assets).fit(self.returns[self.assets])
+        self._stats = {}
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def covers(self, allocation):
+        return len(self.returns) > 1 and all(asset in self.assets for asset in allocation)
+
+    def window_stats(self, window=RISK_WINDOW_DAYS):
+        """(returns, mean vector, covariance matrix) over the last window days"""
+        with self._lock:
+            stats = self._stats.get(window)
+            if stats is None:
+                returns = self.returns.iloc[-window:] if window else self.returns
+                stats = (returns, returns.mean(), returns.cov())
+                self._stats[window] = stats
+        return stats
+
+    def metrics(self, allocation, window=RISK_WINDOW_DAYS):
+        key = (tuple(sorted(allocation.items())), window)
+        with self._lock:
+            cached = self._memo.get(key)
+        if cached is not None:
+            return dict(cached, **self.ewma_metrics(allocation))
+
+        returns, mean, cov = self.window_stats(window)
+        assets = list(allocation)
+        weights = np.array([allocation[asset] for asset in assets], dtype=float)
+        weights = weights / weights.sum()
+
+        daily_mean = float(mean[assets].to_numpy() @ weights)
+        daily_vol = float(np.sqrt(weights @ cov.loc[assets, assets].to_numpy() @ weights))
+        portfolio_returns = returns[assets].dropna().to_numpy() @ weights
+        wealth = np.cumprod(1 + portfolio_returns)
+        peaks = np.maximum.accumulate(wealth)
+
+        expected_return = daily_mean * ANNUALIZATION_DAYS * 100
+        volatility = daily_vol * np.sqrt(ANNUALIZATION_DAYS) * 100
+        result = {
+            'Expected Return': expected_return,
+            'Volatility': volatility,
+            'Sharpe Ratio': (expected_return - RISK_FREE_RATE) / volatility if volatility else 0.0,
+            'Max Drawdown': float(((peaks - wealth) / peaks).max() * 100) if len(wealth) else 0.0,
+            'VaR (95%)': float(-np.percentile(portfolio_returns, (1 - VAR_CONFIDENCE) * 100) * 100) if len(portfolio_returns) else 0.0,
+            'Parametric VaR (95%)': (VAR_Z_SCORE * daily_vol - daily_mean) * 100
+        }
+        with self._lock:
+            self._memo[key] = result
+        return dict(result, **self.ewma_metrics(allocation))
+
+    def optimize(self, assets, lower, upper, target_volatility, window=RISK_WINDOW_DAYS):
+        """optimize_portfolios() over the assets with history in the window, or None for fewer than two"""
+        returns, mean, cov = self.window_stats(window)
+        assets = [asset for asset in assets if asset in self.assets and returns[asset].count() > 1]
+        if len(assets) < 2:
+            return None
+        key = ('frontier', tuple(assets), lower, upper, target_volatility, window)
+        with self._lock:
+            cached = self._memo.get(key)
+        if cached is None:
+            cached = optimize_portfolios(mean[assets].to_numpy(), cov.loc[assets, assets].fillna(0).to_numpy(),
+                                         assets, lower, upper, target_volatility)
+            with self._lock:
+                self._memo[key] = cached
+        return cached
+
+    def ewma_metrics(self, allocation):
+        daily_mean, daily_vol = self.ewma.portfolio(allocation)
+        return {
+            'EWMA Volatility': daily_vol * np.sqrt(ANNUALIZATION_DAYS) * 100,
+            'EWMA VaR (95%)': (VAR_Z_SCORE * daily_vol - daily_mean) * 100
+        }
+
+@instrumented('compute.risk_model')
+def build_risk_model(store=None, days=RISK_HISTORY_DAYS):
+    """RiskModel over daily closes for every symbol in STOOQ_SYMBOLS"""
+    end = pd.Timestamp.now().normalize()
+    try:
+        closes = load_price_history(list(STOOQ_SYMBOLS), end - pd.Timedelta(days=days), end, store)
+    except Exception:
+        closes = pd.DataFrame(columns=list(STOOQ_SYMBOLS), dtype=float)
+    return RiskModel(closes.ffill().pct_change(fill_method=None))
+
+def get_risk_model(cache=None, store=None):
+    """Shared RiskModel, rebuilt when the history cache expires or is invalidated"""
+    cache = cache or get_market_data_cache()
+    store = store or get_ohlcv_store()
+    return cache.get('history_7d', 'risk_model', lambda: build_risk_model(store))
+
+def format_allocation(allocation):
+    """Caption such as '30% BTC | 40% ETH' for an allocation dict"""
+    return ' | '.join(f"{weight * 100:.0f}% {asset}" for asset, weight in allocation.items())
+
+@instrumented('compute.risk_metrics')
+def calculate_risk_metrics(portfolio_type, allocation, risk_model=None, window=RISK_WINDOW_DAYS):
+    """Annualized return/volatility (%), Sharpe, max drawdown (%) and 1-day VaR (%)"""
+    if risk_model is not None and risk_model.covers(allocation):
+        return risk_model.metrics(allocation, window)
+    return dict(RISK_METRICS_FALLBACK.get(portfolio_type, {}))
+
+# Mean-variance optimization
+FRONTIER_POINTS = 150              # portfolios traced in one batch
+FRONTIER_ITERATIONS = 300          # accelerated projected-gradient steps at most
+FRONTIER_TOLERANCE = 1e-9          # stop once no weight moves more than this in a step
+FRONTIER_WEIGHT_BOUNDS = (0, 40)   # default per-asset weight range, %
+FRONTIER_TARGET_VOLATILITY = 40.0  # default annual volatility for the target-volatility portfolio, %
+OPTIMIZED_PORTFOLIOS = ['Minimum Variance', 'Maximum Sharpe', 'Target Volatility']
+OPTIMIZED_MIN_WEIGHT = 0.005       # weights below this are dropped when applied to a strategy
+
+def project_to_bounded_simplex(points, lower, upper, iterations=30):
+    """Euclidean projection of each row onto {w : sum(w) = 1, lower <= w <= upper}.
+
+    The projection is clip(v - tau, lower, upper) for the shift tau that
+    makes the row sum to one. The sum falls monotonically in tau, so every
+    row's tau is bracketed at once by bisection; once the bracket is narrow
+    the coordinates strictly inside the bounds are known and tau is solved
+    exactly from them.
+    """
+    low = (points - upper).min(axis=1, keepdims=True)
+    high = (points - lower).max(axis=1, keepdims=True)
+    for _ in range(iterations):
+        tau = (low + high) / 2
+        over = np.clip(points - tau, lower, upper).sum(axis=1, keepdims=True) > 1
+        low = np.where(over, tau, low)
+        high = np.where(over, high, tau)
+    shifted = points - (low + high) / 2
+    free = (shifted > lower) & (shifted < upper)
+    count = free.sum(axis=1, keepdims=True)
+    fixed = np.where(free, 0.0, np.clip(shifted, lower, upper)).sum(axis=1, keepdims=True)
+    exact = (np.where(free, points, 0.0).sum(axis=1, keepdims=True) - (1 - fixed)) / np.maximum(count, 1)
+    tau = np.where(count > 0, exact, (low + high) / 2)
+    return np.clip(points - tau, lower, upper)
+
+@instrumented('compute.frontier')
+def efficient_frontier(mean, cov, lower=0.0, upper=1.0, points=FRONTIER_POINTS, iterations=FRONTIER_ITERATIONS):
+    """Mean-variance efficient frontier traced as one batch.
+
+    Solves min w'Cw - g * m'w subject to sum(w) = 1 and lower <= w <= upper
+    for `points` risk tolerances g at once with accelerated projected
+    gradient descent (FISTA): each step is one (points x n) @ (n x n)
+    product and a batched projection, until no weight moves. g = 0 gives the minimum-variance
+    portfolio and the largest g the maximum-return one. Returns (weights,
+    returns, volatilities) in the units of mean and cov.
+    """
+    mean = np.asarray(mean, dtype=float)
+    n = len(mean)
+    if n * upper < 1 - 1e-9 or n * lower > 1 + 1e-9:
+        raise ValueError(f"Weight bounds {lower:.0%}-{upper:.0%} admit no fully invested portfolio of {n} assets")
+    # Pairwise sample covariances need not be positive semi-definite
+    values, vectors = np.linalg.eigh((np.asarray(cov, dtype=float) + np.asarray(cov, dtype=float).T) / 2)
+    values = np.clip(values, 0, None)
+    cov = (vectors * values) @ vectors.T
+    curvature = max(2 * values.max(), 1e-18)
+    spread = max(np.ptp(mean), 1e-12)
+    tolerances = np.concatenate(([0.0], np.geomspace(1e-3, 1e3, points - 1) * curvature / spread))[:, None]
+
+    weights = project_to_bounded_simplex(np.full((points, n), 1 / n), lower, upper)
+    momentum, t = weights, 1.0
+    for _ in range(iterations):
+        gradient = 2 * momentum @ cov - tolerances * mean
+        updated = project_to_bounded_simplex(momentum - gradient / curvature, lower, upper)
+        step = updated - weights
+        if np.abs(step).max() < FRONTIER_TOLERANCE:
+            weights = updated
+            break
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        momentum = updated + (t - 1) / t_next * step
+        weights, t = updated, t_next
+    returns = weights @ mean
+    volatilities = np.sqrt(np.clip(np.einsum('ij,jk,ik->i', weights, cov, weights), 0, None))
+    return weights, returns, volatilities
+
+def optimize_portfolios(mean, cov, assets, lower=0.0, upper=1.0, target_volatility=FRONTIER_TARGET_VOLATILITY,
+                        risk_free_rate=RISK_FREE_RATE):
+    """(frontier, portfolios) from daily mean returns and covariance, in annual %.
+
+    frontier has Volatility, Expected Return and Sharpe Ratio per traced
+    point; portfolios has one row per OPTIMIZED_PORTFOLIOS entry with the
+    same statistics followed by a weight column per asset. The target-
+    volatility portfolio is the highest-return point within the target, or
+    the minimum-variance one when the target is below it.
+    """
+    weights, returns, volatilities = efficient_frontier(mean, cov, lower, upper)
+    frontier = pd.DataFrame({
+        'Volatility': volatilities * np.sqrt(ANNUALIZATION_DAYS) * 100,
+        'Expected Return': returns * ANNUALIZATION_DAYS * 100
+    })
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frontier['Sharpe Ratio'] = np.where(frontier['Volatility'] > 0,
+                                            (frontier['Expected Return'] - risk_free_rate) / frontier['Volatility'], 0.0)
+    minimum = int(frontier['Volatility'].idxmin())
+    within = frontier['Volatility'] <= target_volatility
+    picks = [
+        minimum,
+        int(frontier['Sharpe Ratio'].idxmax()),
+        int(frontier['Expected Return'].where(within).idxmax()) if within.any() else minimum
+    ]
+    portfolios = pd.concat([
+        frontier.loc[picks].reset_index(drop=True),
+        pd.DataFrame(weights[picks], columns=list(assets))
+    ], axis=1).set_axis(pd.Index(OPTIMIZED_PORTFOLIOS, name='Portfolio'))
+    return frontier.sort_values('Volatility', ignore_index=True), portfolios
+
+def optimize_allocation(risk_model, assets, lower, upper, target_volatility, window=RISK_WINDOW_DAYS):
+    """risk_model.optimize(...), or None when there is no model"""
+    if risk_model is None:
+        return None
+    return risk_model.optimize(assets, lower, upper, target_volatility, window)
+
+def frontier_chart(frontier, points):
+    """Altair efficient frontier with labelled strategy and optimized portfolios"""
+    import altair as alt
+    x = alt.X('Volatility:Q', title='Volatility (%)')
+    y = alt.Y('Expected Return:Q', title='Expected Return (%)')
+    line = alt.Chart(frontier).mark_line(color='#00FF85').encode(
+        x=x, y=y, tooltip=[alt.Tooltip(column, format='.2f') for column in frontier.columns]
+    )
+    dots = alt.Chart(points).mark_point(size=120, filled=True).encode(
+        x=x, y=y,
+        color=alt.Color('Kind:N', scale=alt.Scale(range=['#FF5722', '#00CCFF'])),
+        shape='Kind:N',
+        tooltip=['Portfolio', alt.Tooltip('Volatility', format='.2f'),
+                 alt.Tooltip('Expected Return', format='.2f'), alt.Tooltip('Sharpe Ratio', format='.2f')]
+    )
+    labels = alt.Chart(points).mark_text(align='left', dx=8, color='#F5F5F5').encode(x=x, y=y, text='Portfolio:N')
+    return line + dots + labels
+
+def apply_optimized_weights(portfolio_type, weights):
+    """on_click callback: replace a strategy's allocation with optimized weights"""
+    kept = {asset: weight for asset, weight in weights.items() if weight >= OPTIMIZED_MIN_WEIGHT}
+    total = sum(kept.values())
+    st.session_state.portfolio_allocation[portfolio_type] = {
+        asset: round(weight / total, 4) for asset, weight in kept.items()
+    }
+
+# Portfolio backtesting
+BACKTEST_RETURN_PROFILES = {
+    'Conservative': (0.00035, 0.015),
+    'Moderate': (0.00045, 0.022),
+    'Aggressive': (0.00060, 0.035)
+}
+
+def contribution_mask(dates, contribution_freq):
+    """Boolean mask of the bars that receive a contribution.
+
+    Contributions land on the first bar of each day (Daily), of each Monday
+    (Weekly), of the 1st of the month (Monthly) or of January 1st (Yearly).
+    On a daily index every bar is the first bar of its day.
+    """
+    dates = pd.DatetimeIndex(dates)
+    first_of_day = ~dates.normalize().duplicated()
+    if contribution_freq == 'Daily':
+        mask = first_of_day
+    elif contribution_freq == 'Weekly':
+        mask = first_of_day & (dates.dayofweek == 0)
+    elif contribution_freq == 'Monthly':
+        mask = first_of_day & (dates.day == 1)
+    elif contribution_freq == 'Yearly':
+        mask = first_of_day & (dates.month == 1) & (dates.day == 1)
+    else:
+        mask = np.zeros(len(dates), dtype=bool)
+    return np.asarray(mask, dtype=bool)
+
+def simulate_value_path(initial_investment, returns, contributions):
+    """Closed-form value path for V[i] = (V[i-1] + c[i]) * (1 + r[i]).
+
+    With growth G[i] = prod(1 + r[1..i]) the recurrence unrolls to
+    V[i] = G[i] * (V[0] + sum(c[j] / G[j-1] for j <= i)), which is two
+    cumulative products/sums instead of a Python loop. returns[0] and
+    contributions[0] are ignored: the first bar is the initial investment.
+    """
+    growth = np.cumprod(np.concatenate(([1.0], 1.0 + returns[1:])))
+    discounted = np.zeros(len(returns))
+    discounted[1:] = contributions[1:] / growth[:-1]
+    return growth * (initial_investment + np.cumsum(discounted))
+
+@instrumented('compute.backtest')
+def backtest_portfolio(portfolio_type, start_date, end_date, initial_investment, contribution_freq, contribution_amount, reinvest=True, freq='D'):
+    dates = pd.date_range(start=start_date, end=end_date, freq=freq)
+    
+    daily_return_mean, daily_return_std = BACKTEST_RETURN_PROFILES.get(
+        portfolio_type, BACKTEST_RETURN_PROFILES['Aggressive']
+    )
+    # Scale the daily profile to the bar size (a no-op for daily bars)
+    bar_days = (dates[1] - dates[0]) / pd.Timedelta(days=1) if len(dates) > 1 else 1.0
+    
+    np.random.seed(42)
+    returns = np.random.normal(daily_return_mean * bar_days, daily_return_std * np.sqrt(bar_days), len(dates))
+    
+    contributions = contribution_mask(dates, contribution_freq) * contribution_amount
+    wealth = simulate_value_path(initial_investment, returns, contributions)
+    
+    # A contribution on bar i is credited to the value shown for bar i-1
+    portfolio_value = wealth.copy()
+    portfolio_value[:-1] += contributions[1:]
+    
+    results_df = pd.DataFrame({
+        'Date': dates,
+        'Portfolio Value': portfolio_value,
+        'Daily Return': np.insert(returns[1:], 0, 0)
+    })
+    
+    return results_df
+
+# Backtest result cache
+BACKTEST_CACHE_SIZE = 32   # simulated return paths kept, one per (strategy, start, frequency, bar size)
+
+class BacktestCache:
+    """LRU of simulated backtests with checkpoints for extending them.
+
+    The value path is linear in the initial investment and the contribution
+    amount, so each entry stores the seeded returns, the growth path and the
+    unit-contribution path for one (strategy, start date, contribution
+    frequency, bar size), plus the RNG state after the last bar. Any
+    investment and contribution amount is then a weighted sum of two cached
+    columns, a shorter end date is a slice, and a later end date only draws
+    and simulates the new bars. Results match backtest_portfolio().
+    """
+
+    def __init__(self, maxsize=BACKTEST_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.stats = {'hits': 0, 'extensions': 0, 'misses': 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _simulate(self, key, dates, entry=None):
+        portfolio_type, _, contribution_freq, _ = key
+        daily_return_mean, daily_return_std = BACKTEST_RETURN_PROFILES.get(
+            portfolio_type, BACKTEST_RETURN_PROFILES['Aggressive']
+        )
+        mask = contribution_mask(dates, contribution_freq).astype(float)
+        if entry is None:
+            bar_days = (dates[1] - dates[0]) / pd.Timedelta(days=1) if len(dates) > 1 else 1.0
+            rng = np.random.RandomState(42)
+            returns = rng.normal(daily_return_mean * bar_days, daily_return_std * np.sqrt(bar_days), len(dates))
+            growth = np.cumprod(np.concatenate(([1.0], 1.0 + returns[1:])))
+            discounted = np.zeros(len(dates))
+            discounted[1:] = mask[1:] / growth[:-1]
+            unit = np.cumsum(discounted)
+        else:
+            # Continue the seeded stream from the checkpoint for the new bars only
+            n = len(entry['dates'])
+            bar_days = entry['bar_days']
+            rng = np.random.RandomState()
+            rng.set_state(entry['rng_state'])
+            new_returns = rng.normal(daily_return_mean * bar_days, daily_return_std * np.sqrt(bar_days), len(dates) - n)
+            new_growth = entry['growth'][-1] * np.cumprod(1.0 + new_returns)
+            previous_growth = np.concatenate(([entry['growth'][-1]], new_growth[:-1]))
+            returns = np.concatenate((entry['returns'], new_returns))
+            growth = np.concatenate((entry['growth'], new_growth))
+            unit = np.concatenate((entry['unit'], entry['unit'][-1] + np.cumsum(mask[n:] / previous_growth)))
+        return {
+            'dates': dates, 'bar_days': bar_days, 'returns': returns, 'growth': growth,
+            'unit': unit, 'mask': mask, 'rng_state': rng.get_state()
+        }
+
+    @instrumented('compute.backtest')
+    def run(self, portfolio_type, start_date, end_date, initial_investment, contribution_freq,
+            contribution_amount, reinvest=True, freq='D'):
+        """Same result as backtest_portfolio() with these arguments"""
+        dates = pd.date_range(start=start_date, end=end_date, freq=freq)
+        key = (portfolio_type, dates[0] if len(dates) else pd.Timestamp(start_date), contribution_freq, freq)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and len(entry['dates']) < 2 <= len(dates):
+                entry = None  # a single-bar run has no bar size to continue with
+            if entry is None:
+                entry = self._simulate(key, dates)
+                result = 'misses'
+            elif len(dates) > len(entry['dates']):
+                entry = self._simulate(key, dates, entry)
+                result = 'extensions'
+            else:
+                result = 'hits'
+            self.stats[result] += 1
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+        count_metric('backtest_cache', result=result)
+        n = len(dates)
+        growth, unit, mask = entry['growth'][:n], entry['unit'][:n], entry['mask'][:n]
+        contributions = mask * contribution_amount
+        portfolio_value = growth * (initial_investment + contribution_amount * unit)
+        # A contribution on bar i is credited to the value shown for bar i-1
+        portfolio_value[:-1] += contributions[1:]
+        return pd.DataFrame({
+            'Date': dates,
+            'Portfolio Value': portfolio_value,
+            'Daily Return': np.insert(entry['returns'][1:n], 0, 0)
+        })
+
+@st.cache_resource
+def get_backtest_cache():
+    """Process-wide backtest cache; results are deterministic, so sessions share them"""
+    return BacktestCache()
+
+# Historical multi-asset backtesting
+REBALANCE_OPTIONS = ['None', 'Monthly', 'Quarterly', 'Threshold']
+REBALANCE_THRESHOLD = 0.05   # absolute weight drift that triggers a threshold rebalance
+THRESHOLD_LOOKAHEAD = 256    # bars simulated per block while scanning for drift
+
+@instrumented('fetch.price_history')
+def load_price_history(symbols, start_date, end_date, store=None, registry=None):
+    """Aligned daily closes for symbols between start_date and end_date.
+
+    Only missing ranges are downloaded: one bulk Yahoo request backfills
+    the head of every symbol whose stored history starts after start_date,
+    and one more brings stale tails up to date. Tickers come from the
+    registry. When the provider answers but has nothing further back for a
+    symbol, that date is recorded as its inception, and a tail the
+    provider cannot extend is marked checked for the day, so neither is
+    re-requested on every call.
+    """
+    registry = registry or BUILTIN_REGISTRY
+
+    def yahoo_tickers(symbols):
+        # Symbols outside the registry get its default <SYMBOL>-USD ticker
+        return [ticker or f"{symbol}-USD" for symbol, ticker in zip(symbols, registry.lookup(symbols, 'yahoo'))]
+
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date)
+    if store is None:
+        tickers = yahoo_tickers(symbols)
+        bars = download_yahoo_bars(tickers, period=None, interval="1d", start=start.date())
+        closes = bars['Close'].reindex(columns=tickers) if not bars.empty else pd.DataFrame(columns=tickers)
+        closes = closes.set_axis(list(symbols), axis=1)
+        closes.index = pd.DatetimeIndex(closes.index).tz_localize(None).normalize()
+        return closes.loc[(closes.index >= start) & (closes.index <= end)]
+
+    tolerance = pd.Timedelta(days=3)
+    today = pd.Timestamp.now().normalize()
+    current = min(end, today) - pd.Timedelta(days=1)
+    heads, tails = {}, {}   # symbol -> (window start, window end) still to download
+    for symbol in symbols:
+        first, last = store.first_timestamp(symbol), store.last_timestamp(symbol)
+        inception = store.inception(symbol)
+        head_start = max(start, inception) if inception is not None else start
+        if first is None:
+            if head_start <= end:
+                heads[symbol] = (head_start, end)
+        elif first > head_start + tolerance:
+            heads[symbol] = (head_start, first)
+        checked = store.checked(symbol)
+        if last is not None and last < current and (checked is None or checked < today):
+            tails[symbol] = (last, today)
+
+    def download(windows):
+        """Store one bulk download covering windows; None if the provider sent nothing at all"""
+        stale = list(windows)
+        window_start = min(first for first, _ in windows.values())
+        window_end = max(last for _, last in windows.values()) + pd.Timedelta(days=1)
+        stale_tickers = yahoo_tickers(stale)
+        bars = download_yahoo_bars(stale_tickers, period=None, interval="1d",
+                                   start=window_start.date(), end=window_end.date())
+        if bars.empty:
+            return None
+        received = set()
+        for symbol, ticker in zip(stale, stale_tickers):
+            if ticker not in bars.columns.get_level_values(1):
+                continue
+            fetched = normalize_ohlcv(bars.xs(ticker, axis=1, level=1))
+            if len(fetched):
+                store.append(symbol, fetched)
+                received.add(symbol)
+        return received
+
+    received = download(heads) if heads else None
+    if received is not None:
+        for symbol, (head_start, head_end) in heads.items():
+            first = store.first_timestamp(symbol)
+            if first is None:
+                # The provider answered without bars for symbol: none exist up to head_end
+                store.set_inception(symbol, head_end + pd.Timedelta(days=1))
+            elif first > head_start + tolerance:
+                # Nothing near head_start: symbol did not exist yet
+                store.set_inception(symbol, first)
+    if tails and download(tails) is not None:
+        for symbol in tails:
+            store.set_checked(symbol, today)
+    return store.load_closes(symbols, start=start, end=end)
+
+def rebalance_starts(dates, rebalance):
+    """Bar positions of calendar rebalances; position 0 is always included"""
+    dates = pd.DatetimeIndex(dates)
+    if rebalance == 'Monthly':
+        periods = dates.to_period('M')
+    elif rebalance == 'Quarterly':
+        periods = dates.to_period('Q')
+    else:
+        return np.array([0])
+    changes = np.flatnonzero(np.asarray(periods[1:] != periods[:-1])) + 1
+    return np.concatenate(([0], changes))
+
+@instrumented('compute.backtest_allocation')
+def backtest_allocation(allocation, prices, initial_investment, contribution_freq, contribution_amount,
+                        rebalance='None', threshold=REBALANCE_THRESHOLD):
+    """Backtest an allocation dict against real daily closes.
+
+    prices is a Date-indexed frame with one close column per asset. Holdings
+    are tracked as a units matrix (bars x assets) that is advanced block by
+    block between rebalances, so the work per block is a handful of array
+    operations regardless of how many assets the allocation holds.
+    Contributions are split by the target weights and, as in
+    backtest_portfolio, the contribution for bar i is invested at the close
+    of bar i-1. Returns the same columns as backtest_portfolio.
+    """
+    assets = list(allocation)
+    missing = [asset for asset in assets if asset not in prices.columns or prices[asset].isna().all()]
+    if missing:
+        raise ValueError(f"No price history for {', '.join(missing)}")
+    closes = prices[assets].ffill().dropna()
+    if len(closes) < 2:
+        raise ValueError("Not enough overlapping price history for this allocation")
+
+    weights = np.array([allocation[asset] for asset in assets], dtype=float)
+    weights = weights / weights.sum()
+    price_matrix = closes.to_numpy(dtype=float)
+    dates = closes.index
+    n = len(dates)
+
+    contributions = contribution_mask(dates, contribution_freq) * contribution_amount
+    invested = np.zeros(n)
+    invested[:-1] = contributions[1:]
+    bought = np.outer(invested, weights) / price_matrix
+
+    calendar = rebalance_starts(dates, rebalance)
+    value_before = np.empty(n)   # value of the previous bar's holdings at this bar's close
+    value_after = np.empty(n)    # value after this bar's purchases
+    value_before[0] = initial_investment
+
+    start = 0
+    rebalance_now = True
+    carried_units = None
+    while start < n:
+        if rebalance_now:
+            base_units = value_before[start] * weights / price_matrix[start]
+        else:
+            base_units = carried_units
+        stop = calendar[np.searchsorted(calendar, start, side='right')] if start < calendar[-1] else n
+        if rebalance == 'Threshold':
+            stop = min(n, start + THRESHOLD_LOOKAHEAD)
+
+        units = base_units + np.cumsum(bought[start:stop], axis=0)
+        held = units * price_matrix[start:stop]
+        value_after[start:stop] = held.sum(axis=1)
+        value_before[start + 1:stop] = (units[:-1] * price_matrix[start + 1:stop]).sum(axis=1)
+
+        next_start = stop
+        rebalance_next = True
+        if rebalance == 'Threshold':
+            drift = np.abs(held / value_after[start:stop, None] - weights).max(axis=1)
+            skip = 1 if rebalance_now else 0
+            breaches = np.flatnonzero(drift[skip:] > threshold)
+            if breaches.size:
+                # Rebalance at the close of the first bar that drifted too far
+                next_start = start + skip + breaches[0]
+            else:
+                rebalance_next = False
+        elif rebalance == 'None':
+            rebalance_next = False
+
+        if start < next_start < n:
+            carried_units = units[next_start - start - 1]
+            value_before[next_start] = carried_units @ price_matrix[next_start]
+        start = next_start
+        rebalance_now = rebalance_next
+
+    daily_return = np.zeros(n)
+    daily_return[1:] = value_before[1:] / value_after[:-1] - 1
+
+    return pd.DataFrame({
+        'Date': dates,
+        'Portfolio Value': value_after,
+        'Daily Return': daily_return
+    })
+
+# Backtest performance statistics
+ROLLING_WINDOWS = (30, 90, 365)
+
+def _windowed_sum(cumulative, window):
+    """Trailing window sums from a cumulative sum (NaN until the window fills)"""
+    out = np.full(len(cumulative), np.nan)
+    if len(cumulative) >= window:
+        out[window - 1] = cumulative[window - 1]
+        out[window:] = cumulative[window:] - cumulative[:-window]
+    return out
+
+@instrumented('compute.performance')
+def performance_statistics(results, windows=ROLLING_WINDOWS, risk_free_rate=RISK_FREE_RATE):
+    """Headline and rolling performance statistics for a backtest result.
+
+    Statistics are time-weighted, i.e. computed from 'Daily Return' so that
+    contributions do not count as performance. Returns (stats, rolling):
+    stats holds Sharpe, Sortino and Calmar ratios, win rate and best/worst
+    day; rolling is a Date-indexed frame of rolling Sharpe, volatility and
+    drawdown for each window. Rolling means and variances come from
+    windowed differences of cumulative sums, so every window costs O(n).
+    """
+    returns = results['Daily Return'].to_numpy(dtype=float)[1:]
+    dates = pd.DatetimeIndex(results['Date'])[1:]
+    n = len(returns)
+    rf_daily = risk_free_rate / 100 / ANNUALIZATION_DAYS
+    sqrt_year = np.sqrt(ANNUALIZATION_DAYS)
+
+    wealth = np.cumprod(1 + returns)
+    peaks = np.maximum.accumulate(wealth) if n else wealth
+    max_drawdown = float(((peaks - wealth) / peaks).max()) if n else 0.0
+    annual_return = float(wealth[-1] ** (ANNUALIZATION_DAYS / n) - 1) if n else 0.0
+
+    mean = returns.mean() if n else 0.0
+    std = returns.std(ddof=1) if n > 1 else 0.0
+    downside = np.sqrt(np.mean(np.minimum(returns - rf_daily, 0) ** 2)) if n else 0.0
+    excess = (mean - rf_daily) * ANNUALIZATION_DAYS
+
+    stats = {
+        'Sharpe Ratio': excess / (std * sqrt_year) if std else 0.0,
+        'Sortino Ratio': excess / (downside * sqrt_year) if downside else 0.0,
+        'Calmar Ratio': annual_return / max_drawdown if max_drawdown else 0.0,
+        'Win Rate': float((returns > 0).mean() * 100) if n else 0.0,
+        'Best Day': float(returns.max() * 100) if n else 0.0,
+        'Worst Day': float(returns.min() * 100) if n else 0.0,
+        'Max Drawdown': max_drawdown * 100,
+        'Annualized Return': annual_return * 100
+    }
+
+    # Centre the series before accumulating to keep the variance difference stable
+    centred = returns - mean
+    sum_1 = np.cumsum(centred)
+    sum_2 = np.cumsum(centred ** 2)
+    wealth_series = pd.Series(wealth, index=dates)
+    rolling = {}
+    for window in windows:
+        window_mean = _windowed_sum(sum_1, window) / window
+        window_var = (_windowed_sum(sum_2, window) - window * window_mean ** 2) / max(window - 1, 1)
+        window_vol = np.sqrt(np.clip(window_var, 0, None))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rolling[f'Rolling Sharpe {window}d'] = (window_mean + mean - rf_daily) / window_vol * sqrt_year
+        rolling[f'Rolling Volatility {window}d'] = window_vol * sqrt_year * 100
+        rolling[f'Rolling Drawdown {window}d'] = (
+            wealth_series / wealth_series.rolling(window, min_periods=1).max() - 1
+        ).to_numpy() * 100
+    return stats, pd.DataFrame(rolling, index=pd.Index(dates, name='Date'))
+
+# Chart downsampling
+CHART_MAX_POINTS = 1200   # rows sent per full-width chart, about two per horizontal pixel
+
+def minmax_indices(values, buckets):
+    """Positions of the minimum and maximum of each of `buckets` equal slices.
+
+    Keeps the first and last points, so the line keeps its ends and every
+    peak and trough survives the reduction. NaNs only win a slot when the
+    whole slice is NaN, which leaves the gap visible in the chart.
+    """
+    n = len(values)
+    if n <= 2 * buckets + 2:
+        return np.arange(n)
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = values
+    blocks = padded.reshape(buckets, size)
+    missing = np.isnan(blocks)
+    offsets = np.arange(buckets) * size
+    lows = offsets + np.where(missing, np.inf, blocks).argmin(axis=1)
+    highs = offsets + np.where(missing, -np.inf, blocks).argmax(axis=1)
+    keep = np.concatenate(([0, n - 1], lows, highs))
+    return np.unique(keep[keep < n])
+
+def downsample_frame(data, max_points=CHART_MAX_POINTS):
+    """Series or frame cut down to about max_points rows for charting"""
+    frame = data.to_frame() if isinstance(data, pd.Series) else data
+    if len(frame) <= max_points:
+        return data
+    buckets = max(max_points // (2 * frame.shape[1]), 1)
+    keep = np.unique(np.concatenate([
+        minmax_indices(frame[column].to_numpy(dtype=float), buckets) for column in frame.columns
+    ]))
+    return data.iloc[keep]
+
+def chart_zoom(index, key, max_points=CHART_MAX_POINTS):
+    """(start, end) picked on a slider, shown only when index outgrows one chart"""
+    if len(index) <= max_points:
+        return None
+    start, end = index[0].to_pydatetime(), index[-1].to_pydatetime()
+    return st.slider(
+        "Zoom", min_value=start, max_value=end, value=(start, end), key=key, format="YYYY-MM-DD",
+        help=f"Windows of up to {max_points:,} points are drawn at full resolution"
+    )
+
+def downsampled_line_chart(data, zoom=None, max_points=CHART_MAX_POINTS):
+    """st.line_chart of data within the zoom window, downsampled to max_points"""
+    if zoom is not None:
+        data = data.loc[zoom[0]:zoom[1]]
+    st.line_chart(downsample_frame(data, max_points), use_container_width=True)
+    return len(data)
+
+# Backtest parameter sweeps
+SWEEP_PROCESS_THRESHOLD = 5_000_000  # bar x scenario cells before the sweep fans out to processes
+
+def _sweep_group(portfolio_type, start_date, end_date, initial_investment, contribution_freqs, contribution_amounts):
+    """Every freq x amount scenario for one strategy and start date in one array pass.
+
+    Uses the same seeded returns as backtest_portfolio, and relies on the
+    value path being linear in the contribution amount, so all scenarios
+    share one growth vector and differ only in their contribution columns.
+    """
+    dates = pd.date_range(start=start_date, end=end_date, freq='D')
+    n = len(dates)
+    daily_return_mean, daily_return_std = BACKTEST_RETURN_PROFILES.get(
+        portfolio_type, BACKTEST_RETURN_PROFILES['Aggressive']
+    )
+    np.random.seed(42)
+    returns = np.random.normal(daily_return_mean, daily_return_std, n)
+    growth = np.cumprod(np.concatenate(([1.0], 1.0 + returns[1:])))
+
+    scenarios = [(freq, amount) for freq in contribution_freqs for amount in contribution_amounts]
+    masks = {freq: contribution_mask(dates, freq) for freq in contribution_freqs}
+    contributions = np.column_stack([masks[freq] * float(amount) for freq, amount in scenarios])
+
+    discounted = np.zeros_like(contributions)
+    discounted[1:] = contributions[1:] / growth[:-1, None]
+    wealth = growth[:, None] * (initial_investment + np.cumsum(discounted, axis=0))
+    values = wealth.copy()
+    values[:-1] += contributions[1:]
+
+    # Drawdown and return are time-weighted, from the growth path, so deposits
+    # neither hide losses nor count as returns (as in performance_statistics)
+    wealth = growth[1:]
+    peaks = np.maximum.accumulate(wealth)
+    max_drawdown = float((1 - wealth / peaks).max() * 100) if len(wealth) else 0.0
+    annualized_return = float(wealth[-1] ** (ANNUALIZATION_DAYS / len(wealth)) - 1) * 100 if len(wealth) else 0.0
+    final_value = values[-1]
+
+    return pd.DataFrame({
+        'Strategy': portfolio_type,
+        'Start Date': pd.Timestamp(start_date),
+        'Contribution Frequency': [freq for freq, _ in scenarios],
+        'Contribution Amount': [amount for _, amount in scenarios],
+        'Final Value': final_value,
+        'Annualized Return': annualized_return,
+        'Max Drawdown': max_drawdown
+    })
+
+@instrumented('compute.sweep')
+def sweep_backtests(strategies, start_dates, contribution_freqs, contribution_amounts, end_date,
+                    initial_investment=10000.0, max_workers=None):
+    """Evaluate the full strategy x start date x frequency x amount grid.
+
+    Returns one tidy row per combination with final value and the
+    time-weighted annualized return and max drawdown, matching
+    performance_statistics() for a single run. Each (strategy, start date) group is one batched array computation;
+    grids above SWEEP_PROCESS_THRESHOLD cells are spread over a process pool.
+    """
+    groups = [(strategy, start) for strategy in strategies for start in start_dates]
+    if not groups or not contribution_freqs or not contribution_amounts:
+        return pd.DataFrame(columns=['Strategy', 'Start Date', 'Contribution Frequency', 'Contribution Amount',
+                                     'Final Value', 'Annualized Return', 'Max Drawdown'])
+
+    args = [
+        (strategy, start, end_date, initial_investment, list(contribution_freqs), list(contribution_amounts))
+        for strategy, start in groups
+    ]
+    cells = sum(
+        (pd.Timestamp(end_date) - pd.Timestamp(start)).days + 1 for _, start in groups
+    ) * len(contribution_freqs) * len(contribution_amounts)
+
+    if cells > SWEEP_PROCESS_THRESHOLD and len(groups) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            frames = list(pool.map(_sweep_group, *zip(*args)))
+    else:
+        frames = [_sweep_group(*group_args) for group_args in args]
+    return pd.concat(frames, ignore_index=True)
+
+# Monte Carlo portfolio projections
+MC_PERCENTILES = [5, 25, 50, 75, 95]
+MC_MEMORY_BUDGET_MB = 256   # ceiling for the block of simulated returns held at once
+MC_BAND_POINTS = 250        # days sampled for the percentile fan chart
+MC_STUDENT_T_DF = 4
+MC_STREAMS = 8              # independent random streams; paths are split evenly between them
+
+def _mc_fill_gross_returns(rng, out, distribution, mean, std, df, historical_returns):
+    """Fill out (paths x days) with simulated gross daily returns 1 + r, in place"""
+    if distribution == 'normal':
+        rng.standard_normal(out=out, dtype=out.dtype)
+        out *= std
+        out += 1.0 + mean
+    elif distribution == 'student_t':
+        # Rescale so the fat-tailed draws keep the requested standard deviation
+        out[...] = rng.standard_t(df, out.shape)
+        out *= std * np.sqrt((df - 2) / df)
+        out += 1.0 + mean
+    elif distribution == 'bootstrap':
+        np.take(historical_returns, rng.integers(0, len(historical_returns), size=out.shape), out=out)
+        out += 1.0
+    else:
+        raise ValueError(f"Unknown distribution: {distribution}")
+
+def monte_carlo_simulation(mean, std, n_paths, n_days, initial_investment, distribution='normal',
+                           historical_returns=None, df=MC_STUDENT_T_DF, percentiles=MC_PERCENTILES,
+                           memory_budget_mb=MC_MEMORY_BUDGET_MB, band_points=MC_BAND_POINTS,
+                           dtype=np.float64, seed=None):
+    """Simulate n_paths value paths of n_days daily returns.
+
+    distribution is 'normal', 'student_t' (same mean/std, fat tails) or
+    'bootstrap' (daily returns resampled from historical_returns). The
+    horizon is walked in day blocks sized so one (paths x days) block fits
+    in memory_budget_mb; only the per-path value vector is carried between
+    blocks. Paths are split across MC_STREAMS random streams that fill their
+    rows of each block on a thread pool, so results for a given seed do not
+    depend on the number of CPUs. Fan bands are exact cross-path percentiles
+    on up to band_points evenly spaced days.
+
+    Returns a dict with 'bands' (day-indexed percentile frame), 'terminal'
+    (ending value per path), 'prob_loss' and a 'summary' dict.
+    """
+    if distribution == 'bootstrap':
+        historical_returns = np.asarray(historical_returns if historical_returns is not None else [], dtype=dtype)
+        historical_returns = historical_returns[np.isfinite(historical_returns)]
+        if historical_returns.size == 0:
+            raise ValueError("Bootstrapped simulation needs historical returns")
+
+    dtype = np.dtype(dtype)
+    # Budget covers the block itself plus same-sized temporaries (t draws, bootstrap indices)
+    block_days = max(1, min(n_days, int(memory_budget_mb * 1024 * 1024 / (2 * 8 * n_paths))))
+    band_days = np.unique(np.linspace(1, n_days, min(band_points, n_days)).round().astype(int))
+
+    streams = [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(MC_STREAMS)]
+    bounds = np.linspace(0, n_paths, len(streams) + 1).astype(int)
+    values = np.full(n_paths, float(initial_investment))
+    buffer = np.empty(n_paths * block_days, dtype=dtype)
+    band_rows = []
+
+    def advance(k, view):
+        rows = slice(bounds[k], bounds[k + 1])
+        _mc_fill_gross_returns(streams[k], view[rows], distribution, mean, std, df, historical_returns)
+        np.cumprod(view[rows], axis=1, out=view[rows])
+        view[rows] *= values[rows, None]
+
+    with ThreadPoolExecutor(max_workers=min(len(streams), os.cpu_count() or 1)) as pool:
+        for block_start in range(0, n_days, block_days):
+            block_len = min(block_days, n_days - block_start)
+            # Contiguous (paths x block_len) view so the generators can fill it in place
+            view = buffer[:n_paths * block_len].reshape(n_paths, block_len)
+            list(pool.map(lambda k: advance(k, view), range(len(streams))))
+
+            # Day d (1-based) is column d - block_start - 1 of this block
+            in_block = band_days[(band_days > block_start) & (band_days <= block_start + block_len)]
+            if in_block.size:
+                band_rows.append(np.percentile(view[:, in_block - block_start - 1], percentiles, axis=0).T)
+            values = view[:, -1].astype(np.float64)
+
+    bands = pd.DataFrame(
+        np.vstack(band_rows) if band_rows else np.empty((0, len(percentiles))),
+        index=pd.Index(band_days, name='Day'),
+        columns=[f"P{p}" for p in percentiles]
+    )
+    prob_loss = float(np.mean(values < initial_investment))
+    summary = {
+        'Mean Terminal Value': float(values.mean()),
+        'Median Terminal Value': float(np.median(values)),
+        'Probability of Loss': prob_loss * 100,
+        **{f"P{p} Terminal Value": float(v) for p, v in zip(percentiles, np.percentile(values, percentiles))}
+    }
+    return {'bands': bands, 'terminal': values, 'prob_loss': prob_loss, 'summary': summary}
+
+@instrumented('compute.monte_carlo')
+def monte_carlo_portfolios(n_paths, n_days, initial_investment, distribution='normal',
+                           historical_returns=None, **kwargs):
+    """Run monte_carlo_simulation for every strategy in BACKTEST_RETURN_PROFILES.
+
+    historical_returns maps strategy name to its daily return history and is
+    only needed for the bootstrap distribution.
+    """
+    seed = kwargs.pop('seed', None)
+    results = {}
+    for i, (portfolio_type, (mean, std)) in enumerate(BACKTEST_RETURN_PROFILES.items()):
+        history = (historical_returns or {}).get(portfolio_type)
+        results[portfolio_type] = monte_carlo_simulation(
+            mean, std, n_paths, n_days, initial_investment, distribution,
+            historical_returns=history, seed=None if seed is None else seed + i, **kwargs
+        )
+    return results
+
+@instrumented('fetch.strategy_history')
+def strategy_return_history(allocation, start_date, end_date, store=None):
+    """Daily returns of a fixed-weight allocation over real closes"""
+    prices = load_price_history(list(allocation), start_date, end_date, store)
+    returns = prices[list(allocation)].ffill().pct_change(fill_method=None).dropna()
+    weights = np.array(list(allocation.values()), dtype=float)
+    return returns.to_numpy() @ (weights / weights.sum())
+
+# Market overview views and the span each one is timed under
+MARKET_VIEWS = {
+    "🪙 CRYPTOCURRENCY PRICES": 'tab.prices',
+    "📈 MARKET TRENDS": 'tab.trends',
+    "🎯 PORTFOLIO ANALYSIS": 'tab.portfolio',
+    "🧮 BACKTEST CALCULATOR": 'tab.backtest'
+}
+
+# Data service client
+DATA_SERVICE_URL = os.environ.get('CRYPTOMATRIX_DATA_SERVICE', '')  # http://host:port or unix:///path.sock
+DATA_SERVICE_TIMEOUT = 30.0
+
+def frame_to_json(frame):
+    """DataFrame as a JSON-safe dict ('split' orient, ISO dates)"""
+    return json.loads(frame.to_json(orient='split', date_format='iso', double_precision=15, index=False))
+
+def frame_from_json(payload):
+    """Inverse of frame_to_json; Date columns come back as datetimes"""
+    frame = pd.DataFrame(payload['data'], columns=payload['columns'])
+    if 'Date' in frame:
+        frame['Date'] = pd.to_datetime(frame['Date']).dt.tz_localize(None)
+    return frame
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix domain socket"""
+
+    def __init__(self, socket_path, timeout=DATA_SERVICE_TIMEOUT):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+class DataServiceClient:
+    """JSON client for data_service.py over HTTP or a Unix socket"""
+
+    def __init__(self, url, timeout=DATA_SERVICE_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        self._target = urllib.parse.urlsplit(url)
+
+    def _connection(self):
+        if self._target.scheme == 'unix':
+            return _UnixHTTPConnection(self._target.path, self.timeout)
+        return http.client.HTTPConnection(self._target.hostname, self._target.port or 80, timeout=self.timeout)
+
+    @instrumented('service.request')
+    def request(self, method, path, payload=None):
+        count_metric('upstream_requests', source='data_service')
+        connection = self._connection()
+        try:
+            body = json.dumps(payload) if payload is not None else None
+            connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            data = json.loads(response.read() or b'null')
+        finally:
+            connection.close()
+        if response.status != 200:
+            raise RuntimeError(f"data service {method} {path}: {response.status} {data}")
+        return data
+
+    def health(self):
+        return self.request('GET', '/health')
+
+    def market(self, symbols=None):
+        query = '?' + urllib.parse.urlencode({'symbols': ','.join(symbols)}) if symbols else ''
+        return market_frame(frame_from_json(self.request('GET', '/market' + query)))
+
+    def risk_metrics(self, portfolio_type, allocation, window=RISK_WINDOW_DAYS):
+        return self.request('POST', '/risk', {
+            'portfolio_type': portfolio_type, 'allocation': allocation, 'window': window
+        })
+
+    def correlation(self):
+        frame = frame_from_json(self.request('GET', '/correlation')).astype(float)
+        return frame.set_axis(frame.columns, axis=0)
+
+    def frontier(self, assets, lower, upper, target_volatility, window=RISK_WINDOW_DAYS):
+        data = self.request('POST', '/frontier', {
+            'assets': list(assets), 'lower': lower, 'upper': upper,
+            'target_volatility': target_volatility, 'window': window
+        })
+        if data is None:
+            return None
+        return frame_from_json(data['frontier']), frame_from_json(data['portfolios']).set_index('Portfolio')
+
+    def backtest(self, portfolio_type, start_date, end_date, initial_investment,
+                 contribution_freq, contribution_amount, reinvest=True):
+        return frame_from_json(self.request('POST', '/backtest', {
+            'portfolio_type': portfolio_type,
+            'start_date': str(start_date),
+            'end_date': str(end_date),
+            'initial_investment': initial_investment,
+            'contribution_freq': contribution_freq,
+            'contribution_amount': contribution_amount,
+            'reinvest': reinvest
+        }))
+
+@st.cache_resource
+def get_data_service_client():
+    """Client for the configured data service, or None to compute in-process"""
+    return DataServiceClient(DATA_SERVICE_URL) if DATA_SERVICE_URL else None
+
+def service_or_local(service, remote, local):
+    """remote(service) when a data service is configured and answers, else local()"""
+    if service is not None:
+        try:
+            return remote(service)
+        except Exception as e:
+            print(f"Warning: data service request failed, computing locally: {e}")
+    return local()
+
+# Report export
+REPORT_FORMATS = {
+    # format: (file extension, MIME type)
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('zip', 'application/zip'),
+    'HTML': ('html', 'text/html'),
+    'PDF': ('pdf', 'application/pdf')
+}
+REPORT_CHUNK_ROWS = 5000   # rows serialised per write
+REPORT_WORKERS = 2         # exports running at once in this server process
+REPORT_DIR = os.path.join(tempfile.gettempdir(), 'cryptomatrix-reports')
+REPORT_TTL = 3600.0        # seconds a report file is kept on disk
+REPORT_CELL_WIDTH = 14     # characters per column in PDF tables
+PDF_PAGE_SIZE = (842, 595) # A4 landscape, in points
+PDF_MARGIN = 36
+PDF_FONT_SIZE = 7
+PARQUET_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+def report_cell(value):
+    """Display text for one report cell"""
+    if isinstance(value, (float, np.floating)):
+        return '—' if np.isnan(value) else f"{value:,.2f}"
+    if isinstance(value, pd.Timestamp):
+        return value.strftime('%Y-%m-%d %H:%M') if value.hour or value.minute else value.strftime('%Y-%m-%d')
+    return str(value)
+
+class CSVReportWriter:
+    """Sections one after another, each headed by a '# title' line"""
+
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+
+    def section(self, title, columns):
+        self.file.write(f"# {title}\n")
+        self._header = True
+
+    def rows(self, chunk):
+        chunk.to_csv(self.file, index=False, header=self._header)
+        self._header = False
+
+    def end_section(self):
+        self.file.write("\n")
+
+    def close(self):
+        self.file.close()
+
+class ParquetReportWriter:
+    """A zip with one Parquet file per section, one row group per chunk"""
+
+    def __init__(self, path):
+        self.archive = zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED)
+        self._writer = None
+
+    def section(self, title, columns):
+        self._name = re.sub(r'[^a-z0-9]+', '_', title.lower()).strip('_') + '.parquet'
+        self._path = f"{self.archive.filename}.{self._name}"
+
+    def rows(self, chunk):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(chunk, preserve_index=False,
+                                     schema=self._writer.schema if self._writer else None)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self._path, table.schema)
+        self._writer.write_table(table)
+
+    def end_section(self):
+        self._writer.close()
+        self._writer = None
+        self.archive.write(self._path, self._name)
+        os.remove(self._path)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            os.remove(self._path)
+        self.archive.close()
+
+class HTMLReportWriter:
+    """A standalone page with one table per section"""
+
+    def __init__(self, path):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.file.write(
+            '<!DOCTYPE html><html><head><meta charset="utf-8"><title>CryptoMatrix Report</title>'
+            '<style>body{font-family:monospace;background:#121212;color:#F5F5F5}h2{color:#00FF85}'
+            'table{border-collapse:collapse;margin-bottom:2rem}td,th{border:1px solid #444;padding:2px 8px;text-align:right}'
+            '</style></head><body>'
+            f'<h1>CryptoMatrix Report</h1><p>Generated {datetime.now():%Y-%m-%d %H:%M:%S}</p>'
+        )
+
+    def section(self, title, columns):
+        header = ''.join(f'<th>{html.escape(str(column))}</th>' for column in columns)
+        self.file.write(f'<h2>{html.escape(title)}</h2><table><thead><tr>{header}</tr></thead><tbody>')
+
+    def rows(self, chunk):
+        self.file.write(''.join(
+            '<tr>' + ''.join(f'<td>{html.escape(report_cell(value))}</td>' for value in row) + '</tr>'
+            for row in chunk.itertuples(index=False)
+        ))
+
+    def end_section(self):
+        self.file.write('</tbody></table>')
+
+    def close(self):
+        self.file.write('</body></html>')
+        self.file.close()
+
+class PDFReportWriter:
+    """Fixed-width text tables written page by page as a minimal PDF.
+
+    Uses the built-in Courier font, so no PDF library is needed. Each page
+    is written as soon as it fills up; only the object offsets are kept for
+    the cross-reference table written on close.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.file.write(b'%PDF-1.4\n')
+        self.offsets = {}
+        self.pages = []
+        self.lines = []
+        self._next_object = 4   # 1 catalog, 2 page tree, 3 font
+        self._object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        self._object(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>')
+        self.leading = PDF_FONT_SIZE + 2
+        self.lines_per_page = (PDF_PAGE_SIZE[1] - 2 * PDF_MARGIN) // self.leading
+        self.line_width = int((PDF_PAGE_SIZE[0] - 2 * PDF_MARGIN) / (PDF_FONT_SIZE * 0.6))
+        self.write_line('CryptoMatrix Report')
+        self.write_line(f'Generated {datetime.now():%Y-%m-%d %H:%M:%S}')
+
+    def _object(self, number, body):
+        self.offsets[number] = self.file.tell()
+        self.file.write(b'%d 0 obj\n' % number + body + b'\nendobj\n')
+
+    def _flush_page(self):
+        text = b''.join(
+            b'(' + line.encode('cp1252', errors='replace').replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b") '\n"
+            for line in self.lines
+        )
+        top = PDF_PAGE_SIZE[1] - PDF_MARGIN
+        stream = b'BT /F1 %d Tf %d TL %d %d Td\n' % (PDF_FONT_SIZE, self.leading, PDF_MARGIN, top) + text + b'ET'
+        content, page = self._next_object, self._next_object + 1
+        self._next_object += 2
+        self._object(content, b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        self._object(page, b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >> >> '
+                           b'/Contents %d 0 R >>' % (PDF_PAGE_SIZE[0], PDF_PAGE_SIZE[1], content))
+        self.pages.append(page)
+        self.lines = []
+
+    def write_line(self, line):
+        self.lines.append(line[:self.line_width])
+        if len(self.lines) >= self.lines_per_page:
+            self._flush_page()
+
+    def section(self, title, columns):
+        self.widths = [max(len(str(column)), REPORT_CELL_WIDTH) for column in columns]
+        self.write_line('')
+        self.write_line(title.upper())
+        self.write_line(' '.join(str(column).rjust(width) for column, width in zip(columns, self.widths)))
+        self.write_line('-' * min(sum(self.widths) + len(self.widths), self.line_width))
+
+    def rows(self, chunk):
+        for row in chunk.itertuples(index=False):
+            self.write_line(' '.join(report_cell(value)[:width].rjust(width) for value, width in zip(row, self.widths)))
+
+    def end_section(self):
+        pass
+
+    def close(self):
+        if self.lines or not self.pages:
+            self._flush_page()
+        kids = b' '.join(b'%d 0 R' % page for page in self.pages)
+        self._object(2, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self.pages)))
+        xref = self.file.tell()
+        size = max(self.offsets) + 1
+        self.file.write(b'xref\n0 %d\n0000000000 65535 f \n' % size)
+        self.file.write(b''.join(b'%010d 00000 n \n' % self.offsets[number] for number in range(1, size)))
+        self.file.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (size, xref))
+        self.file.close()
+
+REPORT_WRITERS = {
+    'CSV': CSVReportWriter,
+    'Parquet': ParquetReportWriter,
+    'HTML': HTMLReportWriter,
+    'PDF': PDFReportWriter
+}
+
+class ReportJob:
+    """One report export running on the report executor.
+
+    Sections are (title, frame or zero-argument callable) pairs; callables
+    run on the worker, so fetching market data or risk metrics never blocks
+    the script thread. Rows go to a file under REPORT_DIR REPORT_CHUNK_ROWS
+    at a time, so the export holds one serialised chunk in memory at once.
+    """
+
+    def __init__(self, sections, report_format, executor):
+        extension, self.mime = REPORT_FORMATS[report_format]
+        os.makedirs(REPORT_DIR, exist_ok=True)
+        prune_reports()
+        self.format = report_format
+        self.file_name = f"cryptomatrix-report-{datetime.now():%Y%m%d-%H%M%S}.{extension}"
+        self.path = os.path.join(REPORT_DIR, f"{uuid.uuid4().hex}.{extension}")
+        self.rows_done = 0
+        self.rows_total = 0
+        self.stage = 'Queued'
+        self.error = None
+        # _run waits for this so self.future exists before any work can fail
+        self._submitted = threading.Event()
+        self.future = executor.submit(self._run, sections)
+        self._submitted.set()
+
+    @property
+    def progress(self):
+        return self.rows_done / self.rows_total if self.rows_total else 0.0
+
+    @property
+    def done(self):
+        return self.future.done()
+
+    def _run(self, sections):
+        self._submitted.wait()
+        try:
+            self.stage = 'Collecting data'
+            frames = [(title, source() if callable(source) else source) for title, source in sections]
+            self.rows_total = max(sum(len(frame) for _, frame in frames), 1)
+            writer = REPORT_WRITERS[self.format](self.path)
+            try:
+                for title, frame in frames:
+                    self.stage = f'Writing {title}'
+                    writer.section(title, list(frame.columns))
+                    for start in range(0, max(len(frame), 1), REPORT_CHUNK_ROWS):
+                        chunk = frame.iloc[start:start + REPORT_CHUNK_ROWS]
+                        writer.rows(chunk)
+                        self.rows_done += len(chunk)
+                    writer.end_section()
+            finally:
+                writer.close()
+            self.stage = 'Done'
+        except Exception as e:
+            self.error = str(e)
+            self.stage = 'Failed'
+            self.discard()
+
+    def discard(self):
+        self.future.cancel()
+        with contextlib.suppress(OSError):
+            os.remove(self.path)
+
+def prune_reports(ttl=REPORT_TTL):
+    """Remove report files older than ttl seconds"""
+    cutoff = time.time() - ttl
+    with contextlib.suppress(OSError):
+        for entry in os.scandir(REPORT_DIR):
+            if entry.stat().st_mtime < cutoff:
+                with contextlib.suppress(OSError):
+                    os.remove(entry.path)
+
+@st.cache_resource
+def get_report_executor():
+    """Worker pool shared by every session's report exports"""
+    return ThreadPoolExecutor(max_workers=REPORT_WORKERS, thread_name_prefix='report')
+
+def report_sections(service, allocations, backtest=None, backtest_title='Backtest'):
+    """(title, source) pairs for a report; the market table and risk metrics are fetched on the worker"""
+    allocations = {portfolio_type: dict(allocation) for portfolio_type, allocation in allocations.items()}
+    cache, store = get_market_data_cache(), get_ohlcv_store()
+    registry, sources = get_symbol_registry(), get_source_manager()
+
+    def market():
+        return service_or_local(service, lambda client: client.market(),
+                                lambda: get_market_data(None, cache, store, registry, sources))
+
+    def risk():
+        rows = {}
+        for portfolio_type, allocation in allocations.items():
+            rows[portfolio_type] = service_or_local(
+                service, lambda client: client.risk_metrics(portfolio_type, allocation),
+                lambda: calculate_risk_metrics(portfolio_type, allocation, get_risk_model(cache, store))
+            )
+        return pd.DataFrame.from_dict(rows, orient='index').rename_axis('Strategy').reset_index()
+
+    weights = pd.DataFrame(
+        [(portfolio_type, symbol, weight * 100)
+         for portfolio_type, allocation in allocations.items() for symbol, weight in allocation.items()],
+        columns=['Strategy', 'Symbol', 'Weight %']
+    )
+    sections = [('Market', market), ('Allocations', weights), ('Risk Metrics', risk)]
+    if backtest is not None:
+        sections.append((backtest_title, backtest))
+    return sections
+
+def render_report_panel(service):
+    """Sidebar controls for starting a report export and collecting the file"""
+    formats = [name for name in REPORT_FORMATS if name != 'Parquet' or PARQUET_AVAILABLE]
+    report_format = st.selectbox("Report Format", formats, key='report_format')
+    job = st.session_state.report_job
+    if st.button("🧾 GENERATE REPORT", disabled=job is not None and not job.done):
+        if job is not None:
+            job.discard()
+        params = st.session_state.backtest_params
+        backtest_title = 'Backtest'
+        if params:
+            backtest_title = f"Backtest ({params['strategy']}, {params['start_date']} to {params['end_date']})"
+        job = st.session_state.report_job = ReportJob(
+            report_sections(service, st.session_state.portfolio_allocation,
+                            st.session_state.backtest_results, backtest_title),
+            report_format, get_report_executor()
+        )
+    if job is None:
+        return
+    if not job.done:
+        rows = f" · {job.rows_done:,} of {job.rows_total:,} rows" if job.rows_total else ''
+        st.progress(job.progress, text=f"{job.stage}{rows}")
+        st.button("🔄 REFRESH PROGRESS")
+    elif job.error:
+        st.warning(f"⚠️ Report export failed: {job.error}")
+    elif not os.path.exists(job.path):
+        st.caption("The last report has expired, generate it again")
+    else:
+        with open(job.path, 'rb') as report:
+            st.download_button(f"⬇️ SAVE {job.format} REPORT", report, file_name=job.file_name,
+                               mime=job.mime, use_container_width=True)
+
+# Main Dashboard
+def main():
+    st.set_page_config(**PAGE_CONFIG)
+    st.markdown(compiled_stylesheet(), unsafe_allow_html=True)
+    init_session_state()
+    service = get_data_service_client()
+
+    # Per-rerun timings; a profiler runs only for a requested capture
+    metrics = RerunMetrics()
+    bind_metrics(metrics)
+    profiler = start_profiler() if st.session_state.pop('profile_next_rerun', False) else None
+
+    # Enhanced Header with Matrix theme
+    st.markdown('<h1 class="main-header">🌐 CRYPTOMATRIX DASHBOARD</h1>', unsafe_allow_html=True)
+    st.markdown('<p class="subtitle">⚡ ADVANCED CRYPTO ANALYSIS & RISK MANAGEMENT SYSTEM ⚡</p>', unsafe_allow_html=True)
+
+    # Data source indicator
+    if STOOQ_AVAILABLE:
+        data_source = "🟢 Stooq + Yahoo Finance"
+    else:
+        data_source = "🟡 Yahoo Finance (Stooq not available)"
+    if service is not None:
+        data_source = f"🔌 Data service at {DATA_SERVICE_URL}"
+    
+    st.markdown(f'<div style="text-align: center; margin-bottom: 1rem;"><span style="color: var(--text-secondary); font-size: 0.9rem;">Data Source: {data_source}</span></div>', unsafe_allow_html=True)
+
+    # Market Overview views. st.tabs would run every tab body on each rerun,
+    # so a tab-style radio picks the one view whose data is fetched and computed
+    st.markdown('<div class="section-header">📊 MARKET OVERVIEW</div>', unsafe_allow_html=True)
+    market_view = st.radio("Market view", list(MARKET_VIEWS), horizontal=True, key='market_view',
+                           label_visibility='collapsed')
+    view_timer = contextlib.ExitStack()
+    view_timer.enter_context(metric_span(MARKET_VIEWS[market_view]))
+    market_streaming, page_symbols = False, []
+
+    if market_view == "🪙 CRYPTOCURRENCY PRICES":
+        st.markdown('<div class="dashboard-card"><h3 style="color: var(--accent-green); margin-bottom: 1rem;">🔥 TOP CRYPTOCURRENCIES</h3></div>', unsafe_allow_html=True)
+        
+        # Add refresh button
+        col1, col2 = st.columns([1, 4])
+        with col1:
+            if st.button("🔄 REFRESH DATA", type="primary"):
+                get_market_data_cache().invalidate()
+                st.rerun()
+        with col2:
+            st.markdown(f'<div style="margin-top: 0.5rem;"><span style="color: var(--text-secondary);">Real-time data from {data_source}</span></div>', unsafe_allow_html=True)
+        
+        # Streaming mode: one shared producer per feed pushes deltas, and this
+        # session patches its table with them after the rest of the page renders
+        col1, col2, col3 = st.columns([1, 1, 1])
+        with col1:
+            market_streaming = st.checkbox("📡 LIVE STREAM", key='market_streaming')
+        with col2:
+            stream_feed = st.selectbox("Feed", STREAM_FEEDS, key='market_stream_feed', disabled=not market_streaming)
+        with col3:
+            stream_cadence = st.selectbox("Update every (s)", STREAM_CADENCES, index=1, key='market_stream_cadence',
+                                          disabled=not market_streaming)
+
+        # Filter, sort and page over the registry; quotes are fetched only
+        # for the symbols on the visible page
+        registry = get_symbol_registry()
+        col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+        with col1:
+            market_search = st.text_input("Search", placeholder="Symbol or name", key='market_search')
+        with col2:
+            market_sort = st.selectbox("Sort by", REGISTRY_SORT_KEYS, key='market_sort')
+        with col3:
+            market_descending = st.checkbox("Descending", key='market_descending')
+        with col4:
+            page_size = st.selectbox("Rows", MARKET_PAGE_SIZES, key='market_page_size')
+
+        positions = registry.query(market_search, market_sort, ascending=not market_descending)
+        n_pages = max(1, -(-len(positions) // page_size))
+        page = min(int(st.number_input("Page", min_value=1, step=1, key='market_page')), n_pages)
+        page_symbols = registry.page(positions, page, page_size)
+
+        if page_symbols:
+            first = (page - 1) * page_size + 1
+            st.caption(f"Showing {first:,}–{first + len(page_symbols) - 1:,} of {len(positions):,} assets "
+                       f"({len(registry):,} in registry) · page {page} of {n_pages}")
+            page_df = service_or_local(service, lambda client: client.market(page_symbols),
+                                       lambda: get_market_data(page_symbols))
+            get_market_aggregate().update_frame(page_df)
+            page_ranks = pd.Index(registry.lookup(page_symbols, 'rank'), name='#').astype(int)
+            market_table_slot = st.empty()
+            market_stream_status = st.empty()
+            market_table_slot.dataframe(
+                style_market_table(page_df.set_index(page_ranks)),
+                use_container_width=True,
+                height=400
+            )
+        else:
+            st.info(f"No assets match '{market_search}'")
+
+        with st.expander("🩺 DATA SOURCE HEALTH"):
+            st.caption(f"A provider's breaker opens after {SOURCE_FAILURE_THRESHOLD} failed calls in a row "
+                       f"and sends one probe every {SOURCE_COOLDOWN}s until it recovers. "
+                       "Rows no provider could serve show sample quotes.")
+            st.dataframe(get_source_manager().health(), use_container_width=True)
+
+    if market_view == "📈 MARKET TRENDS":
+        # Built-in coins, shared across sessions
+        crypto_df = service_or_local(service, lambda client: client.market(), get_market_data)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown('<div class="portfolio-card"><h3 style="color: var(--accent-green); margin-bottom: 1rem;">💰 MARKET CAPITALIZATION</h3></div>', unsafe_allow_html=True)
+            st.bar_chart(
+                pd.DataFrame({
+                    'Cryptocurrency': crypto_df['Name'][:5],
+                    'Market Cap': crypto_df['Market Cap'][:5]
+                }).set_index('Cryptocurrency'),
+                use_container_width=True
+            )
+        
+        with col2:
+            st.markdown('<div class="portfolio-card"><h3 style="color: var(--accent-green); margin-bottom: 1rem;">📊 7-DAY PERFORMANCE</h3></div>', unsafe_allow_html=True)
+            st.bar_chart(
+                crypto_df.head(8).set_index('Symbol')['7d %'],
+                use_container_width=True
+            )
+
+    if market_view == "🎯 PORTFOLIO ANALYSIS":
+        st.markdown('<div class="section-header">🔍 PORTFOLIO RISK ANALYSIS</div>', unsafe_allow_html=True)
+        
+        # Metrics come from the data service when one is configured, else from
+        # one risk model per data refresh, shared by all three strategies
+        def strategy_risk(portfolio_type, allocation):
+            return service_or_local(
+                service, lambda client: client.risk_metrics(portfolio_type, allocation),
+                lambda: calculate_risk_metrics(portfolio_type, allocation, get_risk_model())
+            )
+        strategy_metrics = {}
+        
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.markdown('<div class="portfolio-card"><h3 style="color: var(--accent-green);">🛡️ CONSERVATIVE</h3></div>', unsafe_allow_html=True)
             conservative_allocation = st.session_state.portfolio_allocation['Conservative']
             st.bar_chart(
                 pd.DataFrame({
@@ -1033,8 +4374,8 @@ def main():
                 }).set_index('Asset'),
                 use_container_width=True
             )
-            st.markdown('<p style="color: var(--text-secondary); font-size: 0.9rem;">30% BTC | 40% ETH | 20% USDT | 10% ADA</p>', unsafe_allow_html=True)
-            risk_metrics = calculate_risk_metrics('Conservative', conservative_allocation)
+            st.markdown(f'<p style="color: var(--text-secondary); font-size: 0.9rem;">{format_allocation(conservative_allocation)}</p>', unsafe_allow_html=True)
+            risk_metrics = strategy_metrics['Conservative'] = strategy_risk('Conservative', conservative_allocation)
             for metric, value in risk_metrics.items():
                 st.metric(label=metric, value=f"{value:.1f}")
         
@@ -1048,8 +4389,8 @@ def main():
                 }).set_index('Asset'),
                 use_container_width=True
             )
-            st.markdown('<p style="color: var(--text-secondary); font-size: 0.9rem;">50% BTC | 30% ETH | 10% BNB | 10% XRP</p>', unsafe_allow_html=True)
-            risk_metrics = calculate_risk_metrics('Moderate', moderate_allocation)
+            st.markdown(f'<p style="color: var(--text-secondary); font-size: 0.9rem;">{format_allocation(moderate_allocation)}</p>', unsafe_allow_html=True)
+            risk_metrics = strategy_metrics['Moderate'] = strategy_risk('Moderate', moderate_allocation)
             for metric, value in risk_metrics.items():
                 st.metric(label=metric, value=f"{value:.1f}")
         
@@ -1063,28 +4404,104 @@ def main():
                 }).set_index('Asset'),
                 use_container_width=True
             )
-            st.markdown('<p style="color: var(--text-secondary); font-size: 0.9rem;">40% BTC | 25% ETH | 20% SOL | 15% DOT</p>', unsafe_allow_html=True)
-            risk_metrics = calculate_risk_metrics('Aggressive', aggressive_allocation)
+            st.markdown(f'<p style="color: var(--text-secondary); font-size: 0.9rem;">{format_allocation(aggressive_allocation)}</p>', unsafe_allow_html=True)
+            risk_metrics = strategy_metrics['Aggressive'] = strategy_risk('Aggressive', aggressive_allocation)
             for metric, value in risk_metrics.items():
                 st.metric(label=metric, value=f"{value:.1f}")
         
         st.markdown('<div class="section-header">📈 RISK-RETURN COMPARISON</div>', unsafe_allow_html=True)
-        comparison_data = pd.DataFrame({
-            'Portfolio': ['Conservative', 'Moderate', 'Aggressive'],
-            'Expected Return': [8.5, 12.8, 18.2],
-            'Volatility': [12.3, 18.5, 28.9],
-            'Sharpe Ratio': [0.69, 0.72, 0.68]
-        })
-        st.scatter_chart(
-            comparison_data,
-            x='Volatility',
-            y='Expected Return',
-            size='Sharpe Ratio',
-            color='Portfolio',
-            use_container_width=True
-        )
+        comparison_data = pd.DataFrame([
+            {
+                'Portfolio': name,
+                'Expected Return': metrics['Expected Return'],
+                'Volatility': metrics['Volatility'],
+                # Marker size must stay positive
+                'Sharpe Ratio': max(metrics['Sharpe Ratio'], 0.01)
+            }
+            for name, metrics in strategy_metrics.items()
+        ])
+
+        # The frontier is traced over the chosen assets from the same history as the strategy metrics
+        strategy_assets = list(dict.fromkeys(
+            asset for allocation in st.session_state.portfolio_allocation.values() for asset in allocation
+        ))
+        if 'frontier_assets' not in st.session_state:
+            st.session_state.frontier_assets = strategy_assets
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            frontier_assets = st.multiselect(
+                "Optimizer Assets", list(dict.fromkeys(list(STOOQ_SYMBOLS) + strategy_assets)), key='frontier_assets'
+            )
+        with col2:
+            weight_bounds = st.slider("Weight Bounds (%)", 0, 100, FRONTIER_WEIGHT_BOUNDS, 5, key='frontier_bounds')
+        with col3:
+            target_volatility = st.number_input("Target Volatility (%)", 1.0, 500.0, FRONTIER_TARGET_VOLATILITY, 5.0,
+                                                key='frontier_target')
+        lower, upper = weight_bounds[0] / 100, weight_bounds[1] / 100
+        try:
+            optimized = service_or_local(
+                service, lambda client: client.frontier(frontier_assets, lower, upper, target_volatility),
+                lambda: optimize_allocation(get_risk_model(), frontier_assets, lower, upper, target_volatility)
+            )
+        except ValueError as e:
+            st.warning(str(e))
+            optimized = None
+
+        if optimized is None:
+            st.scatter_chart(
+                comparison_data,
+                x='Volatility',
+                y='Expected Return',
+                size='Sharpe Ratio',
+                color='Portfolio',
+                use_container_width=True
+            )
+        else:
+            frontier, portfolios = optimized
+            points = pd.concat([
+                comparison_data.assign(**{
+                    'Kind': 'Strategy',
+                    'Sharpe Ratio': [metrics['Sharpe Ratio'] for metrics in strategy_metrics.values()]
+                }),
+                portfolios[['Volatility', 'Expected Return', 'Sharpe Ratio']].reset_index().assign(Kind='Optimized')
+            ], ignore_index=True)
+            st.altair_chart(frontier_chart(frontier, points), use_container_width=True)
+            st.caption(f"Efficient frontier of {len(frontier)} long-only portfolios with weights between "
+                       f"{weight_bounds[0]}% and {weight_bounds[1]}%, over the last {RISK_WINDOW_DAYS} days of history")
+
+            st.markdown('<div class="section-header">🧭 OPTIMIZED ALLOCATIONS</div>', unsafe_allow_html=True)
+            weights = portfolios.drop(columns=['Volatility', 'Expected Return', 'Sharpe Ratio'])
+            suggestions = portfolios[['Expected Return', 'Volatility', 'Sharpe Ratio']].round(2).join(
+                weights.map(lambda weight: f"{weight * 100:.1f}%" if weight >= OPTIMIZED_MIN_WEIGHT else '-')
+            )
+            st.dataframe(suggestions, use_container_width=True)
+            col1, col2, col3 = st.columns([1, 1, 1])
+            with col1:
+                suggestion = st.selectbox("Optimized Portfolio", OPTIMIZED_PORTFOLIOS, index=1, key='frontier_pick')
+            with col2:
+                apply_to = st.selectbox("Apply To Strategy", list(st.session_state.portfolio_allocation),
+                                        key='frontier_apply_to')
+            with col3:
+                st.button("✅ APPLY WEIGHTS", use_container_width=True, on_click=apply_optimized_weights,
+                          args=(apply_to, weights.loc[suggestion].to_dict()))
+
+        st.markdown('<div class="section-header">🔗 CORRELATION MATRIX</div>', unsafe_allow_html=True)
+        correlation = service_or_local(service, lambda client: client.correlation(),
+                                       lambda: get_risk_model().ewma.correlation())
+        correlation = correlation.dropna(how='all').dropna(axis=1, how='all')
+        if correlation.empty:
+            st.info("No price history available for correlations")
+        else:
+            # Strategy assets first, then the rest of the universe up to the heatmap limit
+            strategy_assets = [asset for allocation in st.session_state.portfolio_allocation.values() for asset in allocation]
+            shown = list(dict.fromkeys(
+                [asset for asset in strategy_assets if asset in correlation.index] + list(correlation.index)
+            ))[:CORRELATION_MAX_ASSETS]
+            st.altair_chart(correlation_heatmap(correlation.loc[shown, shown]), use_container_width=True)
+            st.caption(f"Exponentially weighted correlations of daily returns (half-life {EWMA_HALFLIFE_DAYS:.0f} days), "
+                       "moved tick by tick while the live feed streams")
 
-    with tab4:
+    if market_view == "🧮 BACKTEST CALCULATOR":
         st.markdown('<div class="section-header">🧮 PORTFOLIO BACKTEST CALCULATOR</div>', unsafe_allow_html=True)
         
         col1, col2 = st.columns(2)
@@ -1113,6 +4530,18 @@ def main():
                 value=10000.0,
                 step=1000.0
             )
+            backtest_mode = st.selectbox(
+                "Backtest Mode",
+                ["Simulated", "Historical"],
+                key="backtest_mode",
+                help="Historical replays real daily closes for the strategy's allocation"
+            )
+            rebalance = st.selectbox(
+                "Rebalancing",
+                REBALANCE_OPTIONS,
+                key="rebalance",
+                disabled=backtest_mode != "Historical"
+            )
         
         with col2:
             st.markdown('<div class="dashboard-card"><h3 style="color: var(--accent-green); margin-bottom: 1rem;">💳 CONTRIBUTION SETTINGS</h3></div>', unsafe_allow_html=True)
@@ -1135,23 +4564,54 @@ def main():
             reinvest = st.checkbox("🔄 Reinvest Returns", value=True)
         
         st.markdown('<br>', unsafe_allow_html=True)
+        backtest_params = {
+            'mode': backtest_mode, 'strategy': portfolio_type, 'start_date': start_date, 'end_date': end_date,
+            'initial_investment': initial_investment, 'contribution_freq': contribution_freq,
+            'contribution_amount': contribution_amount,
+            'rebalance': rebalance if backtest_mode == "Historical" else None
+        }
         
         if st.button("🚀 RUN BACKTEST", type="primary"):
             with st.spinner("🔄 Processing backtest analysis..."):
-                results = backtest_portfolio(
-                    portfolio_type, start_date, end_date, initial_investment,
-                    contribution_freq, contribution_amount, reinvest
-                )
-                st.session_state.backtest_results = results
+                if backtest_mode == "Historical":
+                    allocation = st.session_state.portfolio_allocation[portfolio_type]
+                    try:
+                        prices = load_price_history(list(allocation), start_date, end_date, get_ohlcv_store(),
+                                                    get_symbol_registry())
+                        results = backtest_allocation(
+                            allocation, prices, initial_investment,
+                            contribution_freq, contribution_amount, rebalance
+                        )
+                    except Exception as e:
+                        results = None
+                        st.warning(f"⚠️ Historical backtest unavailable: {e}")
+                else:
+                    backtest_args = (portfolio_type, start_date, end_date, initial_investment,
+                                     contribution_freq, contribution_amount, reinvest)
+                    results = service_or_local(service, lambda client: client.backtest(*backtest_args),
+                                               lambda: get_backtest_cache().run(*backtest_args))
+                if results is not None:
+                    st.session_state.backtest_results = results
+                    st.session_state.backtest_params = backtest_params
         
         if st.session_state.backtest_results is not None:
             st.markdown('<div class="section-header">📊 BACKTEST RESULTS</div>', unsafe_allow_html=True)
             results = st.session_state.backtest_results
+            # Returns are measured against the inputs that produced the results, not the current widgets
+            params = st.session_state.backtest_params or backtest_params
+            if params != backtest_params:
+                st.caption(
+                    f"Showing the last run: {params['strategy']} ({params['mode']}), "
+                    f"{params['start_date']} to {params['end_date']}, ${params['initial_investment']:,.0f} initial. "
+                    "Parameters have changed since; run the backtest again to update."
+                )
             
             final_value = results['Portfolio Value'].iloc[-1]
-            total_return = ((final_value - initial_investment) / initial_investment) * 100
-            annualized_return = (pow(final_value/initial_investment, 365/(end_date - start_date).days) - 1) * 100
+            total_return = ((final_value - params['initial_investment']) / params['initial_investment']) * 100
+            annualized_return = (pow(final_value/params['initial_investment'],
+                                     365/max((params['end_date'] - params['start_date']).days, 1)) - 1) * 100
             
+            performance, rolling_performance = performance_statistics(results)
             col1, col2, col3, col4 = st.columns(4)
             with col1:
                 st.metric("Final Value", f"${final_value:,.2f}")
@@ -1160,72 +4620,179 @@ def main():
             with col3:
                 st.metric("Annualized Return", f"{annualized_return:.2f}%")
             with col4:
-                max_drawdown = ((results['Portfolio Value'].cummax() - results['Portfolio Value']).max() / results['Portfolio Value'].cummax().max()) * 100
-                st.metric("Max Drawdown", f"{max_drawdown:.2f}%")
+                st.metric("Max Drawdown", f"{performance['Max Drawdown']:.2f}%")
             
             st.markdown('<div class="dashboard-card"><h3 style="color: var(--accent-green); margin-bottom: 1rem;">📈 PORTFOLIO VALUE OVER TIME</h3></div>', unsafe_allow_html=True)
-            st.line_chart(
-                results.set_index('Date')['Portfolio Value'],
-                use_container_width=True
-            )
+            value_series = results.set_index('Date')['Portfolio Value']
+            zoom = chart_zoom(value_series.index, 'backtest_zoom')
+            shown = downsampled_line_chart(value_series, zoom)
+            if shown > CHART_MAX_POINTS:
+                st.caption(f"{shown:,} points drawn as {CHART_MAX_POINTS:,}; narrow the zoom for full resolution")
             
             # Performance Metrics
             st.markdown('<div class="dashboard-card"><h3 style="color: var(--accent-green); margin-bottom: 1rem;">📋 PERFORMANCE METRICS</h3></div>', unsafe_allow_html=True)
             
-            col1, col2 = st.columns(2)
+            metric_cards = [
+                [
+                    ('Sharpe Ratio', f"{performance['Sharpe Ratio']:.2f}", 'Risk-adjusted return measure', 'var(--accent-green)'),
+                    ('Calmar Ratio', f"{performance['Calmar Ratio']:.2f}", 'Return vs max drawdown ratio', 'var(--accent-green)'),
+                    ('Best Day', f"{performance['Best Day']:+.1f}%", 'Highest single-day return', 'var(--accent-green)')
+                ],
+                [
+                    ('Sortino Ratio', f"{performance['Sortino Ratio']:.2f}", 'Downside risk-adjusted return', 'var(--accent-green)'),
+                    ('Win Rate', f"{performance['Win Rate']:.1f}%", 'Percentage of profitable days', 'var(--accent-green)'),
+                    ('Worst Day', f"{performance['Worst Day']:+.1f}%", 'Lowest single-day return', 'var(--alert-orange)')
+                ]
+            ]
             
-            with col1:
-                st.markdown("""
-                <div class="dashboard-card">
-                    <p style="color: var(--text-secondary); font-weight: bold; margin-bottom: 0.5rem;">Sharpe Ratio</p>
-                    <p style="color: var(--accent-green); font-size: 1.5rem; font-weight: bold;">1.24</p>
-                    <p style="color: var(--text-secondary); font-size: 0.75rem; margin-top: 0.5rem;">Risk-adjusted return measure</p>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                st.markdown("""
-                <div class="dashboard-card">
-                    <p style="color: var(--text-secondary); font-weight: bold; margin-bottom: 0.5rem;">Calmar Ratio</p>
-                    <p style="color: var(--accent-green); font-size: 1.5rem; font-weight: bold;">0.89</p>
-                    <p style="color: var(--text-secondary); font-size: 0.75rem; margin-top: 0.5rem;">Return vs max drawdown ratio</p>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                st.markdown("""
-                <div class="dashboard-card">
-                    <p style="color: var(--text-secondary); font-weight: bold; margin-bottom: 0.5rem;">Best Day</p>
-                    <p style="color: var(--accent-green); font-size: 1.5rem; font-weight: bold;">+8.2%</p>
-                    <p style="color: var(--text-secondary); font-size: 0.75rem; margin-top: 0.5rem;">Highest single-day return</p>
-                </div>
-                """, unsafe_allow_html=True)
+            for column, cards in zip(st.columns(2), metric_cards):
+                with column:
+                    for label, value, description, color in cards:
+                        st.markdown(f"""
+                        <div class="dashboard-card">
+                            <p style="color: var(--text-secondary); font-weight: bold; margin-bottom: 0.5rem;">{label}</p>
+                            <p style="color: {color}; font-size: 1.5rem; font-weight: bold;">{value}</p>
+                            <p style="color: var(--text-secondary); font-size: 0.75rem; margin-top: 0.5rem;">{description}</p>
+                        </div>
+                        """, unsafe_allow_html=True)
             
+            # Rolling risk profile
+            st.markdown('<div class="dashboard-card"><h3 style="color: var(--accent-green); margin-bottom: 1rem;">📉 ROLLING RISK</h3></div>', unsafe_allow_html=True)
+            rolling_window = st.selectbox(
+                "Rolling Window",
+                list(ROLLING_WINDOWS),
+                format_func=lambda days: f"{days} days",
+                key="rolling_window"
+            )
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                downsampled_line_chart(rolling_performance[f'Rolling Sharpe {rolling_window}d'], zoom, CHART_MAX_POINTS // 3)
             with col2:
-                st.markdown("""
-                <div class="dashboard-card">
-                    <p style="color: var(--text-secondary); font-weight: bold; margin-bottom: 0.5rem;">Sortino Ratio</p>
-                    <p style="color: var(--accent-green); font-size: 1.5rem; font-weight: bold;">1.85</p>
-                    <p style="color: var(--text-secondary); font-size: 0.75rem; margin-top: 0.5rem;">Downside risk-adjusted return</p>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                st.markdown("""
-                <div class="dashboard-card">
-                    <p style="color: var(--text-secondary); font-weight: bold; margin-bottom: 0.5rem;">Win Rate</p>
-                    <p style="color: var(--accent-green); font-size: 1.5rem; font-weight: bold;">58.3%</p>
-                    <p style="color: var(--text-secondary); font-size: 0.75rem; margin-top: 0.5rem;">Percentage of profitable days</p>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                st.markdown("""
-                <div class="dashboard-card">
-                    <p style="color: var(--text-secondary); font-weight: bold; margin-bottom: 0.5rem;">Worst Day</p>
-                    <p style="color: var(--alert-orange); font-size: 1.5rem; font-weight: bold;">-5.6%</p>
-                    <p style="color: var(--text-secondary); font-size: 0.75rem; margin-top: 0.5rem;">Lowest single-day return</p>
-                </div>
-                """, unsafe_allow_html=True)
+                downsampled_line_chart(rolling_performance[f'Rolling Volatility {rolling_window}d'], zoom, CHART_MAX_POINTS // 3)
+            with col3:
+                downsampled_line_chart(rolling_performance[f'Rolling Drawdown {rolling_window}d'], zoom, CHART_MAX_POINTS // 3)
+
+        # Batch parameter sweep across the strategy / start / contribution grid
+        st.markdown('<div class="section-header">🧪 PARAMETER SWEEP</div>', unsafe_allow_html=True)
+        with st.expander("Configure sweep grid", expanded=False):
+            sweep_strategies = st.multiselect(
+                "Strategies",
+                ["Conservative", "Moderate", "Aggressive"],
+                default=["Conservative", "Moderate", "Aggressive"],
+                key="sweep_strategies"
+            )
+            sweep_years = st.multiselect(
+                "Start Date (years before End Date)",
+                [1, 2, 3, 5, 7, 10],
+                default=[1, 3, 5],
+                key="sweep_years"
+            )
+            sweep_freqs = st.multiselect(
+                "Contribution Frequencies",
+                ["Daily", "Weekly", "Monthly", "Yearly", "None"],
+                default=["Weekly", "Monthly", "None"],
+                key="sweep_freqs"
+            )
+            sweep_amounts = st.text_input(
+                "Contribution Amounts ($, comma separated)",
+                value="50, 100, 500",
+                key="sweep_amounts"
+            )
+            if st.button("🧪 RUN SWEEP"):
+                try:
+                    amounts = [float(amount) for amount in sweep_amounts.split(',') if amount.strip()]
+                except ValueError:
+                    amounts = []
+                    st.warning("⚠️ Contribution amounts must be numbers separated by commas")
+                if amounts:
+                    with st.spinner("🔄 Sweeping backtest grid..."):
+                        st.session_state.sweep_results = sweep_backtests(
+                            sweep_strategies,
+                            [end_date - timedelta(days=365 * years) for years in sweep_years],
+                            sweep_freqs, amounts, end_date, initial_investment
+                        )
+
+        if st.session_state.get('sweep_results') is not None:
+            st.dataframe(
+                st.session_state.sweep_results.style.format({
+                    'Start Date': '{:%Y-%m-%d}',
+                    'Contribution Amount': '${:,.2f}',
+                    'Final Value': '${:,.2f}',
+                    'Annualized Return': '{:.2f}%',
+                    'Max Drawdown': '{:.2f}%'
+                }),
+                use_container_width=True,
+                height=400
+            )
+
+        # Monte Carlo projections for all three strategies
+        st.markdown('<div class="section-header">🎲 MONTE CARLO PROJECTION</div>', unsafe_allow_html=True)
+        with st.expander("Configure simulation", expanded=False):
+            mc_col1, mc_col2, mc_col3, mc_col4 = st.columns(4)
+            with mc_col1:
+                mc_paths = st.select_slider(
+                    "Paths", [1000, 5000, 10000, 50000, 100000], value=10000, key="mc_paths"
+                )
+            with mc_col2:
+                mc_years = st.slider("Horizon (years)", 1, 30, 10, key="mc_years")
+            with mc_col3:
+                mc_distribution = st.selectbox(
+                    "Return Distribution", ["Normal", "Student-t", "Bootstrap"], key="mc_distribution"
+                )
+            with mc_col4:
+                mc_budget = st.number_input(
+                    "Memory Budget (MB)", min_value=16, max_value=4096,
+                    value=MC_MEMORY_BUDGET_MB, step=16, key="mc_budget"
+                )
+            if st.button("🎲 RUN MONTE CARLO"):
+                distribution = {'Normal': 'normal', 'Student-t': 'student_t', 'Bootstrap': 'bootstrap'}[mc_distribution]
+                try:
+                    with st.spinner("🔄 Simulating return paths..."):
+                        history = None
+                        if distribution == 'bootstrap':
+                            history = {
+                                name: strategy_return_history(
+                                    allocation, end_date - timedelta(days=3 * 365), end_date, get_ohlcv_store()
+                                )
+                                for name, allocation in st.session_state.portfolio_allocation.items()
+                            }
+                        st.session_state.monte_carlo_results = monte_carlo_portfolios(
+                            mc_paths, mc_years * 365, initial_investment, distribution,
+                            historical_returns=history, memory_budget_mb=mc_budget
+                        )
+                except Exception as e:
+                    st.warning(f"⚠️ Monte Carlo simulation unavailable: {e}")
+
+        mc_results = st.session_state.get('monte_carlo_results')
+        if mc_results:
+            mc_columns = st.columns(len(mc_results))
+            for column, (name, result) in zip(mc_columns, mc_results.items()):
+                with column:
+                    st.markdown(f'<div class="portfolio-card"><h3 style="color: var(--accent-green);">{name.upper()}</h3></div>', unsafe_allow_html=True)
+                    st.metric("Median Terminal Value", f"${result['summary']['Median Terminal Value']:,.0f}")
+                    st.metric("Probability of Loss", f"{result['summary']['Probability of Loss']:.1f}%")
+                    st.metric("5th Percentile", f"${result['summary']['P5 Terminal Value']:,.0f}")
+                    st.line_chart(result['bands'], use_container_width=True)
+
+            # Terminal value distributions on shared log-spaced bins
+            terminals = {name: result['terminal'] for name, result in mc_results.items()}
+            low = max(min(values.min() for values in terminals.values()), 1.0)
+            high = max(values.max() for values in terminals.values())
+            edges = np.geomspace(low, max(high, low * 1.01), 41)
+            centers = np.sqrt(edges[:-1] * edges[1:]).round(0)
+            st.markdown('<div class="dashboard-card"><h3 style="color: var(--accent-green); margin-bottom: 1rem;">📊 TERMINAL VALUE DISTRIBUTION</h3></div>', unsafe_allow_html=True)
+            st.line_chart(
+                pd.DataFrame(
+                    {name: np.histogram(values, bins=edges)[0] for name, values in terminals.items()},
+                    index=pd.Index(centers, name='Terminal Value ($)')
+                ),
+                use_container_width=True
+            )
+
+    view_timer.close()
 
     # Enhanced Sidebar with improved styling
-    with st.sidebar:
+    with st.sidebar, metric_span('sidebar'):
         st.markdown('<h2 style="color: var(--accent-green);">⚙️ SYSTEM CONFIGURATION</h2>', unsafe_allow_html=True)
         
         # Enhanced Portfolio Allocation Section
@@ -1261,42 +4828,30 @@ def main():
         st.markdown('<h3 style="color: var(--text-primary);">📊 MARKET STATISTICS</h3>', unsafe_allow_html=True)
         st.markdown('<div class="description-text">Real-time market metrics and sentiment indicators to help you make informed trading decisions.</div>', unsafe_allow_html=True)
         
-        # Enhanced Stats Cards
-        st.markdown("""
-        <div class="stats-card">
-            <div class="stats-label">💰 Total Market Cap</div>
-            <div class="stats-value">$2.5T</div>
-            <div class="stats-change positive">+2.3%</div>
-            <div class="stats-description">Combined value of all cryptocurrencies in the market</div>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("""
-        <div class="stats-card">
-            <div class="stats-label">📈 24h Volume</div>
-            <div class="stats-value">$98.7B</div>
-            <div class="stats-change positive">+15.2%</div>
-            <div class="stats-description">Total trading volume in the last 24 hours</div>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("""
-        <div class="stats-card">
-            <div class="stats-label">👑 BTC Dominance</div>
-            <div class="stats-value">53.2%</div>
-            <div class="stats-change negative">-0.8%</div>
-            <div class="stats-description">Bitcoin's share of total crypto market cap</div>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("""
-        <div class="stats-card">
-            <div class="stats-label">😰 Fear & Greed Index</div>
-            <div class="stats-value">76</div>
-            <div class="stats-change negative">-2</div>
-            <div class="stats-description">Market sentiment: Extreme Greed (0-100 scale)</div>
-        </div>
-        """, unsafe_allow_html=True)
+        # Stats cards from the process-wide aggregate of every quote seen so far
+        market_aggregate = get_market_aggregate()
+        market_aggregate.update_frame(service_or_local(service, lambda client: client.market(), get_market_data))
+        market_stats = market_aggregate.stats()
+        if market_stats is None:
+            st.caption("Market statistics appear once quotes have loaded")
+        else:
+            since = f"; change since {market_stats['Since']:%H:%M}" if market_stats['Since'] else ''
+            sentiment = market_stats['Sentiment']
+            st.markdown(
+                stats_card("💰 Total Market Cap", format_compact_usd(market_stats['Market Cap']),
+                           market_stats['Market Cap Change'],
+                           f"Combined value of the {market_stats['Assets']:,} tracked assets; change over 24h") +
+                stats_card("📈 24h Volume", format_compact_usd(market_stats['Volume']), market_stats['Volume Change'],
+                           f"Total trading volume in the last 24 hours{since}") +
+                stats_card("👑 BTC Dominance", f"{market_stats['BTC Dominance']:.1f}%",
+                           market_stats['BTC Dominance Change'],
+                           "Bitcoin's share of tracked market cap; change over 24h in points", unit='') +
+                stats_card("😰 Fear & Greed Index", '—' if sentiment is None else f"{sentiment:.0f}",
+                           market_stats['Sentiment Change'],
+                           ("Market sentiment: " + (sentiment_label(sentiment) if sentiment is not None else 'n/a') +
+                            f" (0-100 scale, from cap-weighted 24h momentum and breadth){since}"), unit=''),
+                unsafe_allow_html=True
+            )
         
         st.markdown('</div>', unsafe_allow_html=True)
         
@@ -1311,12 +4866,51 @@ def main():
         # Buttons
         st.markdown('<div style="margin: 0; padding: 0;">', unsafe_allow_html=True)
         if st.button("📩 SET PRICE ALERTS"):
-            st.markdown('<p class="success-message">✓ Price alerts configured successfully!</p>', unsafe_allow_html=True)
+            st.session_state.alert_form_open = not st.session_state.alert_form_open
         if st.button("📥 DOWNLOAD REPORT"):
-            st.markdown('<p class="success-message">✓ Report generation initiated. Check downloads folder.</p>', unsafe_allow_html=True)
+            st.session_state.report_form_open = not st.session_state.report_form_open
         st.markdown('</div>', unsafe_allow_html=True)
+
+        # Price alerts run in a process-wide worker; this session only adds, lists and is notified
+        alert_engine = get_alert_engine()
+        fired_alerts = notify_triggered_alerts(alert_engine, st.session_state.alert_owner)
+        if st.session_state.alert_form_open:
+            render_price_alerts(alert_engine, st.session_state.alert_owner,
+                                get_symbol_registry().table['symbol'].tolist())
+            if fired_alerts:
+                st.caption("Triggered")
+                st.dataframe(
+                    pd.DataFrame({
+                        'Symbol': [alert['symbol'] for alert in fired_alerts],
+                        'Condition': [describe_alert(alert) for alert in fired_alerts],
+                        'Value': [format_alert_value(alert['value']) for alert in fired_alerts],
+                        'At': [f"{alert['triggered']:%H:%M:%S}" for alert in fired_alerts]
+                    }).iloc[::-1],
+                    use_container_width=True, hide_index=True
+                )
+
+        # Reports are written by a background worker; reruns only show progress
+        if st.session_state.report_form_open:
+            render_report_panel(service)
         
         st.markdown('</div>', unsafe_allow_html=True)
 
+        # Diagnostics: rerun timings and a one-off profile capture
+        st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
+        st.checkbox("🛠️ DEBUG PANEL", key='debug_panel')
+        st.button("🔬 PROFILE NEXT RERUN", on_click=request_profile,
+                  help="Profiles the rerun this click triggers; the report appears in the debug panel")
+
+    finish_rerun(metrics, profiler)
+    if st.session_state.get('debug_panel') or profiler is not None:
+        render_debug_panel(metrics)
+
+    # Streaming runs last so every other element is already on the page
+    if market_streaming and page_symbols:
+        # Simulated ticks are not real quotes, so only the live feed updates the market statistics
+        stream_market_table(market_table_slot, market_stream_status, page_df, page_ranks,
+                            get_price_streamer(stream_feed), stream_cadence,
+                            aggregate=get_market_aggregate() if stream_feed == 'Live' else None)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
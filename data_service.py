@@ -0,0 +1,220 @@
+"""Headless CryptoMatrix data service.
+
+Runs the market data fetchers, the risk model and the simulated backtest
+in one process with its own worker pool and caches, behind a small JSON
+API, so any number of dashboards and scripts share the same numbers:
+
+    python data_service.py --port 8765
+    python data_service.py --socket /tmp/cryptomatrix.sock
+
+Point the dashboard at it with CRYPTOMATRIX_DATA_SERVICE=http://127.0.0.1:8765
+(or unix:///tmp/cryptomatrix.sock).
+
+Endpoints:
+    GET  /health                  cache and data source status
+    GET  /market?symbols=BTC,ETH  market table (default: the built-in coins)
+    GET  /correlation             EWMA correlation matrix of the risk model's assets
+    POST /risk                    {portfolio_type, allocation, window}
+    POST /frontier                {assets, lower, upper, target_volatility, window}
+    POST /backtest                backtest_portfolio() arguments
+"""
+import argparse
+import json
+import os
+import socketserver
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+import dashboard
+
+SERVICE_HOST = '127.0.0.1'
+SERVICE_PORT = 8765
+SERVICE_WORKERS = 8
+
+class DataService:
+    """The dashboard's data layer with process-owned caches"""
+
+    def __init__(self):
+        self.cache = dashboard.MarketDataCache()
+        self.store = dashboard.OHLCVStore()
+        self.registry = dashboard.load_symbol_registry()
+        self.sources = dashboard.SourceManager(
+            [name for name, _ in dashboard.MARKET_PROVIDERS if name != 'Stooq' or dashboard.STOOQ_AVAILABLE]
+        )
+        self.backtests = dashboard.BacktestCache()
+        self.started = time.monotonic()
+
+    def market(self, symbols=None):
+        return dashboard.get_market_data(symbols, self.cache, self.store, self.registry, self.sources)
+
+    def risk_metrics(self, portfolio_type, allocation, window=dashboard.RISK_WINDOW_DAYS):
+        risk_model = dashboard.get_risk_model(self.cache, self.store)
+        return dashboard.calculate_risk_metrics(portfolio_type, allocation, risk_model, window)
+
+    def correlation(self):
+        return dashboard.get_risk_model(self.cache, self.store).ewma.correlation()
+
+    def frontier(self, assets, lower, upper, target_volatility, window=dashboard.RISK_WINDOW_DAYS):
+        risk_model = dashboard.get_risk_model(self.cache, self.store)
+        optimized = dashboard.optimize_allocation(risk_model, assets, lower, upper, target_volatility, window)
+        if optimized is None:
+            return None
+        frontier, portfolios = optimized
+        return {
+            'frontier': dashboard.frame_to_json(frontier),
+            'portfolios': dashboard.frame_to_json(portfolios.reset_index())
+        }
+
+    def backtest(self, portfolio_type, start_date, end_date, initial_investment,
+                 contribution_freq, contribution_amount, reinvest=True):
+        return self.backtests.run(
+            portfolio_type, pd.Timestamp(start_date).date(), pd.Timestamp(end_date).date(),
+            float(initial_investment), contribution_freq, float(contribution_amount), reinvest
+        )
+
+    def health(self):
+        return {
+            'status': 'ok',
+            'uptime': time.monotonic() - self.started,
+            'symbols': len(self.registry),
+            'cache': dict(self.cache.stats),
+            'backtests': dict(self.backtests.stats),
+            'sources': self.sources.health().reset_index().to_dict('records')
+        }
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+class DataServiceHandler(BaseHTTPRequestHandler):
+    """Routes GET/POST requests to the server's DataService"""
+
+    def do_GET(self):
+        self._dispatch(self._get)
+
+    def do_POST(self):
+        self._dispatch(self._post)
+
+    def _dispatch(self, route):
+        """Run route(), answering bad arguments with 400 and any other error with 500"""
+        try:
+            route()
+        except (TypeError, ValueError) as e:
+            self._reply({'error': str(e)}, 400)
+        except Exception as e:
+            self.log_error("%s %s failed: %r", self.command, self.path, e)
+            self._reply({'error': f"{type(e).__name__}: {e}"}, 500)
+
+    def _get(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        service = self.server.service
+        if url.path == '/health':
+            self._reply(service.health())
+        elif url.path == '/market':
+            symbols = [s for s in query.get('symbols', [''])[0].upper().split(',') if s] or None
+            self._reply(dashboard.frame_to_json(service.market(symbols)))
+        elif url.path == '/correlation':
+            self._reply(dashboard.frame_to_json(service.correlation()))
+        else:
+            self._reply({'error': f"unknown path {url.path}"}, 404)
+
+    def _post(self):
+        url = urlsplit(self.path)
+        service = self.server.service
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError as e:
+            self._reply({'error': f"invalid JSON body: {e}"}, 400)
+            return
+        if url.path == '/risk':
+            self._reply(service.risk_metrics(**payload))
+        elif url.path == '/frontier':
+            self._reply(service.frontier(**payload))
+        elif url.path == '/backtest':
+            self._reply(dashboard.frame_to_json(service.backtest(**payload)))
+        else:
+            self._reply({'error': f"unknown path {url.path}"}, 404)
+
+    def _reply(self, payload, status=200):
+        body = json.dumps(payload, default=_json_default).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix socket peers have no host address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        print(f"[data_service] {self.address_string()} {format % args}")
+
+class PooledServerMixin:
+    """Handle each connection on a bounded thread pool instead of a thread per request"""
+
+    def __init__(self, address, handler, service, workers=SERVICE_WORKERS):
+        self.service = service
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        super().__init__(address, handler)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+
+class PooledHTTPServer(PooledServerMixin, HTTPServer):
+    pass
+
+class PooledUnixHTTPServer(PooledServerMixin, socketserver.UnixStreamServer):
+    pass
+
+def make_server(service=None, host=SERVICE_HOST, port=SERVICE_PORT, socket_path=None, workers=SERVICE_WORKERS):
+    """HTTP server for service on host:port, or on a Unix socket when socket_path is given"""
+    service = service or DataService()
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        return PooledUnixHTTPServer(socket_path, DataServiceHandler, service, workers)
+    return PooledHTTPServer((host, port), DataServiceHandler, service, workers)
+
+def main():
+    parser = argparse.ArgumentParser(description="CryptoMatrix headless data service")
+    parser.add_argument('--host', default=SERVICE_HOST)
+    parser.add_argument('--port', type=int, default=SERVICE_PORT)
+    parser.add_argument('--socket', help="serve on this Unix socket instead of TCP")
+    parser.add_argument('--workers', type=int, default=SERVICE_WORKERS)
+    args = parser.parse_args()
+
+    server = make_server(host=args.host, port=args.port, socket_path=args.socket, workers=args.workers)
+    where = args.socket or f"http://{args.host}:{args.port}"
+    print(f"CryptoMatrix data service listening on {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""ThresholdBook checked against a plain list of thresholds, and the engine's book upkeep"""
+import numpy as np
+import pytest
+
+import dashboard
+
+@pytest.mark.parametrize('direction', ['above', 'below'])
+def test_threshold_book_matches_linear_scan(direction):
+    rng = np.random.default_rng(11)
+    book = dashboard.ThresholdBook(direction)
+    pending = {}
+    next_key = 0
+    for _ in range(300):
+        for threshold in rng.normal(100, 10, rng.integers(0, 5)).round(1):
+            book.add(threshold, next_key)
+            pending[next_key] = threshold
+            next_key += 1
+        for key in [key for key in pending if rng.random() < 0.05]:
+            book.discard(key)
+            del pending[key]
+        value = round(rng.normal(100, 10), 1)
+        if direction == 'above':
+            expected = {key for key, threshold in pending.items() if value >= threshold}
+        else:
+            expected = {key for key, threshold in pending.items() if value <= threshold}
+        fired = book.pop_triggered(value)
+        assert set(fired.tolist()) == expected
+        assert len(fired) == len(expected)
+        for key in expected:
+            del pending[key]
+        assert len(book) == len(pending)
+
+def test_threshold_book_ignores_missing_values():
+    book = dashboard.ThresholdBook('above')
+    book.add(1.0, 7)
+    assert len(book.pop_triggered(None)) == 0
+    assert len(book.pop_triggered(float('nan'))) == 0
+    assert book.pop_triggered(1.0).tolist() == [7]
+
+def test_discarded_entries_are_compacted():
+    book = dashboard.ThresholdBook('above')
+    for key in range(1000):
+        book.add(float(key), key)
+    for key in range(0, 1000, 2):
+        book.discard(key)
+    assert len(book) == 500
+    assert len(book.thresholds) + len(book._pending) <= 500 * (1 + dashboard.ALERT_BOOK_COMPACT) + 1
+    assert book.pop_triggered(10.0).tolist() == [1, 3, 5, 7, 9]
+
+class StubStreamer:
+    def snapshot(self, symbols):
+        return 0, {symbol: {'Price': 100.0} for symbol in symbols}
+
+def book_entries(engine):
+    """Entries held in the engine's books, dead or alive"""
+    return sum(len(book.thresholds) + len(book._pending) for book in engine._books.values())
+
+def test_cancel_removes_book_entries():
+    engine = dashboard.AlertEngine(StubStreamer(), autostart=False)
+    ids = [engine.add('alice', 'BTC', 'Price above', threshold=100.0 + i) for i in range(1000)]
+    keep = engine.add('bob', 'BTC', 'Price below', threshold=50.0)
+    for alert_id in ids:
+        assert engine.cancel('alice', alert_id)
+    assert sum(len(book) for book in engine._books.values()) == 1
+    assert book_entries(engine) <= 1 + dashboard.ALERT_BOOK_COMPACT
+    assert [alert['id'] for alert in engine.check({'BTC': {'Price': 40.0}})] == [keep]
+    assert book_entries(engine) == 0
+
+def test_moving_average_refresh_replaces_the_book_entry(monkeypatch):
+    engine = dashboard.AlertEngine(StubStreamer(), autostart=False)
+    levels = iter(np.linspace(110, 120, 101))
+    monkeypatch.setattr(engine, 'moving_average', lambda symbol, window: float(next(levels)))
+    engine.add('alice', 'ETH', 'Crosses MA', window=20)
+    for _ in range(100):
+        engine.refresh_moving_averages()
+    assert sum(len(book) for book in engine._books.values()) == 1
+    assert book_entries(engine) <= 1 + dashboard.ALERT_BOOK_COMPACT
+    assert engine.alerts('alice')[0]['threshold'] == 120.0
+    assert len(engine.check({'ETH': {'Price': 119.0}})) == 0
+    assert len(engine.check({'ETH': {'Price': 120.0}})) == 1
@@ -0,0 +1,127 @@
+"""Backtests checked against straightforward per-bar reference loops"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import dashboard
+
+FREQUENCIES = ['Daily', 'Weekly', 'Monthly', 'Yearly', 'None']
+
+def reference_backtest(portfolio_type, start_date, end_date, initial_investment, contribution_freq,
+                       contribution_amount):
+    """The original loop implementation of backtest_portfolio"""
+    dates = pd.date_range(start=start_date, end=end_date, freq='D')
+    daily_return_mean, daily_return_std = dashboard.BACKTEST_RETURN_PROFILES[portfolio_type]
+    np.random.seed(42)
+    returns = np.random.normal(daily_return_mean, daily_return_std, len(dates))
+    portfolio_value = [initial_investment]
+    for i in range(1, len(dates)):
+        add_contribution = (
+            contribution_freq == 'Daily'
+            or (contribution_freq == 'Weekly' and dates[i].dayofweek == 0)
+            or (contribution_freq == 'Monthly' and dates[i].day == 1)
+            or (contribution_freq == 'Yearly' and dates[i].month == 1 and dates[i].day == 1)
+        )
+        if add_contribution:
+            portfolio_value[i - 1] += contribution_amount
+        portfolio_value.append(portfolio_value[i - 1] * (1 + returns[i]))
+    return pd.DataFrame({
+        'Date': dates,
+        'Portfolio Value': portfolio_value,
+        'Daily Return': np.insert(returns[1:], 0, 0)
+    })
+
+@pytest.mark.parametrize('portfolio_type', list(dashboard.BACKTEST_RETURN_PROFILES))
+@pytest.mark.parametrize('contribution_freq', FREQUENCIES)
+def test_backtest_portfolio_matches_loop(portfolio_type, contribution_freq):
+    args = (portfolio_type, '2021-11-15', '2024-03-02', 10000.0, contribution_freq, 250.0)
+    pd.testing.assert_frame_equal(dashboard.backtest_portfolio(*args), reference_backtest(*args),
+                                  check_exact=False, rtol=1e-10)
+
+def test_backtest_cache_matches_fresh_runs():
+    cache = dashboard.BacktestCache()
+    start = '2022-01-01'
+    # Miss, then a shorter slice, then two extensions and new amounts on the same entry
+    for end, investment, amount in [('2023-01-01', 10000.0, 100.0), ('2022-06-30', 10000.0, 100.0),
+                                    ('2023-08-15', 5000.0, 40.0), ('2024-12-31', 20000.0, 0.0)]:
+        expected = dashboard.backtest_portfolio('Moderate', start, end, investment, 'Weekly', amount)
+        pd.testing.assert_frame_equal(cache.run('Moderate', start, end, investment, 'Weekly', amount),
+                                      expected, check_exact=False, rtol=1e-10)
+    assert cache.stats == {'hits': 1, 'extensions': 2, 'misses': 1}
+
+def test_backtest_cache_extends_intraday_bars():
+    cache = dashboard.BacktestCache()
+    cache.run('Aggressive', '2024-01-01', '2024-01-20', 1000.0, 'Daily', 10.0, freq='6h')
+    extended = cache.run('Aggressive', '2024-01-01', '2024-03-01', 1000.0, 'Daily', 10.0, freq='6h')
+    expected = dashboard.backtest_portfolio('Aggressive', '2024-01-01', '2024-03-01', 1000.0, 'Daily', 10.0, freq='6h')
+    pd.testing.assert_frame_equal(extended, expected, check_exact=False, rtol=1e-10)
+
+def test_sweep_group_matches_single_runs():
+    freqs, amounts = ['Daily', 'Weekly', 'Monthly', 'None'], [0.0, 100.0, 500.0]
+    sweep = dashboard._sweep_group('Aggressive', '2020-01-01', '2024-12-31', 10000.0, freqs, amounts)
+    for row in sweep.to_dict('records'):
+        args = ('Aggressive', '2020-01-01', '2024-12-31', 10000.0, row['Contribution Frequency'],
+                row['Contribution Amount'])
+        values = reference_backtest(*args)['Portfolio Value'].to_numpy()
+        stats, _ = dashboard.performance_statistics(dashboard.backtest_portfolio(*args))
+        assert row['Final Value'] == pytest.approx(values[-1], rel=1e-10)
+        # Deposits must not hide the drawdown or count as return
+        assert row['Max Drawdown'] == pytest.approx(stats['Max Drawdown'], rel=1e-10)
+        assert row['Annualized Return'] == pytest.approx(stats['Annualized Return'], rel=1e-10)
+
+def test_sweep_backtests_covers_the_grid():
+    sweep = dashboard.sweep_backtests(['Conservative', 'Moderate'], ['2023-01-01', '2023-06-01'],
+                                      ['Weekly', 'Monthly'], [0.0, 50.0], '2024-01-01')
+    assert len(sweep) == 16
+    assert sweep.groupby(['Strategy', 'Start Date']).size().eq(4).all()
+
+def reference_allocation(allocation, prices, initial_investment, contribution_freq, contribution_amount,
+                         rebalance, threshold=dashboard.REBALANCE_THRESHOLD):
+    """Bar-by-bar holdings: rebalance, then buy the next bar's contribution at this close"""
+    assets = list(allocation)
+    closes = prices[assets].ffill().dropna()
+    weights = np.array([allocation[asset] for asset in assets], dtype=float)
+    weights /= weights.sum()
+    dates, price_matrix = closes.index, closes.to_numpy(dtype=float)
+    contributions = dashboard.contribution_mask(dates, contribution_freq) * contribution_amount
+    periods = {'Monthly': dates.to_period('M'), 'Quarterly': dates.to_period('Q')}.get(rebalance)
+
+    units = np.zeros(len(assets))
+    values, daily_returns = [], []
+    for i, price in enumerate(price_matrix):
+        before = initial_investment if i == 0 else units @ price
+        bought = weights * (contributions[i + 1] if i + 1 < len(dates) else 0.0) / price
+        if i == 0 or (periods is not None and periods[i] != periods[i - 1]):
+            rebalance_now = True
+        elif rebalance == 'Threshold':
+            held = (units + bought) * price
+            rebalance_now = np.abs(held / held.sum() - weights).max() > threshold
+        else:
+            rebalance_now = False
+        if rebalance_now:
+            units = before * weights / price
+        units = units + bought
+        daily_returns.append(before / values[-1] - 1 if values else 0.0)
+        values.append(units @ price)
+    return pd.DataFrame({'Date': dates, 'Portfolio Value': values, 'Daily Return': daily_returns})
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(7)
+    dates = pd.date_range('2021-01-01', periods=700, freq='D')
+    returns = rng.normal([0.001, 0.0, 0.002, -0.0005], [0.03, 0.01, 0.05, 0.02], (len(dates), 4))
+    frame = pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), index=dates, columns=['BTC', 'ETH', 'SOL', 'ADA'])
+    frame.iloc[40:45, 1] = np.nan  # gaps are carried forward
+    return frame
+
+@pytest.mark.parametrize('rebalance', dashboard.REBALANCE_OPTIONS)
+@pytest.mark.parametrize('contribution_freq', ['Weekly', 'None'])
+def test_backtest_allocation_matches_reference(prices, rebalance, contribution_freq):
+    allocation = {'BTC': 40, 'ETH': 30, 'SOL': 20, 'ADA': 10}
+    args = (allocation, prices, 10000.0, contribution_freq, 200.0, rebalance)
+    pd.testing.assert_frame_equal(dashboard.backtest_allocation(*args), reference_allocation(*args),
+                                  check_exact=False, rtol=1e-10)
+
+def test_backtest_allocation_rejects_missing_assets(prices):
+    with pytest.raises(ValueError, match='DOGE'):
+        dashboard.backtest_allocation({'BTC': 50, 'DOGE': 50}, prices, 1000.0, 'None', 0.0)
@@ -0,0 +1,89 @@
+"""Data service routing: status codes for bad input, unknown paths and failures"""
+import http.client
+import json
+import threading
+
+import pytest
+
+import dashboard
+import data_service
+
+class StubService:
+    """Answers from fixed data; correlation() always fails"""
+
+    def __init__(self):
+        self.calls = []
+
+    def health(self):
+        return {'status': 'ok'}
+
+    def market(self, symbols=None):
+        self.calls.append(('market', symbols))
+        return dashboard.market_frame([{'Name': 'Bitcoin', 'Symbol': 'BTC', 'Price': 50000.0, 'Source': 'Stub'}])
+
+    def risk_metrics(self, portfolio_type, allocation, window=dashboard.RISK_WINDOW_DAYS):
+        if not allocation:
+            raise ValueError('empty allocation')
+        return {'Volatility': 0.5, 'window': window}
+
+    def correlation(self):
+        raise RuntimeError('risk model unavailable')
+
+def serve(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+@pytest.fixture
+def service():
+    stub = StubService()
+    server = serve(data_service.make_server(stub, port=0, workers=2))
+    stub.port = server.server_address[1]
+    yield stub
+    server.shutdown()
+    server.server_close()
+
+def call(port, method, path, body=None):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    try:
+        connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+@pytest.mark.parametrize('method, path, body, status, error', [
+    ('GET', '/nope', None, 404, 'unknown path /nope'),
+    ('POST', '/nope', '{}', 404, 'unknown path /nope'),
+    ('POST', '/risk', '{not json', 400, 'invalid JSON body'),
+    ('POST', '/risk', json.dumps({'portfolio_type': 'Balanced', 'allocation': {'BTC': 1}, 'colour': 'red'}), 400, 'colour'),
+    ('POST', '/risk', json.dumps({'portfolio_type': 'Balanced', 'allocation': {}}), 400, 'empty allocation'),
+    ('GET', '/correlation', None, 500, 'RuntimeError: risk model unavailable'),
+])
+def test_errors_map_to_status_codes(service, method, path, body, status, error):
+    code, payload = call(service.port, method, path, body)
+    assert code == status
+    assert error in payload['error']
+
+def test_server_keeps_serving_after_errors(service):
+    assert call(service.port, 'GET', '/correlation')[0] == 500
+    client = dashboard.DataServiceClient(f'http://127.0.0.1:{service.port}')
+    assert client.health() == {'status': 'ok'}
+    market = client.market(['btc', 'eth'])
+    assert service.calls == [('market', ['BTC', 'ETH'])]
+    assert market.loc[0, 'Symbol'] == 'BTC' and market.loc[0, 'Price'] == 50000.0
+    assert client.risk_metrics('Balanced', {'BTC': 1.0}, window=30) == {'Volatility': 0.5, 'window': 30}
+    with pytest.raises(RuntimeError, match='500'):
+        client.correlation()
+
+def test_unix_socket_routes_the_same(tmp_path):
+    path = str(tmp_path / 'service.sock')
+    server = serve(data_service.make_server(StubService(), socket_path=path, workers=2))
+    try:
+        client = dashboard.DataServiceClient(f'unix://{path}')
+        assert client.health() == {'status': 'ok'}
+        with pytest.raises(RuntimeError, match='404'):
+            client.request('GET', '/nope')
+    finally:
+        server.shutdown()
+        server.server_close()
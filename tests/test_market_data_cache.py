@@ -0,0 +1,119 @@
+"""MarketDataCache: TTL hits, stale-while-revalidate, single-flight misses and invalidation"""
+import threading
+import time
+
+import pytest
+
+import dashboard
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(dashboard.time, 'monotonic', clock)
+    return clock
+
+class Loader:
+    """Returns 'v1', 'v2', ... in call order; blocks while gate is cleared"""
+
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self):
+        self.calls += 1
+        value = f'v{self.calls}'
+        self.started.set()
+        assert self.gate.wait(5)
+        return value
+
+def settle(cache):
+    """Wait for background refreshes to finish"""
+    deadline = time.time() + 5
+    while cache._inflight and time.time() < deadline:
+        time.sleep(0.001)
+    assert not cache._inflight
+
+def test_fresh_entries_are_hits(clock):
+    cache, loader = dashboard.MarketDataCache({'quotes': 60}), Loader()
+    assert cache.get('quotes', 'all', loader) == 'v1'
+    clock.now += 60
+    assert cache.get('quotes', 'all', loader) == 'v1'
+    assert cache.get('quotes', 'other', loader) == 'v2'
+    assert loader.calls == 2
+    assert cache.stats == {'hits': 1, 'stale_hits': 0, 'misses': 2, 'loads': 2, 'errors': 0}
+
+def test_stale_entry_is_served_while_one_refresh_runs(clock):
+    cache, loader = dashboard.MarketDataCache({'quotes': 60}, max_stale=10), Loader()
+    cache.get('quotes', 'all', loader)
+    clock.now += 61
+    loader.gate.clear()
+    loader.started.clear()
+    # Both readers get the old value at once; only one refresh starts
+    assert cache.get('quotes', 'all', loader) == 'v1'
+    assert loader.started.wait(5)
+    assert cache.get('quotes', 'all', loader) == 'v1'
+    assert loader.calls == 2
+    loader.gate.set()
+    settle(cache)
+    assert cache.get('quotes', 'all', loader) == 'v2'
+    assert cache.stats['stale_hits'] == 2 and cache.stats['hits'] == 1 and cache.stats['loads'] == 2
+
+def test_entry_older_than_max_stale_is_reloaded_inline(clock):
+    cache, loader = dashboard.MarketDataCache({'quotes': 60}, max_stale=10), Loader()
+    cache.get('quotes', 'all', loader)
+    clock.now += 601
+    assert cache.get('quotes', 'all', loader) == 'v2'
+    assert cache.stats['misses'] == 2 and cache.stats['stale_hits'] == 0
+
+def test_concurrent_misses_share_one_load(clock):
+    cache, loader = dashboard.MarketDataCache({'quotes': 60}), Loader()
+    loader.gate.clear()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('quotes', 'all', loader))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    assert loader.started.wait(5)
+    loader.gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ['v1'] * 8 and loader.calls == 1 and cache.stats['misses'] == 1
+
+def test_failed_miss_raises_and_is_retried(clock):
+    cache = dashboard.MarketDataCache({'quotes': 60})
+
+    def failing():
+        raise ConnectionError('upstream down')
+
+    with pytest.raises(ConnectionError):
+        cache.get('quotes', 'all', failing)
+    assert cache.get('quotes', 'all', lambda: 'ok') == 'ok'
+    assert cache.stats['errors'] == 1 and cache.stats['misses'] == 2
+
+def test_invalidate_by_kind_and_drops_refresh_started_before(clock):
+    cache, loader = dashboard.MarketDataCache({'quotes': 60, 'intraday': 300}), Loader()
+    cache.get('quotes', 'all', loader)
+    cache.get('intraday', 'BTC', loader)
+    cache.invalidate('quotes')
+    assert cache.get('intraday', 'BTC', loader) == 'v2'
+    assert cache.get('quotes', 'all', loader) == 'v3'
+
+    # A refresh started before invalidate() must not repopulate the cache
+    clock.now += 61
+    loader.gate.clear()
+    loader.started.clear()
+    assert cache.get('quotes', 'all', loader) == 'v3'
+    assert loader.started.wait(5)
+    cache.invalidate()
+    loader.gate.set()
+    settle(cache)
+    assert cache._entries == {}
+    assert cache.get('quotes', 'all', loader) == 'v5'
@@ -0,0 +1,73 @@
+"""MarketAggregate checked against totals recomputed from a full frame"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import dashboard
+
+def quotes_frame(symbols, rng):
+    return pd.DataFrame({
+        'Symbol': symbols,
+        'Market Cap': rng.uniform(1e6, 1e9, len(symbols)),
+        'Volume (24h)': rng.uniform(1e5, 1e8, len(symbols)),
+        '24h %': rng.normal(0, 5, len(symbols))
+    })
+
+def reference_stats(frame):
+    """Market cap, its 24h change and the volume, from scratch"""
+    cap = frame['Market Cap'].sum()
+    cap_24h_ago = (frame['Market Cap'] / (1 + frame['24h %'] / 100)).sum()
+    return cap, (cap / cap_24h_ago - 1) * 100, frame['Volume (24h)'].sum()
+
+def test_incremental_totals_match_a_full_recompute():
+    rng = np.random.default_rng(1)
+    frame = quotes_frame([f'C{i}' for i in range(500)], rng)
+    aggregate = dashboard.MarketAggregate(interval=0, resum=10**9)
+    aggregate.update_frame(frame)
+    for _ in range(20):
+        rows = rng.choice(len(frame), 25, replace=False)
+        frame.loc[rows, 'Volume (24h)'] = rng.uniform(1e5, 1e8, 25)
+        frame.loc[rows, '24h %'] = rng.normal(0, 5, 25)
+        aggregate.update({frame.at[row, 'Symbol']: {'Volume (24h)': frame.at[row, 'Volume (24h)'],
+                                                    '24h %': frame.at[row, '24h %']} for row in rows})
+    stats = aggregate.stats()
+    cap, cap_change, volume = reference_stats(frame)
+    assert stats['Market Cap'] == pytest.approx(cap, rel=1e-9)
+    assert stats['Market Cap Change'] == pytest.approx(cap_change, rel=1e-9)
+    assert stats['Volume'] == pytest.approx(volume, rel=1e-9)
+    assert stats['Assets'] == 500
+
+def test_a_total_loss_row_does_not_crash_the_aggregate():
+    aggregate = dashboard.MarketAggregate(interval=0)
+    aggregate.update_frame(pd.DataFrame({'Symbol': ['BTC', 'RUG'], 'Market Cap': [1e9, 0.0],
+                                         'Volume (24h)': [1e7, 5e5], '24h %': [2.0, -100.0]}))
+    aggregate.update({'BTC': {'24h %': -100.0}})
+    stats = aggregate.stats()
+    assert stats['Market Cap'] == 1e9
+    assert stats['Market Cap Change'] == 0.0
+
+def test_symbols_joining_later_do_not_move_the_volume_badge():
+    rng = np.random.default_rng(2)
+    aggregate = dashboard.MarketAggregate(interval=0)
+    first_page = quotes_frame([f'A{i}' for i in range(50)], rng)
+    aggregate.update_frame(first_page)
+    aggregate.update({'A0': {'Volume (24h)': first_page.at[0, 'Volume (24h)'] * 2}})
+    expected = first_page.at[0, 'Volume (24h)'] / first_page['Volume (24h)'].sum() * 100
+    assert aggregate.stats()['Volume Change'] == pytest.approx(expected)
+    # Another session pages in 200 more symbols: the badge still compares the first page
+    aggregate.update_frame(quotes_frame([f'B{i}' for i in range(200)], rng))
+    stats = aggregate.stats()
+    assert stats['Volume Change'] == pytest.approx(expected)
+    assert stats['Sentiment Change'] is not None
+    assert stats['Assets'] == 250
+
+def test_exact_resums_keep_the_baseline_totals():
+    rng = np.random.default_rng(3)
+    aggregate = dashboard.MarketAggregate(interval=0, resum=7)
+    frame = quotes_frame([f'C{i}' for i in range(40)], rng)
+    aggregate.update_frame(frame.iloc[:10])
+    aggregate.update_frame(frame)
+    stats = aggregate.stats()
+    _, _, volume = reference_stats(frame)
+    assert stats['Volume'] == pytest.approx(volume, rel=1e-12)
+    assert stats['Volume Change'] == pytest.approx(0.0, abs=1e-9)
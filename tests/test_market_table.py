@@ -0,0 +1,43 @@
+"""Typed market frames: float columns end to end, compact frames for large universes"""
+import numpy as np
+import pandas as pd
+
+import dashboard
+
+def rows(n):
+    rng = np.random.default_rng(4)
+    return [{
+        'Name': f'Coin {i}', 'Symbol': f'C{i}', 'Price': rng.uniform(0.01, 1e5), '1h %': rng.normal(),
+        '24h %': rng.normal(), '7d %': rng.normal(), 'Market Cap': rng.uniform(1e6, 1e12),
+        'Volume (24h)': rng.uniform(1e5, 1e10), 'Source': 'Stooq' if i % 2 else 'Yahoo'
+    } for i in range(n)]
+
+def test_compact_frame_keeps_values_and_shrinks():
+    full = dashboard.market_frame(rows(5000))
+    compact = dashboard.market_frame(rows(5000), compact=True)
+    assert (full[dashboard.MARKET_NUMERIC_COLUMNS].dtypes == np.float64).all()
+    assert compact['Symbol'].dtype == 'category' and compact['Source'].dtype == 'category'
+    assert (compact[dashboard.MARKET_COMPACT_COLUMNS].dtypes == np.float32).all()
+    pd.testing.assert_frame_equal(compact.astype(full.dtypes), full, check_exact=False, rtol=1e-6)
+    # Displayed digits do not move
+    for column in ['Price', 'Market Cap', 'Volume (24h)']:
+        assert compact[column].equals(full[column])
+    assert compact.memory_usage(deep=True).sum() < full.memory_usage(deep=True).sum()
+
+def test_fetched_pages_are_compact_and_accept_ticks():
+    def provider(batch, cache, store, registry):
+        return {row['Symbol']: row for row in rows(3) if row['Symbol'] in batch}
+    frame = dashboard.fetch_market_rows(['C0', 'C1', 'C2', 'BTC'], [('Stooq', provider)],
+                                        sources=dashboard.SourceManager(('Stooq',)))
+    assert frame['Symbol'].dtype == 'category'
+    assert frame.set_index('Symbol').at['BTC', 'Source'] == 'Sample'
+
+    table = frame.set_index('Symbol', drop=False)
+    changed = dashboard.apply_ticks(table, {'C0': {'Price': 1.5, 'Source': 'Simulated', '24h %': np.nan}})
+    assert table.at['C0', 'Price'] == 1.5 and table.at['C0', 'Source'] == 'Simulated'
+    assert changed.loc['C0'].sum() == 3
+
+def test_string_rows_are_parsed_to_floats():
+    frame = dashboard.market_frame([{'Name': 'Bitcoin', 'Symbol': 'BTC', 'Price': '90145.32', 'Market Cap': None}])
+    assert frame.at[0, 'Price'] == 90145.32
+    assert np.isnan(frame.at[0, 'Market Cap'])
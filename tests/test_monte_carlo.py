@@ -0,0 +1,78 @@
+"""Monte Carlo simulation: output shapes and percentile bands against a direct reference"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import dashboard
+
+def reference_paths(mean, std, n_paths, n_days, initial_investment, seed):
+    """Every value path at once, drawn from the same per-stream generators"""
+    streams = [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(dashboard.MC_STREAMS)]
+    bounds = np.linspace(0, n_paths, len(streams) + 1).astype(int)
+    gross = np.vstack([
+        rng.standard_normal((bounds[k + 1] - bounds[k], n_days)) * std + 1.0 + mean
+        for k, rng in enumerate(streams)
+    ])
+    return initial_investment * np.cumprod(gross, axis=1)
+
+@pytest.mark.parametrize('n_days, band_points', [(365, 50), (30, 250)])
+def test_result_shapes(n_days, band_points):
+    result = dashboard.monte_carlo_simulation(0.001, 0.03, 1000, n_days, 10000, band_points=band_points, seed=8)
+    bands = result['bands']
+    assert list(bands.columns) == [f'P{p}' for p in dashboard.MC_PERCENTILES]
+    assert bands.index.name == 'Day' and len(bands) == min(band_points, n_days)
+    assert bands.index[0] == 1 and bands.index[-1] == n_days and bands.index.is_monotonic_increasing
+    # Percentile columns never cross
+    assert (np.diff(bands.to_numpy(), axis=1) >= 0).all()
+    assert result['terminal'].shape == (1000,)
+    assert 0.0 <= result['prob_loss'] <= 1.0
+    assert set(result['summary']) == {
+        'Mean Terminal Value', 'Median Terminal Value', 'Probability of Loss',
+        *(f'P{p} Terminal Value' for p in dashboard.MC_PERCENTILES)
+    }
+
+def test_bands_match_reference_percentiles():
+    paths = reference_paths(0.0005, 0.04, 800, 120, 5000, seed=3)
+    result = dashboard.monte_carlo_simulation(0.0005, 0.04, 800, 120, 5000, band_points=40, seed=3)
+    days = result['bands'].index.to_numpy()
+    expected = np.percentile(paths[:, days - 1], dashboard.MC_PERCENTILES, axis=0).T
+    np.testing.assert_allclose(result['bands'].to_numpy(), expected, rtol=1e-12)
+    np.testing.assert_allclose(result['terminal'], paths[:, -1], rtol=1e-12)
+    assert result['prob_loss'] == np.mean(paths[:, -1] < 5000)
+    assert result['summary']['P5 Terminal Value'] == pytest.approx(np.percentile(paths[:, -1], 5))
+
+def test_small_memory_budget_walks_the_horizon_in_blocks():
+    # With no volatility every path is the deterministic compounded value, whatever the block size
+    kwargs = dict(mean=0.001, std=0.0, n_paths=64, n_days=500, initial_investment=1000, band_points=100, seed=1)
+    whole = dashboard.monte_carlo_simulation(**kwargs)
+    blocked = dashboard.monte_carlo_simulation(**kwargs, memory_budget_mb=0.01)
+    expected = 1000 * 1.001 ** whole['bands'].index.to_numpy()
+    for result in (whole, blocked):
+        np.testing.assert_allclose(result['bands'].to_numpy(), np.repeat(expected[:, None], 5, axis=1), rtol=1e-9)
+    pd.testing.assert_index_equal(whole['bands'].index, blocked['bands'].index)
+    # Blocked runs are still reproducible for a seed
+    noisy = dict(kwargs, std=0.02, memory_budget_mb=0.01)
+    np.testing.assert_array_equal(dashboard.monte_carlo_simulation(**noisy)['terminal'],
+                                  dashboard.monte_carlo_simulation(**noisy)['terminal'])
+
+def test_bootstrap_and_student_t():
+    history = np.array([0.01, np.nan, -0.01])
+    result = dashboard.monte_carlo_simulation(0, 0, 200, 60, 100, 'bootstrap', historical_returns=history, seed=5)
+    assert result['bands'].shape == (60, 5)
+    # Resampled returns are only ever the finite history values
+    ups = np.arange(61)
+    possible = 100 * 1.01 ** ups * 0.99 ** (60 - ups)
+    assert np.isclose(result['terminal'][:, None], possible, rtol=1e-9).any(axis=1).all()
+    with pytest.raises(ValueError):
+        dashboard.monte_carlo_simulation(0, 0, 10, 5, 100, 'bootstrap', historical_returns=[np.nan])
+
+    fat = dashboard.monte_carlo_simulation(0.0, 0.01, 20000, 1, 1, 'student_t', seed=6)
+    # One-day returns keep the requested standard deviation
+    assert np.std(fat['terminal'] - 1) == pytest.approx(0.01, rel=0.1)
+    with pytest.raises(ValueError):
+        dashboard.monte_carlo_simulation(0, 0.01, 10, 5, 100, 'uniform')
+
+def test_portfolios_run_every_profile():
+    results = dashboard.monte_carlo_portfolios(200, 30, 1000, seed=2, band_points=10)
+    assert list(results) == list(dashboard.BACKTEST_RETURN_PROFILES)
+    assert all(result['bands'].shape == (10, 5) for result in results.values())
@@ -0,0 +1,82 @@
+"""load_price_history's head/tail gap filling against a stubbed Yahoo download"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import dashboard
+
+TODAY = pd.Timestamp.now().normalize()
+
+class FakeYahoo:
+    """download_yahoo_bars stand-in: tickers trade from their listing date up to last_bar"""
+
+    def __init__(self, listings, last_bar=TODAY):
+        self.listings = listings
+        self.last_bar = last_bar
+        self.calls = []
+
+    def __call__(self, symbols, period, interval, start=None, end=None):
+        self.calls.append((list(symbols), pd.Timestamp(start), pd.Timestamp(end) if end else None))
+        stop = min(pd.Timestamp(end) - pd.Timedelta(days=1), self.last_bar) if end else self.last_bar
+        index = pd.date_range(pd.Timestamp(start), stop, freq='D')
+        listed = {ticker: index >= self.listings.get(ticker, pd.Timestamp.max) for ticker in symbols}
+        frames = {
+            field: pd.DataFrame({ticker: np.where(listed[ticker], 100.0, np.nan) for ticker in symbols}, index=index)
+            for field in dashboard.OHLCV_COLUMNS
+        }
+        if not any(mask.any() for mask in listed.values()):
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1)
+
+@pytest.fixture
+def store(tmp_path):
+    return dashboard.OHLCVStore(str(tmp_path))
+
+def use(monkeypatch, fake):
+    monkeypatch.setattr(dashboard, 'download_yahoo_bars', fake)
+    return fake
+
+def test_younger_symbol_is_backfilled_once(monkeypatch, store):
+    fake = use(monkeypatch, FakeYahoo({'BTC-USD': pd.Timestamp('2015-01-01'), 'SOL-USD': pd.Timestamp('2020-04-10')}))
+    for _ in range(3):
+        closes = dashboard.load_price_history(['BTC', 'SOL'], '2018-01-01', TODAY, store)
+    assert len(fake.calls) == 1
+    assert closes['SOL'].first_valid_index() == pd.Timestamp('2020-04-10')
+    assert dashboard.OHLCVStore(store.root).inception('SOL') == pd.Timestamp('2020-04-10')
+    assert store.inception('BTC') is None
+
+def test_only_missing_head_and_tail_are_downloaded(monkeypatch, store):
+    dates = pd.date_range('2023-01-01', TODAY - pd.Timedelta(days=5), freq='D')
+    store.append('BTC', pd.DataFrame({field: 1.0 for field in dashboard.OHLCV_COLUMNS}, index=dates))
+    fake = use(monkeypatch, FakeYahoo({'BTC-USD': pd.Timestamp('2015-01-01')}))
+    closes = dashboard.load_price_history(['BTC'], '2022-01-01', TODAY, store)
+    head, tail = fake.calls
+    assert (head[1], head[2]) == (pd.Timestamp('2022-01-01'), pd.Timestamp('2023-01-02'))
+    assert (tail[1], tail[2]) == (dates[-1], TODAY + pd.Timedelta(days=1))
+    assert closes.index[0] == pd.Timestamp('2022-01-01') and closes.index[-1] == TODAY
+    assert closes['BTC'].notna().all()
+
+def test_symbols_without_bars_are_not_requested_again(monkeypatch, store):
+    fake = use(monkeypatch, FakeYahoo({'BTC-USD': pd.Timestamp('2015-01-01')}))
+    end = TODAY - pd.Timedelta(days=30)
+    dashboard.load_price_history(['BTC', 'NEWCOIN'], '2024-01-01', end, store)
+    dashboard.load_price_history(['BTC', 'NEWCOIN'], '2024-01-01', end, store)
+    assert len(fake.calls) == 1
+    assert store.inception('NEWCOIN') == end + pd.Timedelta(days=1)
+    # A later window only asks for the days after the recorded miss
+    dashboard.load_price_history(['NEWCOIN'], '2024-01-01', TODAY, store)
+    assert fake.calls[-1][1] == end + pd.Timedelta(days=1)
+
+def test_tail_the_provider_cannot_extend_is_checked_once_a_day(monkeypatch, store):
+    fake = use(monkeypatch, FakeYahoo({'LUNA-USD': pd.Timestamp('2020-01-01')}, last_bar=TODAY - pd.Timedelta(days=10)))
+    dashboard.load_price_history(['LUNA'], '2021-01-01', TODAY, store)
+    dashboard.load_price_history(['LUNA'], '2021-01-01', TODAY, store)
+    assert len(fake.calls) == 2   # the backfill, then one tail check
+    assert store.checked('LUNA') == TODAY
+
+def test_tickers_come_from_the_registry(monkeypatch, store):
+    registry = dashboard.SymbolRegistry(pd.DataFrame({'symbol': ['MIOTA'], 'yahoo': ['IOTA-USD']}))
+    fake = use(monkeypatch, FakeYahoo({'IOTA-USD': pd.Timestamp('2019-01-01')}))
+    closes = dashboard.load_price_history(['MIOTA'], '2024-01-01', TODAY, store, registry)
+    assert fake.calls[0][0] == ['IOTA-USD']
+    assert closes['MIOTA'].notna().all()
@@ -0,0 +1,49 @@
+"""Symbol registry: search, sort indexes and paging against a pandas reference"""
+import numpy as np
+import pandas as pd
+
+import dashboard
+
+def universe(n=2500):
+    rng = np.random.default_rng(12)
+    return pd.DataFrame({
+        'symbol': [f'c{i}' for i in range(n)],
+        'name': [f'Coin {rng.integers(0, 400)}' for _ in range(n)],
+        'rank': rng.permutation(n) + 1
+    })
+
+def reference(table, search, sort, ascending):
+    column = {'Rank': 'rank', 'Name': 'name', 'Symbol': 'symbol'}[sort]
+    keys = table[column].str.lower() if sort == 'Name' else table[column]
+    order = keys.sort_values(kind='stable').index.to_numpy()
+    if not ascending:
+        order = order[::-1]
+    text = table['symbol'].str.lower() + ' ' + table['name'].str.lower()
+    return [pos for pos in order if search in text[pos]]
+
+def test_query_matches_reference_for_every_sort():
+    registry = dashboard.SymbolRegistry(universe())
+    for sort in ['Rank', 'Name', 'Symbol']:
+        for ascending in [True, False]:
+            for search in ['', 'coin 1', 'C12', '  c7 ']:
+                positions = registry.query(search, sort=sort, ascending=ascending)
+                expected = reference(registry.table, search.strip().lower(), sort, ascending)
+                assert positions.tolist() == expected, (sort, ascending, search)
+
+def test_pages_cover_query_once_in_order():
+    registry = dashboard.SymbolRegistry(universe())
+    positions = registry.query('coin 2', sort='Name')
+    page_size = 50
+    pages = [registry.page(positions, page, page_size) for page in range(1, len(positions) // page_size + 3)]
+    assert all(len(page) == page_size for page in pages[:len(positions) // page_size])
+    assert pages[-1] == []
+    flat = [symbol for page in pages for symbol in page]
+    assert flat == registry.table['symbol'].to_numpy()[positions].tolist()
+
+def test_defaults_and_lookup():
+    registry = dashboard.SymbolRegistry(pd.DataFrame({'symbol': [' btc', 'ETH', 'BTC'], 'name': ['Bitcoin', None, 'dup']}))
+    assert len(registry) == 2 and 'BTC' in registry and 'btc' not in registry
+    assert registry.lookup(['ETH', 'BTC', 'XXX'], 'name') == ['ETH', 'Bitcoin', None]
+    assert registry.lookup(['BTC', 'ETH'], 'yahoo') == ['BTC-USD', 'ETH-USD']
+    assert registry.lookup(['BTC', 'ETH'], 'rank') == [1, 2]
+    assert registry.lookup(['BTC'], 'supply') == [0.0]
@@ -0,0 +1,107 @@
+"""Report export: chunked writes per format and the job's failure path"""
+import io
+import os
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dashboard
+
+CHUNK = 7
+
+@pytest.fixture
+def executor(tmp_path, monkeypatch):
+    monkeypatch.setattr(dashboard, 'REPORT_DIR', str(tmp_path))
+    monkeypatch.setattr(dashboard, 'REPORT_CHUNK_ROWS', CHUNK)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        yield pool
+
+def sections():
+    rng = np.random.default_rng(22)
+    market = pd.DataFrame({'Symbol': [f'C{i}' for i in range(30)], 'Price': rng.uniform(1, 100, 30)})
+    market.loc[3, 'Price'] = np.nan
+    weights = pd.DataFrame({'Strategy': ['Balanced'] * 4, 'Weight %': [40.0, 30.0, 20.0, 10.0]})
+    return [('Market', lambda: market), ('Allocations', weights), ('Empty', market.iloc[:0])], market, weights
+
+def run(executor, report_format):
+    items, market, weights = sections()
+    job = dashboard.ReportJob(items, report_format, executor)
+    job.future.result()
+    assert job.stage == 'Done' and job.error is None
+    assert job.rows_done == len(market) + len(weights) and job.progress == 1.0
+    return job, market, weights
+
+@pytest.mark.parametrize('report_format', list(dashboard.REPORT_FORMATS))
+def test_rows_are_written_in_chunks(executor, monkeypatch, report_format):
+    calls = []
+    writer = dashboard.REPORT_WRITERS[report_format]
+
+    class Recording(writer):
+        def rows(self, chunk):
+            calls.append(len(chunk))
+            super().rows(chunk)
+
+    monkeypatch.setitem(dashboard.REPORT_WRITERS, report_format, Recording)
+    run(executor, report_format)
+    # 30 market rows in chunks of 7, then 4 allocation rows, then the empty section once
+    assert calls == [7, 7, 7, 7, 2, 4, 0]
+
+def test_csv_sections_round_trip(executor):
+    job, market, weights = run(executor, 'CSV')
+    with open(job.path, encoding='utf-8') as report:
+        parts = re.split(r'^# (.+)\n', report.read(), flags=re.M)[1:]
+    titles, bodies = parts[::2], parts[1::2]
+    assert titles == ['Market', 'Allocations', 'Empty']
+    pd.testing.assert_frame_equal(pd.read_csv(io.StringIO(bodies[0])), market)
+    pd.testing.assert_frame_equal(pd.read_csv(io.StringIO(bodies[1])), weights)
+    assert bodies[2].strip() == 'Symbol,Price'
+
+def test_parquet_has_one_file_per_section(executor):
+    pytest.importorskip('pyarrow')
+    job, market, weights = run(executor, 'Parquet')
+    with zipfile.ZipFile(job.path) as archive:
+        assert archive.namelist() == ['market.parquet', 'allocations.parquet', 'empty.parquet']
+        with archive.open('market.parquet') as part:
+            pd.testing.assert_frame_equal(pd.read_parquet(io.BytesIO(part.read())), market)
+    # Per-section scratch files are gone once they are in the archive
+    assert os.listdir(dashboard.REPORT_DIR) == [os.path.basename(job.path)]
+
+def test_html_has_one_table_per_section(executor):
+    job, market, weights = run(executor, 'HTML')
+    with open(job.path, encoding='utf-8') as report:
+        page = report.read()
+    assert page.endswith('</body></html>')
+    assert page.count('<table>') == page.count('</table>') == 3
+    assert page.count('<tr>') == 3 + len(market) + len(weights)
+    assert '<td>—</td>' in page
+
+def test_pdf_pages_and_cross_references(executor):
+    job, market, weights = run(executor, 'PDF')
+    with open(job.path, 'rb') as report:
+        data = report.read()
+    assert data.startswith(b'%PDF-1.4') and data.rstrip().endswith(b'%%EOF')
+    xref = int(re.search(rb'startxref\n(\d+)\n', data).group(1))
+    assert data[xref:].startswith(b'xref\n')
+    offsets = [int(offset) for offset in re.findall(rb'^(\d{10}) 00000 n $', data[xref:], flags=re.M)]
+    for number, offset in enumerate(offsets, start=1):
+        assert data[offset:].startswith(b'%d 0 obj\n' % number)
+    pages = re.search(rb'/Type /Pages /Kids \[[^\]]*\] /Count (\d+)', data)
+    assert int(pages.group(1)) == data.count(b'/Type /Page ') >= 1
+
+@pytest.mark.parametrize('failing', ['source', 'writer'])
+def test_failed_job_records_error_and_removes_file(executor, failing):
+    def broken():
+        raise RuntimeError('upstream down')
+    frame = pd.DataFrame({'Symbol': ['BTC'], 'Price': [1.0]})
+    # A source that raises fails before the file exists; a non-frame fails mid-write
+    items = [('Market', frame), ('Risk', broken if failing == 'source' else None)]
+    job = dashboard.ReportJob(items, 'CSV', executor)
+    job.future.result()
+    assert job.stage == 'Failed' and job.error
+    if failing == 'source':
+        assert job.error == 'upstream down'
+    assert not os.path.exists(job.path)
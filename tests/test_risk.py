@@ -0,0 +1,119 @@
+"""Risk model estimates checked against naive references"""
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dashboard
+
+ASSETS = ['BTC', 'ETH', 'SOL', 'ADA']
+MEAN = np.array([0.0015, 0.0010, 0.0020, 0.0004])
+COV = np.array([
+    [4.0e-4, 2.0e-4, 1.5e-4, 0.5e-4],
+    [2.0e-4, 3.0e-4, 1.0e-4, 0.4e-4],
+    [1.5e-4, 1.0e-4, 9.0e-4, 0.2e-4],
+    [0.5e-4, 0.4e-4, 0.2e-4, 1.0e-4]
+])
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(3)
+    return pd.DataFrame(rng.multivariate_normal(MEAN, COV, 730), columns=ASSETS)
+
+def reference_ewma(frame, halflife):
+    """Weighted mean and pairwise-complete weighted covariance, one pair at a time"""
+    values = frame.to_numpy(dtype=float)
+    weights = 0.5 ** (np.arange(len(values) - 1, -1, -1) / halflife)
+    n = values.shape[1]
+    mean = np.array([np.average(values[np.isfinite(values[:, i]), i], weights=weights[np.isfinite(values[:, i])])
+                     for i in range(n)])
+    cov = np.zeros((n, n))
+    for i, j in itertools.product(range(n), repeat=2):
+        both = np.isfinite(values[:, i]) & np.isfinite(values[:, j])
+        cov[i, j] = np.average((values[both, i] - mean[i]) * (values[both, j] - mean[j]), weights=weights[both])
+    return mean, cov
+
+def test_ewma_fit_matches_reference(returns):
+    returns = returns.copy()
+    returns.iloc[:200, 2] = np.nan  # a younger asset
+    returns.iloc[500, 0] = np.nan
+    model = dashboard.EWMACovariance(ASSETS, halflife=30).fit(returns)
+    mean, cov = reference_ewma(returns, 30)
+    np.testing.assert_allclose(model.mean, mean, rtol=1e-10)
+    np.testing.assert_allclose(model.cov, cov, rtol=1e-10)
+
+def test_ewma_updates_match_full_fit(returns):
+    full = dashboard.EWMACovariance(ASSETS, halflife=30).fit(returns)
+    streamed = dashboard.EWMACovariance(ASSETS, halflife=30).fit(returns.iloc[:365])
+    for row in returns.iloc[365:].to_numpy():
+        streamed.update(row)
+    np.testing.assert_allclose(streamed.mean, full.mean, rtol=1e-6)
+    np.testing.assert_allclose(streamed.cov, full.cov, rtol=1e-6)
+
+def test_ewma_masked_update_touches_only_quoted_assets(returns):
+    model = dashboard.EWMACovariance(ASSETS, halflife=30).fit(returns)
+    subset = dashboard.EWMACovariance(['BTC', 'SOL'], halflife=30).fit(returns[['BTC', 'SOL']])
+    before = model.cov.copy()
+    row = np.array([0.01, 0.0, -0.02, 0.0])
+    model.update(row, elapsed=0.5, mask=np.array([True, False, True, False]))
+    subset.update(row[[0, 2]], elapsed=0.5)
+    np.testing.assert_allclose(model.covariance(['BTC', 'SOL']).to_numpy(), subset.cov, rtol=1e-12)
+    np.testing.assert_array_equal(model.cov[1], before[1])
+    np.testing.assert_array_equal(model.cov[:, 3], before[:, 3])
+
+def reference_projection(points, lower, upper):
+    """Projection onto the bounded simplex by a long bisection on the shift"""
+    projected = []
+    for row in points:
+        low, high = (row - upper).min(), (row - lower).max()
+        for _ in range(200):
+            tau = (low + high) / 2
+            low, high = (tau, high) if np.clip(row - tau, lower, upper).sum() > 1 else (low, tau)
+        projected.append(np.clip(row - (low + high) / 2, lower, upper))
+    return np.array(projected)
+
+@pytest.mark.parametrize('lower, upper', [(0.0, 1.0), (0.0, 0.4), (0.1, 0.5)])
+def test_projection_matches_reference(lower, upper):
+    points = np.random.default_rng(5).normal(0.25, 0.5, (200, 4))
+    np.testing.assert_allclose(dashboard.project_to_bounded_simplex(points, lower, upper),
+                               reference_projection(points, lower, upper), atol=1e-12)
+
+def reference_minimum_variance(lower, upper):
+    """Exact minimum-variance weights by solving the KKT system on every face of the box"""
+    n = len(MEAN)
+    best, best_variance = None, np.inf
+    for sides in itertools.product(('lower', 'free', 'upper'), repeat=n):
+        free = np.array([side == 'free' for side in sides])
+        weights = np.array([lower if side == 'lower' else upper if side == 'upper' else 0.0 for side in sides])
+        if free.any():
+            k = free.sum()
+            system = np.zeros((k + 1, k + 1))
+            system[:k, :k] = 2 * COV[np.ix_(free, free)]
+            system[:k, k] = system[k, :k] = 1
+            rhs = np.append(-2 * COV[np.ix_(free, ~free)] @ weights[~free], 1 - weights[~free].sum())
+            weights[free] = np.linalg.lstsq(system, rhs, rcond=None)[0][:k]
+        feasible = abs(weights.sum() - 1) < 1e-9 and weights.min() >= lower - 1e-9 and weights.max() <= upper + 1e-9
+        if feasible and weights @ COV @ weights < best_variance:
+            best, best_variance = weights, weights @ COV @ weights
+    return best
+
+@pytest.mark.parametrize('lower, upper', [(0.0, 1.0), (0.05, 0.4)])
+def test_efficient_frontier_respects_bounds_and_optimality(lower, upper):
+    weights, returns, volatilities = dashboard.efficient_frontier(MEAN, COV, lower, upper, points=40)
+    np.testing.assert_allclose(weights.sum(axis=1), 1.0, atol=1e-9)
+    assert weights.min() >= lower - 1e-12 and weights.max() <= upper + 1e-12
+    np.testing.assert_allclose(returns, weights @ MEAN)
+    np.testing.assert_allclose(volatilities ** 2, np.einsum('ij,jk,ik->i', weights, COV, weights), rtol=1e-9)
+    # Higher risk tolerance never buys a lower expected return
+    assert np.all(np.diff(returns) >= -1e-12)
+
+    minimum = reference_minimum_variance(lower, upper)
+    np.testing.assert_allclose(weights[0], minimum, atol=1e-5)
+    assert volatilities.min() ** 2 >= minimum @ COV @ minimum * (1 - 1e-9)
+
+def test_efficient_frontier_rejects_infeasible_bounds():
+    with pytest.raises(ValueError):
+        dashboard.efficient_frontier(MEAN, COV, 0.0, 0.2)
+    with pytest.raises(ValueError):
+        dashboard.efficient_frontier(MEAN, COV, 0.3, 1.0)
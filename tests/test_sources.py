@@ -0,0 +1,90 @@
+"""CircuitBreaker and SourceManager state transitions under a fake clock"""
+import pytest
+
+import dashboard
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(dashboard.time, 'monotonic', clock)
+    return clock
+
+def serving(*supported, fail=False):
+    """fetch(batch) that answers for supported symbols only, recording each batch"""
+    def fetch(batch):
+        fetch.calls.append(list(batch))
+        if fail:
+            raise ConnectionError('provider down')
+        return {symbol: {'Symbol': symbol} for symbol in batch if symbol in supported}
+    fetch.calls = []
+    return fetch
+
+def test_breaker_opens_probes_and_closes(clock):
+    breaker = dashboard.CircuitBreaker('Stooq', failure_threshold=2, cooldown=60)
+    assert breaker.acquire() == 'closed'
+    breaker.record_failure(ConnectionError())
+    assert breaker.state == 'closed'
+    breaker.record_failure(ConnectionError())
+    assert breaker.state == 'open'
+    assert breaker.acquire() is None
+    clock.now += 59
+    assert breaker.acquire() is None
+    clock.now += 1
+    assert breaker.acquire() == 'probe'
+    assert breaker.acquire() is None  # one probe at a time
+    breaker.record_failure()
+    assert breaker.state == 'open' and breaker.retry_in() == 60
+    clock.now += 60
+    assert breaker.acquire() == 'probe'
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.consecutive_failures == 0
+    assert breaker.stats == {'successes': 1, 'failures': 3, 'rejected': 3}
+
+def test_unsupported_symbols_are_misses_not_failures(clock):
+    sources = dashboard.SourceManager(('Stooq',), failure_threshold=2, cooldown=60)
+    fetch = serving('BTC', 'ETH')
+    assert set(sources.call('Stooq', ['BTC', 'ETH'], fetch)) == {'BTC', 'ETH'}
+    for page in range(3):
+        assert sources.call('Stooq', [f'ALT{page}{i}' for i in range(5)], fetch) == {}
+    assert sources.breakers['Stooq'].state == 'closed'
+    assert set(sources.call('Stooq', ['BTC', 'ETH'], fetch)) == {'BTC', 'ETH'}
+    # Misses are skipped for one cool-down, then retried
+    fetch.calls.clear()
+    assert sources.call('Stooq', ['ALT00', 'BTC'], fetch) == {'BTC': {'Symbol': 'BTC'}}
+    assert fetch.calls == [['BTC']]
+    clock.now += 60
+    assert sources.eligible('Stooq', ['ALT00']) == ['ALT00']
+
+def test_known_symbols_coming_back_empty_count_as_failures(clock):
+    sources = dashboard.SourceManager(('Yahoo',), failure_threshold=2, cooldown=60)
+    sources.call('Yahoo', ['BTC', 'ETH'], serving('BTC', 'ETH'))
+    clock.now += 60  # past the misses' cool-down
+    sources.call('Yahoo', ['BTC'], serving())
+    clock.now += 60
+    sources.call('Yahoo', ['ETH'], serving())
+    assert sources.breakers['Yahoo'].state == 'open'
+    assert sources.call('Yahoo', ['BTC'], serving('BTC')) == {}
+
+def test_exceptions_open_the_breaker_and_probe_uses_a_served_symbol(clock):
+    sources = dashboard.SourceManager(('Stooq',), failure_threshold=2, cooldown=60)
+    sources.call('Stooq', ['BTC', 'ETH'], serving('BTC', 'ETH'))
+    down = serving(fail=True)
+    sources.call('Stooq', ['BTC'], down)
+    sources.call('Stooq', ['ETH'], down)
+    assert sources.breakers['Stooq'].state == 'open'
+    assert sources.call('Stooq', ['BTC'], down) == {}
+    assert sources.breakers['Stooq'].stats['rejected'] == 1
+
+    clock.now += 60
+    fetch = serving('BTC', 'ETH')
+    rows = sources.call('Stooq', ['NEW1', 'NEW2', 'ETH', 'BTC'], fetch)
+    assert fetch.calls[0] == ['ETH']
+    assert set(rows) == {'ETH', 'BTC'}
+    assert sources.breakers['Stooq'].state == 'closed'
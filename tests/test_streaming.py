@@ -0,0 +1,36 @@
+"""Tick ring buffer: wraparound, overrun detection and merged session updates"""
+import dashboard
+
+def test_readers_see_every_delta_across_wraparound():
+    buffer = dashboard.TickRingBuffer(capacity=8)
+    appended = []
+    seq = 0
+    for i in range(50):
+        appended.append((f'S{i % 3}', {'Price': float(i)}))
+        assert buffer.append(*appended[-1]) == i + 1
+        if i % 5 == 4:
+            latest, deltas = buffer.since(seq)
+            assert latest == i + 1
+            assert deltas == appended[seq:latest]
+            seq = latest
+    assert buffer.seq == 50
+
+def test_reader_exactly_capacity_behind_is_served_one_more_is_overrun():
+    buffer = dashboard.TickRingBuffer(capacity=8)
+    for i in range(20):
+        buffer.append('BTC', {'Price': float(i)})
+    latest, deltas = buffer.since(12)
+    assert latest == 20 and [fields['Price'] for _, fields in deltas] == [float(i) for i in range(12, 20)]
+    assert buffer.since(11) is None
+    assert buffer.since(20) == (20, [])
+
+def test_updates_merge_wanted_symbols_and_report_overrun():
+    streamer = dashboard.PriceStreamer(feed=None, capacity=4)
+    streamer.buffer.append('BTC', {'Price': 1.0, '1h %': 0.5})
+    streamer.buffer.append('ETH', {'Price': 2.0})
+    streamer.buffer.append('BTC', {'Price': 3.0})
+    assert streamer.updates(0, ['BTC']) == (3, {'BTC': {'Price': 3.0, '1h %': 0.5}})
+    assert streamer.updates(1, ['BTC', 'ETH']) == (3, {'ETH': {'Price': 2.0}, 'BTC': {'Price': 3.0}})
+    for _ in range(2):
+        streamer.buffer.append('SOL', {'Price': 4.0})
+    assert streamer.updates(0, ['BTC']) is None